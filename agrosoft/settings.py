@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'usuarios',
+    'productores',
 ]
 
 MIDDLEWARE = [
@@ -91,6 +92,37 @@ DATABASES = {
 }
 
 
+# Cache compartido entre workers (precios SIPSA)
+# Por defecto usa archivos locales; CACHE_BACKEND permite locmem o base de datos
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# MAX_ENTRIES debe alojar la matriz de recomendaciones completa (municipios ×
+# 180 días, unas 1.260 entradas) más los precios, el clima, los reportes y las
+# respuestas JSON; con el límite implícito de 300 el cache desaloja la matriz
+# en cada corrida. Los contadores de versión no dependen del cache (ver
+# productores.versiones).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+        },
+    }
+}
+
+# Instrumentación de las gráficas: nivel de log de los tiempos por etapa y
+# volcado de payloads completos (solo para depuración, nunca en producción)
+GRAFICAS_NIVEL_TIEMPOS = os.environ.get('GRAFICAS_NIVEL_TIEMPOS', 'INFO')
+GRAFICAS_VOLCAR_DATOS = os.environ.get('GRAFICAS_VOLCAR_DATOS', 'False') == 'True'
+
+# Segundos entre ingestas programadas del SIPSA: los proxies pueden cachear
+# las APIs de precios y gráficas hasta la próxima ingesta esperada
+SIPSA_INTERVALO_INGESTA = int(os.environ.get('SIPSA_INTERVALO_INGESTA', 6 * 3600))
+
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Benchmark del procesamiento de filas del CSV del SIPSA.
+Compara el recorrido anterior por nombres alternativos de columna
+(csv.DictReader + búsqueda de claves y formatos de fecha por fila) contra
+el extractor compilado a partir del encabezado, con detección de formato de
+fecha memorizada, sobre un CSV sintético de 100.000 filas.
+"""
+
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from productores.sipsa_parser import ExtractorFilasSipsa, limpiar_precio
+
+TOTAL_FILAS = 100_000
+
+
+def generar_csv_sintetico(total_filas: int) -> str:
+    """
+    Genera un CSV con la estructura del SIPSA, mezclando productos relevantes y no relevantes
+    """
+    productos = ['PAPA CRIOLLA', 'ZANAHORIA', 'CEBOLLA LARGA', 'BRÓCOLI', 'MANGO TOMMY',
+                 'LIMÓN TAHITÍ', 'ARRACACHA', 'LECHUGA BATAVIA', 'TOMATE CHONTO', 'APIO']
+    mercados = ['Corabastos', 'Paloquemao', 'Las Flores', 'Samper Mendoza']
+    fechas = ['2025-08-0%d' % d for d in range(1, 8)]
+    rnd = random.Random(2025)
+
+    salida = io.StringIO()
+    writer = csv.writer(salida)
+    writer.writerow(['Fecha', 'Producto', 'Mercado', 'Variedad', 'Precio Mayorista',
+                     'Precio Minorista', 'Unidad', 'Presentacion'])
+    for _ in range(total_filas):
+        mayorista = rnd.randint(500, 6000)
+        writer.writerow([rnd.choice(fechas), rnd.choice(productos), rnd.choice(mercados), 'Primera',
+                         mayorista, int(mayorista * 1.3), 'KILO', 'BULTO'])
+    return salida.getvalue()
+
+
+def procesar_fila_anterior(row):
+    """
+    Reproducción del procesamiento anterior por fila, usada como línea base
+    """
+    try:
+        fecha_str = row.get('fecha', row.get('Fecha', ''))
+        producto = row.get('producto', row.get('Producto', row.get('PRODUCTO', ''))).strip().upper()
+        mercado = row.get('mercado', row.get('Mercado', row.get('MERCADO', 'Corabastos')))
+        precio_mayorista_str = (row.get('precio_mayorista', '') or row.get('Precio Mayorista', '') or
+                                row.get('PRECIO_MAYORISTA', '') or row.get('precio', ''))
+        precio_minorista_str = (row.get('precio_minorista', '') or row.get('Precio Minorista', '') or
+                                row.get('PRECIO_MINORISTA', ''))
+        if not producto or not precio_mayorista_str:
+            return None
+        precio_mayorista = limpiar_precio(precio_mayorista_str)
+        precio_minorista = limpiar_precio(precio_minorista_str) or precio_mayorista * 1.3
+        if not precio_mayorista or precio_mayorista <= 0:
+            return None
+        for formato in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d']:
+            try:
+                fecha_obj = datetime.strptime(fecha_str, formato)
+                break
+            except ValueError:
+                continue
+        else:
+            fecha_obj = datetime.now()
+        productos_relevantes = [
+            'PAPA', 'ZANAHORIA', 'CEBOLLA', 'LECHUGA', 'REPOLLO',
+            'CILANTRO', 'PEREJIL', 'APIO', 'ACELGA', 'ESPINACA',
+            'BRÓCOLI', 'COLIFLOR', 'REMOLACHA'
+        ]
+        if not any(prod in producto for prod in productos_relevantes):
+            return None
+        return {
+            'fecha': fecha_obj.strftime('%Y-%m-%d'), 'fecha_obj': fecha_obj, 'mercado': mercado,
+            'producto': producto, 'variedad': row.get('variedad', row.get('Variedad', 'Estándar')),
+            'precio_mayorista': int(precio_mayorista), 'precio_minorista': int(precio_minorista),
+            'unidad': row.get('unidad', row.get('Unidad', 'KILO')),
+            'presentacion': row.get('presentacion', row.get('Presentacion', 'BULTO')),
+        }
+    except Exception:
+        return None
+
+
+def medir(nombre, funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    print(f"{nombre:<28} {duracion:8.3f}s  ({len(resultado)} registros relevantes)")
+    return duracion, resultado
+
+
+def main():
+    print(f"📄 Generando CSV sintético de {TOTAL_FILAS:,} filas...")
+    contenido = generar_csv_sintetico(TOTAL_FILAS)
+
+    def anterior():
+        reader = csv.DictReader(io.StringIO(contenido))
+        return [p for p in map(procesar_fila_anterior, reader) if p]
+
+    def compilado():
+        reader = csv.reader(io.StringIO(contenido))
+        extractor = ExtractorFilasSipsa(next(reader))
+        return [p for p in map(extractor.procesar, reader) if p]
+
+    print("\n⏱  Resultados")
+    t_anterior, r_anterior = medir('DictReader + claves', anterior)
+    t_compilado, r_compilado = medir('Extractor compilado', compilado)
+
+    assert len(r_anterior) == len(r_compilado)
+    print(f"\n🚀 Aceleración: {t_anterior / t_compilado:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Benchmark de la evaluación de recomendaciones.
+Compara el cálculo escalar de SipsaService.obtener_productos_recomendados,
+punto por punto, contra EvaluadorLote sobre una grilla de municipios ×
+fechas de siembra × temperaturas, y verifica que ambos coinciden.
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agrosoft.settings')
+
+import django
+
+django.setup()
+
+from productores.recomendaciones_lote import EvaluadorLote
+from productores.sipsa_service import SipsaService
+
+DIAS = 60
+TEMPERATURAS = [None] + [t * 0.5 for t in range(10, 50)]
+
+
+def main():
+    servicio = SipsaService()
+    municipios = list(servicio.FACTORES_MUNICIPIO)
+    fechas = [datetime(2025, 1, 1) + timedelta(days=d) for d in range(DIAS)]
+    total = len(municipios) * len(fechas) * len(TEMPERATURAS)
+    print(f"🧮 Grilla de {total:,} puntos ({len(municipios)} municipios × {DIAS} días × {len(TEMPERATURAS)} temperaturas)")
+
+    inicio = time.perf_counter()
+    escalares = [servicio.obtener_productos_recomendados(m, f, t)
+                 for m in municipios for f in fechas for t in TEMPERATURAS]
+    t_escalar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    resultado = EvaluadorLote(servicio).evaluar(municipios, fechas, TEMPERATURAS)
+    t_matrices = time.perf_counter() - inicio
+    lote = [resultado.recomendaciones(m, f, t)
+            for m in range(len(municipios)) for f in range(len(fechas)) for t in range(len(TEMPERATURAS))]
+    t_lote = time.perf_counter() - inicio
+
+    assert escalares == lote
+    print("\n⏱  Resultados")
+    print(f"{'Escalar (por punto)':<28} {t_escalar:8.3f}s")
+    print(f"{'Lote (solo matrices)':<28} {t_matrices:8.3f}s")
+    print(f"{'Lote (con top 10)':<28} {t_lote:8.3f}s")
+    print(f"\n🚀 Aceleración: {t_escalar / t_matrices:.1f}x en matrices, {t_escalar / t_lote:.1f}x con top 10")
+
+
+if __name__ == '__main__':
+    main()
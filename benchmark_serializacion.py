@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Benchmark de la serialización de las APIs de precios y gráficas.
+Compara el payload anterior (lista de diccionarios con `fecha_obj` y
+evolución anidada por producto, codificados con JsonResponse) contra los
+payloads columnares de productores.serializacion, y mide la lectura del
+JSON ya serializado desde el cache.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agrosoft.settings')
+
+import django
+
+django.setup()
+
+from django.core.cache import caches
+from django.http import JsonResponse
+
+from productores import serializacion
+from productores.serializacion import a_json, precios_columnares, series_columnares
+from productores.sipsa_service import SipsaService
+
+DIAS = 365
+REPETICIONES = 20
+HOY = datetime(2025, 6, 30)
+
+
+def medir(funcion):
+    """
+    Mejor tiempo de REPETICIONES ejecuciones, en milisegundos
+    """
+    mejor = float('inf')
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return resultado, mejor * 1000
+
+
+def evolucion_anidada(series):
+    """
+    Formato anterior de evolucion_precios: fechas repetidas por producto
+    """
+    return {producto: {'fechas': fechas, 'precios': precios,
+                       'precio_promedio': round(sum(precios) / len(precios), 2)}
+            for producto, (fechas, precios) in series.items()}
+
+
+def main():
+    aleatorio = random.Random(42)
+    precios = []
+    for producto, info in SipsaService.PRODUCTOS_BASE.items():
+        for dia in range(DIAS):
+            fecha = HOY - timedelta(days=dia)
+            mayorista = int(info['precio_base'] * aleatorio.uniform(0.8, 1.2))
+            precios.append({
+                'fecha': fecha.strftime('%Y-%m-%d'), 'fecha_obj': fecha, 'mercado': 'Corabastos',
+                'producto': producto, 'variedad': 'Estándar', 'precio_mayorista': mayorista,
+                'precio_minorista': int(mayorista * 1.3), 'unidad': info['unidad'],
+                'presentacion': info['presentacion'],
+            })
+    series = {}
+    for precio in sorted(precios, key=lambda p: p['fecha']):
+        fechas, valores = series.setdefault(precio['producto'], ([], []))
+        fechas.append(precio['fecha'])
+        valores.append(precio['precio_mayorista'])
+    print(f"📦 {len(precios):,} precios de {len(series)} productos en {DIAS} días")
+    print(f"   orjson: {'instalado' if serializacion.orjson else 'no instalado (json estándar)'}")
+
+    casos = [
+        ('Precios: filas + JsonResponse',
+         lambda: JsonResponse({'precios': precios, 'total': len(precios)}).content),
+        ('Precios: columnar + a_json',
+         lambda: a_json({'productos': precios_columnares(precios), 'total': len(precios)})),
+        ('Evolución: anidada + JsonResponse',
+         lambda: JsonResponse(evolucion_anidada(series)).content),
+        ('Evolución: columnar + a_json',
+         lambda: a_json(series_columnares(series))),
+    ]
+
+    print("\n⏱  Resultados (mejor de %d)" % REPETICIONES)
+    for nombre, funcion in casos:
+        contenido, ms = medir(funcion)
+        print(f"{nombre:<36} {ms:8.1f}ms  {len(contenido) / 1024:8.1f} KiB")
+
+    cache = caches['default']
+    contenido = a_json({'productos': precios_columnares(precios), 'total': len(precios)})
+    cache.set('benchmark:serializacion', contenido, 60)
+    leido, ms = medir(lambda: cache.get('benchmark:serializacion'))
+    cache.delete('benchmark:serializacion')
+    assert leido == contenido
+    print(f"{'Precios: desde cache (snapshot)':<36} {ms:8.1f}ms  {len(leido) / 1024:8.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Benchmark de las tendencias semanales de precios.
+Compara el recorrido anterior (cada ventana semanal filtra todos los
+registros) contra AcumuladorSemanal, que ubica cada registro en su semana
+ISO en una sola pasada, sobre 1.000.000 de precios de tres años.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agrosoft.settings')
+
+import django
+
+django.setup()
+
+from graficas.tendencias import AcumuladorSemanal
+from productores.sipsa_service import SipsaService
+
+REGISTROS = 1_000_000
+DIAS_HISTORIAL = 3 * 365
+HOY = date(2025, 6, 30)
+
+
+def por_ventanas(registros, desde, hasta):
+    """
+    Recorrido anterior: O(semanas × registros)
+    """
+    semanas, promedios, cantidades = [], [], []
+    lunes = desde - timedelta(days=desde.weekday())
+    while lunes <= hasta:
+        domingo = lunes + timedelta(days=6)
+        suma, conteo, productos = 0.0, 0, set()
+        for producto, fecha, precio in registros:
+            if lunes <= fecha <= domingo and desde <= fecha <= hasta:
+                suma += precio
+                conteo += 1
+                productos.add(producto)
+        if conteo:
+            semanas.append(lunes)
+            promedios.append(round(suma / conteo, 2))
+            cantidades.append(len(productos))
+        lunes += timedelta(days=7)
+    return semanas, promedios, cantidades
+
+
+def acumulado(registros, desde, hasta):
+    acumulador = AcumuladorSemanal(desde, hasta)
+    acumulador.agregar_registros(registros)
+    return acumulador.series()
+
+
+def main():
+    aleatorio = random.Random(42)
+    productos = list(SipsaService.PRODUCTOS_BASE)
+    inicio_historial = HOY - timedelta(days=DIAS_HISTORIAL)
+    registros = [(aleatorio.choice(productos), inicio_historial + timedelta(days=aleatorio.randrange(DIAS_HISTORIAL)),
+                  float(aleatorio.randrange(500, 8000)))
+                 for _ in range(REGISTROS)]
+    print(f"📦 {REGISTROS:,} precios de {len(productos)} productos en {DIAS_HISTORIAL} días")
+
+    semestre = HOY - timedelta(days=180)
+
+    inicio = time.perf_counter()
+    anterior = por_ventanas(registros, semestre, HOY)
+    t_anterior = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    nuevo = acumulado(registros, semestre, HOY)
+    t_semestre = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    historial = acumulado(registros, inicio_historial, HOY)
+    t_historial = time.perf_counter() - inicio
+
+    assert anterior[0] == nuevo[0] and anterior[2] == nuevo[2]
+    assert all(abs(a - b) <= 0.01 for a, b in zip(anterior[1], nuevo[1]))
+    print("\n⏱  Resultados")
+    print(f"{'Ventanas (6 meses)':<28} {t_anterior:8.3f}s  ({len(anterior[0])} semanas)")
+    print(f"{'Acumulador (6 meses)':<28} {t_semestre:8.3f}s  ({len(nuevo[0])} semanas)")
+    print(f"{'Acumulador (3 años)':<28} {t_historial:8.3f}s  ({len(historial[0])} semanas)")
+    print(f"\n🚀 Aceleración: {t_anterior / t_semestre:.1f}x en la ventana de 6 meses")
+
+
+if __name__ == '__main__':
+    main()
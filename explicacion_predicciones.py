@@ -36,11 +36,11 @@ def explicar_predicciones_precios():
     print("\n4. 📊 EJEMPLO PRÁCTICO:")
     fecha_hoy = datetime.now()
     semilla = int(fecha_hoy.strftime('%Y%m%d'))
-    random.seed(semilla)
+    aleatorio = random.Random(semilla)
     
     precio_base = 2800  # Papa Criolla
     volatilidad = 0.15  # 15%
-    variacion = random.uniform(1 - volatilidad, 1 + volatilidad)
+    variacion = aleatorio.uniform(1 - volatilidad, 1 + volatilidad)
     precio_final = int(precio_base * variacion)
     
     print(f"   • Fecha: {fecha_hoy.strftime('%Y-%m-%d')}")
@@ -0,0 +1,54 @@
+from functools import cached_property
+from typing import Dict, List, Tuple
+
+from productores.sipsa_service import SipsaService
+
+
+class ContextoGraficas:
+    """
+    Cómputo compartido por una solicitud de gráficas.
+
+    Carga los precios una sola vez y construye bajo demanda los índices que
+    comparten las gráficas: los precios filtrados por producto y la serie
+    ordenada por fecha de cada producto. Cada propiedad se calcula la primera
+    vez que una sección la usa, así que las secciones no solicitadas no
+    pagan por ella.
+    """
+
+    def __init__(self, sipsa_service: SipsaService = None, municipio: str = '', producto: str = ''):
+        self.sipsa_service = sipsa_service or SipsaService()
+        self.municipio = municipio
+        self.producto = producto
+
+    @cached_property
+    def precios_actuales(self) -> List[Dict]:
+        """
+        Precios del SIPSA sin filtrar (base de las tendencias por municipio)
+        """
+        return self.sipsa_service.obtener_precios_actuales()
+
+    @cached_property
+    def precios(self) -> List[Dict]:
+        """
+        Precios filtrados por el producto solicitado
+        """
+        if not self.producto:
+            return self.precios_actuales
+        producto = self.producto.upper()
+        return [p for p in self.precios_actuales if p.get('producto', '').upper() == producto]
+
+    @cached_property
+    def series(self) -> Dict[str, Tuple[List[str], List[int]]]:
+        """
+        Por producto, fechas en orden ascendente y su precio mayorista (el
+        último registro de una fecha prevalece)
+        """
+        agrupados: Dict[str, Dict[str, int]] = {}
+        for precio in self.precios:
+            agrupados.setdefault(precio['producto'], {})[precio['fecha']] = precio['precio_mayorista']
+
+        series = {}
+        for producto, precios_por_fecha in agrupados.items():
+            fechas = sorted(precios_por_fecha)
+            series[producto] = (fechas, [precios_por_fecha[fecha] for fecha in fechas])
+        return series
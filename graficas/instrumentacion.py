@@ -0,0 +1,67 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def nivel_tiempos() -> int:
+    """
+    Nivel de log de los tiempos por etapa (configurable con GRAFICAS_NIVEL_TIEMPOS)
+    """
+    return logging.getLevelName(str(getattr(settings, 'GRAFICAS_NIVEL_TIEMPOS', 'INFO')).upper())
+
+
+def volcado_habilitado() -> bool:
+    """
+    Los volcados de payloads solo se emiten con GRAFICAS_VOLCAR_DATOS activo
+    """
+    return bool(getattr(settings, 'GRAFICAS_VOLCAR_DATOS', False))
+
+
+class Cronometro:
+    """
+    Tiempos por etapa de una solicitud de gráficas.
+
+    Cada etapa se mide con `etapa(nombre)`; al final `registrar` emite un solo
+    registro de log con los milisegundos por etapa en `extra['etapas']` (para
+    formateadores estructurados o métricas) y `server_timing` los expone en la
+    cabecera Server-Timing. Los volcados de datos se evalúan solo si el
+    volcado está habilitado, así que en producción no cuestan nada.
+    """
+
+    def __init__(self, vista: str):
+        self.vista = vista
+        self.etapas: Dict[str, float] = {}
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nombre] = self.etapas.get(nombre, 0.0) + (time.perf_counter() - inicio) * 1000
+
+    @property
+    def total(self) -> float:
+        return (time.perf_counter() - self._inicio) * 1000
+
+    def volcar(self, etiqueta: str, datos) -> None:
+        if volcado_habilitado() and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s %s: %r", self.vista, etiqueta, datos)
+
+    def registrar(self, **contexto) -> None:
+        nivel = nivel_tiempos()
+        if not logger.isEnabledFor(nivel):
+            return
+        etapas = {nombre: round(ms, 2) for nombre, ms in self.etapas.items()}
+        detalle = ' '.join(f"{nombre}={ms:.1f}ms" for nombre, ms in etapas.items())
+        logger.log(nivel, "%s total=%.1fms %s", self.vista, self.total, detalle,
+                   extra={'vista': self.vista, 'etapas': etapas, 'total_ms': round(self.total, 2), **contexto})
+
+    def server_timing(self) -> str:
+        return ', '.join(f"{nombre};dur={ms:.1f}" for nombre, ms in self.etapas.items())
@@ -0,0 +1,144 @@
+from datetime import date, timedelta
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from productores.models import PrecioSipsa
+
+# Filas leídas por bloque al recorrer la tabla de precios
+TAMANO_BLOQUE = 100_000
+
+
+def indice_semana(fecha: date) -> int:
+    """
+    Número absoluto de la semana ISO (lunes a domingo) de la fecha: el
+    0001-01-01 es lunes, así que las semanas son continuas entre años
+    """
+    return (fecha.toordinal() - 1) // 7
+
+
+def lunes_de_semana(indice: int) -> date:
+    return date.fromordinal(indice * 7 + 1)
+
+
+class AcumuladorSemanal:
+    """
+    Promedio semanal de precios y cantidad de productos distintos por semana ISO.
+
+    Cada registro se ubica directamente en su semana por aritmética de
+    ordinales, sin recorrer ventanas: arreglos de suma y conteo indexados por
+    semana y una matriz booleana semana × producto que hace de máscara de
+    bits de productos distintos. El costo es lineal en la cantidad de
+    registros para cualquier rango de años.
+    """
+
+    def __init__(self, desde: date, hasta: date, factor_producto: Callable[[str], float] = None):
+        self.desde, self.hasta = desde.toordinal(), hasta.toordinal()
+        self.primera = indice_semana(desde)
+        self.semanas = indice_semana(hasta) - self.primera + 1
+        self.factor_producto = factor_producto
+        self.sumas = np.zeros(self.semanas)
+        self.conteos = np.zeros(self.semanas, dtype=np.int64)
+        self.presencia = np.zeros((self.semanas, 0), dtype=bool)
+        self._productos: Dict[str, int] = {}
+        self._factores: List[float] = []
+
+    def _indice_producto(self, producto: str) -> int:
+        indice = self._productos.get(producto)
+        if indice is None:
+            indice = self._productos[producto] = len(self._productos)
+            self._factores.append(self.factor_producto(producto) if self.factor_producto else 1.0)
+        return indice
+
+    def agregar(self, productos: Sequence[str], fechas: Sequence[date], precios: Sequence[float]) -> None:
+        """
+        Acumula un bloque de registros (producto, fecha, precio)
+        """
+        total = len(fechas)
+        if not total:
+            return
+
+        for producto in set(productos):
+            self._indice_producto(producto)
+        ordinales = np.fromiter(map(date.toordinal, fechas), dtype=np.int64, count=total)
+        semanas = (ordinales - 1) // 7 - self.primera
+        indices = np.fromiter(map(self._productos.__getitem__, productos), dtype=np.int64, count=total)
+        valores = np.asarray(precios, dtype=float) * np.asarray(self._factores)[indices]
+
+        validos = (ordinales >= self.desde) & (ordinales <= self.hasta)
+        semanas, indices, valores = semanas[validos], indices[validos], valores[validos]
+
+        self.sumas += np.bincount(semanas, weights=valores, minlength=self.semanas)
+        self.conteos += np.bincount(semanas, minlength=self.semanas)
+        if self.presencia.shape[1] < len(self._productos):
+            columnas = len(self._productos) - self.presencia.shape[1]
+            self.presencia = np.hstack([self.presencia, np.zeros((self.semanas, columnas), dtype=bool)])
+        self.presencia[semanas, indices] = True
+
+    def agregar_registros(self, registros: Iterable[Tuple[str, date, float]]) -> None:
+        """
+        Acumula registros de cualquier tamaño por bloques
+        """
+        registros = iter(registros)
+        while True:
+            bloque = list(islice(registros, TAMANO_BLOQUE))
+            if not bloque:
+                return
+            self.agregar(*(list(map(itemgetter(columna), bloque)) for columna in range(3)))
+
+    def series(self) -> Tuple[List[date], List[float], List[int]]:
+        """
+        Semanas con datos: (lunes de la semana, precio promedio, productos distintos)
+        """
+        con_datos = np.flatnonzero(self.conteos)
+        promedios = self.sumas[con_datos] / self.conteos[con_datos]
+        productos = self.presencia[con_datos].sum(axis=1)
+        return (
+            [lunes_de_semana(self.primera + int(s)) for s in con_datos],
+            [round(float(p), 2) for p in promedios],
+            [int(c) for c in productos],
+        )
+
+
+def tendencias_desde_diccionarios(precios: Iterable[Dict], desde: date, hasta: date,
+                                  factor_producto: Callable[[str], float] = None) -> AcumuladorSemanal:
+    """
+    Acumula precios en el formato de SipsaService (fecha 'AAAA-MM-DD');
+    los registros con fecha inválida se descartan
+    """
+    acumulador = AcumuladorSemanal(desde, hasta, factor_producto)
+
+    def registros():
+        for precio in precios:
+            try:
+                yield precio['producto'], date.fromisoformat(precio['fecha']), precio['precio_mayorista']
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    acumulador.agregar_registros(registros())
+    return acumulador
+
+
+def tendencias_desde_tabla(desde: date, hasta: date,
+                           factor_producto: Callable[[str], float] = None) -> AcumuladorSemanal:
+    """
+    Acumula el historial persistido de precios del SIPSA entre las fechas,
+    leyendo la tabla en bloques sin cargarla completa en memoria
+    """
+    acumulador = AcumuladorSemanal(desde, hasta, factor_producto)
+    registros = (PrecioSipsa.objects
+                 .filter(fecha__gte=desde, fecha__lte=hasta)
+                 .values_list('producto', 'fecha', 'precio_mayorista')
+                 .iterator(chunk_size=TAMANO_BLOQUE))
+    acumulador.agregar_registros(registros)
+    return acumulador
+
+
+def ventana_semestral(hoy: date = None) -> Tuple[date, date]:
+    """
+    Rango de los últimos 6 meses usado por las gráficas de tendencias
+    """
+    hoy = hoy or date.today()
+    return hoy - timedelta(days=180), hoy
@@ -1,3 +1,227 @@
-from django.test import TestCase
+import random
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from productores.models import PrecioSipsa
+
+from .contexto import ContextoGraficas
+from .instrumentacion import Cronometro
+from .tendencias import AcumuladorSemanal, indice_semana, lunes_de_semana, tendencias_desde_diccionarios, \
+    tendencias_desde_tabla
+from .views import GraficasDataView
+
+
+def tendencias_por_ventanas(registros, desde, hasta):
+    """
+    Referencia directa: recorre cada semana y filtra todos los registros
+    """
+    semanas, promedios, cantidades = [], [], []
+    lunes = desde - timedelta(days=desde.weekday())
+    while lunes <= hasta:
+        domingo = lunes + timedelta(days=6)
+        en_semana = [(p, v) for p, f, v in registros if lunes <= f <= domingo and desde <= f <= hasta]
+        if en_semana:
+            semanas.append(lunes)
+            promedios.append(round(sum(v for _, v in en_semana) / len(en_semana), 2))
+            cantidades.append(len({p for p, _ in en_semana}))
+        lunes += timedelta(days=7)
+    return semanas, promedios, cantidades
+
+
+class AcumuladorSemanalTests(SimpleTestCase):
+    """
+    Agrupación por semana ISO en una sola pasada
+    """
+
+    def test_semanas_iso_continuas_entre_anios(self):
+        # 2024-12-30 es el lunes de la semana ISO 1 de 2025
+        self.assertEqual(indice_semana(date(2025, 1, 5)), indice_semana(date(2024, 12, 30)))
+        self.assertEqual(lunes_de_semana(indice_semana(date(2025, 1, 1))), date(2024, 12, 30))
+        self.assertEqual(indice_semana(date(2025, 1, 6)) - indice_semana(date(2025, 1, 5)), 1)
+
+    def test_coincide_con_ventanas_en_historial_multianual(self):
+        aleatorio = random.Random(7)
+        desde, hasta = date(2022, 3, 10), date(2025, 2, 20)
+        registros = [(f"PRODUCTO {aleatorio.randrange(90)}",
+                      date(2022, 1, 1) + timedelta(days=aleatorio.randrange(1200)),
+                      aleatorio.randrange(500, 5000))
+                     for _ in range(5000)]
+
+        acumulador = AcumuladorSemanal(desde, hasta)
+        acumulador.agregar_registros(registros)
+
+        self.assertEqual(acumulador.series(), tendencias_por_ventanas(registros, desde, hasta))
+
+    def test_factor_por_producto_y_fechas_invalidas(self):
+        precios = [
+            {'producto': 'PAPA', 'fecha': '2025-03-03', 'precio_mayorista': 1000},
+            {'producto': 'PAPA', 'fecha': '2025-03-04', 'precio_mayorista': 2000},
+            {'producto': 'ARVEJA', 'fecha': '2025-03-05', 'precio_mayorista': 3000},
+            {'producto': 'ARVEJA', 'fecha': 'sin fecha', 'precio_mayorista': 9999},
+        ]
+        factores = {'PAPA': 2.0}
+
+        acumulador = tendencias_desde_diccionarios(precios, date(2025, 3, 1), date(2025, 3, 31),
+                                                   lambda producto: factores.get(producto, 1.0))
+
+        self.assertEqual(acumulador.series(), ([date(2025, 3, 3)], [3000.0], [2]))
+
+
+class TendenciasDesdeTablaTests(TestCase):
+    """
+    Lectura por bloques del historial persistido de precios
+    """
+
+    def test_lee_el_rango_de_la_tabla(self):
+        PrecioSipsa.objects.bulk_create([
+            PrecioSipsa(producto=producto, mercado='Corabastos', fecha=date(2024, 12, 23) + timedelta(days=d),
+                        precio_mayorista=1000 + d, precio_minorista=1200)
+            for producto in ('PAPA', 'CEBOLLA') for d in range(21)
+        ])
+
+        semanas, promedios, cantidades = tendencias_desde_tabla(date(2024, 12, 30), date(2025, 1, 31)).series()
+
+        self.assertEqual(semanas, [date(2024, 12, 30), date(2025, 1, 6)])
+        self.assertEqual(promedios, [1010.0, 1017.0])
+        self.assertEqual(cantidades, [2, 2])
+
+
+class InstrumentacionGraficasTests(TestCase):
+    """
+    Tiempos por etapa en logs y Server-Timing; sin prints ni volcados en producción
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def obtener(self):
+        with mock.patch('builtins.print') as imprimir:
+            respuesta = self.client.get(reverse('graficas_datos'), {'municipio': 'Madrid', 'producto': 'PAPA'})
+        imprimir.assert_not_called()
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta
+
+    def test_tiempos_por_etapa(self):
+        with self.assertLogs('graficas.instrumentacion', level='INFO') as registros:
+            respuesta = self.obtener()
+
+        registro = registros.records[-1]
+        self.assertEqual(list(registro.etapas), ['obtener', 'tendencias', 'filtrar', 'graficas', 'serializar'])
+        self.assertEqual(registro.municipio, 'Madrid')
+        self.assertEqual(registro.bytes, len(respuesta.content))
+        self.assertIn('serializar;dur=', respuesta['Server-Timing'])
+        self.assertFalse(any(r.levelname == 'DEBUG' for r in registros.records))
+
+    @override_settings(GRAFICAS_NIVEL_TIEMPOS='DEBUG')
+    def test_nivel_configurable(self):
+        with self.assertLogs('graficas.instrumentacion', level='DEBUG') as registros:
+            self.obtener()
+        self.assertEqual(registros.records[-1].levelname, 'DEBUG')
+
+    @override_settings(GRAFICAS_VOLCAR_DATOS=True)
+    def test_volcado_solo_con_bandera(self):
+        with self.assertLogs('graficas.instrumentacion', level='DEBUG') as registros:
+            self.obtener()
+        volcados = [r.getMessage() for r in registros.records if r.levelname == 'DEBUG']
+        self.assertTrue(any('tendencias' in mensaje for mensaje in volcados))
+
+    def test_sin_volcado_no_se_evalua_el_payload(self):
+        cronometro = Cronometro('prueba')
+        with mock.patch('graficas.instrumentacion.logger') as registro:
+            cronometro.volcar('datos', object())
+        registro.debug.assert_not_called()
+
+
+class ContextoGraficasTests(TestCase):
+    """
+    Un contexto por solicitud: precios cargados una vez y secciones a pedido
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_precios_cargados_una_sola_vez(self):
+        with mock.patch('graficas.views.SipsaService.obtener_precios_actuales',
+                        autospec=True, side_effect=lambda servicio, limit=1000: []) as obtener, \
+                mock.patch('graficas.views.SipsaService.__init__', autospec=True, return_value=None) as crear:
+            respuesta = self.client.get(reverse('graficas_datos'), {'municipio': 'Funza'})
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(obtener.call_count, 1)
+        self.assertEqual(crear.call_count, 1)
+
+    def test_solo_las_secciones_pedidas(self):
+        with mock.patch('graficas.views.GraficasDataView._procesar_tendencias') as tendencias, \
+                mock.patch('graficas.views.GraficasDataView._generar_comparativa_municipios') as comparativa:
+            datos = self.client.get(reverse('graficas_datos'),
+                                    {'sections': 'productos_top,estadisticas_mercado'}).json()
+
+        self.assertEqual(set(datos), {'productos_top', 'estadisticas_mercado', 'filtros_aplicados'})
+        tendencias.assert_not_called()
+        comparativa.assert_not_called()
+
+    def test_series_compartidas_por_producto(self):
+        contexto = ContextoGraficas(mock.Mock(), producto='papa')
+        contexto.precios_actuales = [
+            {'producto': 'PAPA', 'fecha': '2025-01-02', 'precio_mayorista': 20},
+            {'producto': 'PAPA', 'fecha': '2025-01-01', 'precio_mayorista': 10},
+            {'producto': 'ARVEJA', 'fecha': '2025-01-01', 'precio_mayorista': 30},
+        ]
+        self.assertEqual(contexto.series, {'PAPA': (['2025-01-01', '2025-01-02'], [10, 20])})
+
+    def test_seccion_desconocida(self):
+        respuesta = self.client.get(reverse('graficas_datos'), {'sections': 'productos_top,pastel'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('pastel', respuesta.json()['error'])
+
+
+class CacheHttpGraficasTests(TestCase):
+    """
+    Las APIs de gráficas responden 304 sin recalcular mientras no cambie el snapshot
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_304_en_graficas(self):
+        for nombre in ('graficas_datos', 'graficas_recomendaciones'):
+            url = reverse(nombre)
+            etag = self.client.get(url, {'municipio': 'Madrid'})['ETag']
+            with mock.patch('graficas.views.SipsaService') as servicio:
+                respuesta = self.client.get(url, {'municipio': 'Madrid'}, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(respuesta.status_code, 304)
+            servicio.assert_not_called()
+
+    def test_contenido_serializado_por_snapshot(self):
+        url = reverse('graficas_datos')
+        primera = self.client.get(url, {'municipio': 'Madrid'})
+
+        with mock.patch('graficas.views.SipsaService') as servicio, \
+                self.assertLogs('graficas.instrumentacion', level='INFO') as registros:
+            segunda = self.client.get(url, {'municipio': 'Madrid'})
+
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['Content-Type'], 'application/json')
+        self.assertTrue(registros.records[-1].desde_cache)
+        servicio.assert_not_called()
+
+    def test_evolucion_columnar(self):
+        series = {'PAPA': (['2025-01-01', '2025-01-08'], [10, 30]), 'ARVEJA': (['2025-01-08'], [50])}
+
+        evolucion = GraficasDataView()._generar_evolucion_precios(series)
+
+        self.assertEqual(evolucion, {'fechas': ['2025-01-01', '2025-01-08'], 'productos': ['PAPA', 'ARVEJA'],
+                                     'precios': [[10, 30], [None, 50]], 'precio_promedio': [20.0, 50.0]})
+
+    def test_errores_no_se_cachean(self):
+        with mock.patch('graficas.views.SipsaService', side_effect=RuntimeError('sin datos')), \
+                self.assertLogs('graficas.views', level='ERROR'):
+            respuesta = self.client.get(reverse('graficas_recomendaciones'))
+
+        self.assertEqual(respuesta.status_code, 500)
+        self.assertFalse(respuesta.has_header('ETag'))
+        self.assertIn('no-store', respuesta['Cache-Control'])
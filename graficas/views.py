@@ -1,56 +1,78 @@
+import logging
+
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
 import json
 from datetime import datetime, timedelta
+from productores.aleatoriedad import generador, semilla_estable
+from productores.cache_http import cache_por_snapshot
+from productores.matriz_recomendaciones import MatrizRecomendaciones
+from productores.serializacion import a_json, contenido_en_cache, guardar_contenido, respuesta_json, \
+    series_columnares
 from productores.sipsa_service import SipsaService
 
+from .contexto import ContextoGraficas
+from .instrumentacion import Cronometro
+from .tendencias import tendencias_desde_diccionarios, tendencias_desde_tabla, ventana_semestral
+
+logger = logging.getLogger(__name__)
+
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(cache_por_snapshot('graficas_datos'), name='get')
 class GraficasDataView(View):
     """
     Vista para proporcionar datos para gráficas basados en información del SIPSA
     """
     
+    # Secciones que puede pedir un cliente con ?sections=a,b (por defecto todas)
+    SECCIONES = ('precios_tendencia', 'productos_top', 'evolucion_precios', 'comparativa_municipios',
+                 'estadisticas_mercado', 'tendencias')
+
     def get(self, request):
+        cronometro = Cronometro('graficas_datos')
         try:
-            sipsa_service = SipsaService()
-            
             # Obtener parámetros de filtro
             municipio = request.GET.get('municipio', '')
             producto = request.GET.get('producto', '')
+            secciones = self._secciones_solicitadas(request)
+            desconocidas = [s for s in secciones if s not in self.SECCIONES]
+            if desconocidas:
+                return JsonResponse({'error': f"Secciones desconocidas: {', '.join(desconocidas)}",
+                                     'secciones_validas': list(self.SECCIONES)}, status=400)
             
-            # Obtener precios actuales del SIPSA
-            precios = sipsa_service.obtener_precios_actuales()
-            print("Datos de precios obtenidos:", len(precios), "registros")
+            # JSON ya serializado para este snapshot y estos parámetros
+            contenido = contenido_en_cache('graficas_datos', request)
+            if contenido is not None:
+                cronometro.registrar(municipio=municipio, producto=producto, secciones=','.join(secciones),
+                                     bytes=len(contenido), desde_cache=True)
+                return respuesta_json(contenido)
             
-            # Obtener recomendaciones para el gráfico de tendencias
-            recomendaciones = sipsa_service.obtener_productos_recomendados(municipio)
-            print("Datos de recomendaciones:", recomendaciones)
+            # Un solo contexto por solicitud: precios e índices compartidos por todas las gráficas
+            contexto = ContextoGraficas(SipsaService(), municipio, producto)
+            with cronometro.etapa('obtener'):
+                contexto.precios_actuales
             
-            # Filtrar por municipio si se especifica
-            if municipio:
-                print("Aplicando filtro de municipio:", municipio)
-                # Los datos de precios no tienen municipio, pero generaremos tendencias específicas
-                # basadas en el municipio seleccionado
-                print("Generando tendencias específicas para municipio:", municipio)
-            
-            # Procesar datos para el gráfico de tendencias (usar precios filtrados)
-            tendencias_data = self._procesar_tendencias(precios, municipio)
-            print("Datos de tendencias procesados:", tendencias_data)
+            # Procesar datos para el gráfico de tendencias; con municipio, las
+            # tendencias se ajustan a sus factores (los precios no tienen municipio)
+            if 'tendencias' in secciones:
+                with cronometro.etapa('tendencias'):
+                    tendencias_data = self._procesar_tendencias(contexto)
+                cronometro.volcar('tendencias', tendencias_data)
             
             # Filtrar por producto si se especifica
-            if producto:
-                print("Aplicando filtro de producto:", producto)
-                precios = [p for p in precios if p.get('producto', '').upper() == producto.upper()]
-                print("Datos de precios después de aplicar filtro de producto:", len(precios), "registros")
+            with cronometro.etapa('filtrar'):
+                precios = contexto.precios
             
-            # Procesar datos para gráficas
-            datos_graficas = self._procesar_datos_para_graficas(precios)
+            # Procesar solo las gráficas solicitadas
+            with cronometro.etapa('graficas'):
+                datos_graficas = self._procesar_datos_para_graficas(contexto, secciones)
             
             # Agregar información de tendencias a los datos gráficos
-            datos_graficas['tendencias'] = tendencias_data
-            print("Datos gráficos procesados:", datos_graficas)
+            if 'tendencias' in secciones:
+                datos_graficas['tendencias'] = tendencias_data
+            cronometro.volcar('datos_graficas', datos_graficas)
             
             # Agregar información de filtros aplicados
             datos_graficas['filtros_aplicados'] = {
@@ -59,71 +81,46 @@ class GraficasDataView(View):
                 'total_resultados': len(precios)
             }
             
-            return JsonResponse(datos_graficas)
+            with cronometro.etapa('serializar'):
+                contenido = a_json(datos_graficas)
+            guardar_contenido('graficas_datos', request, contenido)
+            respuesta = respuesta_json(contenido)
+            respuesta['Server-Timing'] = cronometro.server_timing()
+            cronometro.registrar(municipio=municipio, producto=producto, secciones=','.join(secciones),
+                                 precios=len(contexto.precios_actuales), resultados=len(precios),
+                                 bytes=len(contenido), desde_cache=False)
+            return respuesta
             
         except Exception as e:
+            logger.exception("Error generando datos de gráficas")
             return JsonResponse({'error': str(e)}, status=500)
     
-    def _procesar_tendencias(self, precios, municipio):
+    def _secciones_solicitadas(self, request):
+        """
+        Secciones pedidas en `sections` (separadas por comas o repetidas); todas si no se indica
+        """
+        secciones = [s.strip() for valor in request.GET.getlist('sections') for s in valor.split(',') if s.strip()]
+        return secciones or list(self.SECCIONES)
+    
+    def _procesar_tendencias(self, contexto):
         """
         Procesa datos de precios para generar tendencias temporales específicas por municipio.
-        Genera datos de evolución de precios por semana para los últimos 6 meses.
+        Genera datos de evolución de precios por semana ISO para los últimos 6 meses,
+        ubicando cada registro en su semana en una sola pasada.
         """
-        from datetime import datetime, timedelta
-        import random
-        
-        sipsa_service = SipsaService()
-        
-        # Agrupar precios por producto y fecha
-        productos_agrupados = {}
-        
-        for precio in precios:
-            producto = precio['producto']
-            fecha_str = precio['fecha']
-            
-            if producto not in productos_agrupados:
-                productos_agrupados[producto] = {}
-            
-            try:
-                fecha_obj = datetime.strptime(fecha_str, '%Y-%m-%d')
-                # Aplicar factor de municipio al precio
-                factor_municipio = sipsa_service._obtener_factor_municipio(municipio, producto)
-                precio_ajustado = precio['precio_mayorista'] * factor_municipio
-                productos_agrupados[producto][fecha_obj] = precio_ajustado
-            except:
-                continue
-        
-        # Generar datos de tendencias para los últimos 6 meses
-        fecha_fin = datetime.now()
-        fecha_inicio = fecha_fin - timedelta(days=180)  # 6 meses atrás
-        
-        # Crear semanas para el eje X
-        semanas = []
-        precios_promedio = []
-        cantidad_productos = []
-        
-        # Procesar por semanas
-        fecha_actual = fecha_inicio
-        while fecha_actual <= fecha_fin:
-            semana_fin = fecha_actual + timedelta(days=6)
-            
-            # Calcular precio promedio y cantidad de productos para esta semana
-            precios_semana = []
-            productos_semana = set()
-            
-            for producto, precios_por_fecha in productos_agrupados.items():
-                for fecha, precio_valor in precios_por_fecha.items():
-                    if fecha_actual <= fecha <= semana_fin:
-                        precios_semana.append(precio_valor)
-                        productos_semana.add(producto)
-            
-            if precios_semana:
-                precio_promedio_semana = sum(precios_semana) / len(precios_semana)
-                semanas.append(fecha_actual.strftime('%d/%m'))
-                precios_promedio.append(round(precio_promedio_semana, 2))
-                cantidad_productos.append(len(productos_semana))
-            
-            fecha_actual = semana_fin + timedelta(days=1)
+        municipio = contexto.municipio
+
+        def factor_municipio(producto):
+            return contexto.sipsa_service._obtener_factor_municipio(municipio, producto)
+
+        # Preferir el historial persistido por la ingesta; si no hay, usar los precios recibidos
+        desde, hasta = ventana_semestral()
+        acumulador = tendencias_desde_tabla(desde, hasta, factor_municipio)
+        if not acumulador.conteos.any():
+            acumulador = tendencias_desde_diccionarios(contexto.precios_actuales, desde, hasta, factor_municipio)
+
+        lunes, precios_promedio, cantidad_productos = acumulador.series()
+        semanas = [fecha.strftime('%d/%m') for fecha in lunes]
         
         # Si no hay suficientes datos, generar datos específicos para el municipio
         if len(semanas) < 4:
@@ -134,8 +131,8 @@ class GraficasDataView(View):
             base_precio = 2000
             if municipio:
                 # Usar el municipio como semilla para consistencia
-                semilla = hash(municipio) % 1000
-                random.seed(semilla)
+                semilla = semilla_estable('tendencias', municipio) % 1000
+                aleatorio = generador('tendencias', municipio)
                 
                 # Generar tendencia única y distintiva para cada municipio
                 precios_promedio = []
@@ -146,42 +143,42 @@ class GraficasDataView(View):
                 if patron_tendencia == 0:
                     # Tendencia ascendente fuerte
                     for i in range(6):
-                        precio = base_precio * (1.0 + (i * 0.15) + random.uniform(-0.05, 0.05))
+                        precio = base_precio * (1.0 + (i * 0.15) + aleatorio.uniform(-0.05, 0.05))
                         precios_promedio.append(round(precio, 2))
                 
                 elif patron_tendencia == 1:
                     # Tendencia descendente
                     for i in range(6):
-                        precio = base_precio * (1.2 - (i * 0.12) + random.uniform(-0.05, 0.05))
+                        precio = base_precio * (1.2 - (i * 0.12) + aleatorio.uniform(-0.05, 0.05))
                         precios_promedio.append(round(precio, 2))
                 
                 elif patron_tendencia == 2:
                     # Tendencia estable con variaciones
                     for i in range(6):
-                        precio = base_precio * (1.1 + random.uniform(-0.1, 0.1))
+                        precio = base_precio * (1.1 + aleatorio.uniform(-0.1, 0.1))
                         precios_promedio.append(round(precio, 2))
                 
                 else:
                     # Tendencia volátil
-                    precio_actual = base_precio * random.uniform(0.9, 1.1)
+                    precio_actual = base_precio * aleatorio.uniform(0.9, 1.1)
                     precios_promedio.append(round(precio_actual, 2))
                     for i in range(1, 6):
-                        variacion = random.uniform(-0.15, 0.15)
+                        variacion = aleatorio.uniform(-0.15, 0.15)
                         precio_actual = precio_actual * (1 + variacion)
                         precios_promedio.append(round(precio_actual, 2))
                 
                 # Cantidad de productos también específica por municipio
                 base_cantidad = 10
                 if "Facatativá" in municipio:
-                    cantidad_productos = [base_cantidad + random.randint(-2, 4) for _ in range(6)]
+                    cantidad_productos = [base_cantidad + aleatorio.randint(-2, 4) for _ in range(6)]
                 elif "Madrid" in municipio:
-                    cantidad_productos = [base_cantidad + random.randint(-1, 3) for _ in range(6)]
+                    cantidad_productos = [base_cantidad + aleatorio.randint(-1, 3) for _ in range(6)]
                 elif "Mosquera" in municipio:
-                    cantidad_productos = [base_cantidad + random.randint(-3, 2) for _ in range(6)]
+                    cantidad_productos = [base_cantidad + aleatorio.randint(-3, 2) for _ in range(6)]
                 elif "Funza" in municipio:
-                    cantidad_productos = [base_cantidad + random.randint(0, 5) for _ in range(6)]
+                    cantidad_productos = [base_cantidad + aleatorio.randint(0, 5) for _ in range(6)]
                 else:
-                    cantidad_productos = [base_cantidad + random.randint(-2, 3) for _ in range(6)]
+                    cantidad_productos = [base_cantidad + aleatorio.randint(-2, 3) for _ in range(6)]
             else:
                 # Datos genéricos si no hay municipio
                 precios_promedio = [1500, 1800, 1600, 2000, 2200, 2100]
@@ -194,77 +191,61 @@ class GraficasDataView(View):
             'municipio': municipio if municipio else 'Todos los municipios'
         }
     
-    def _procesar_datos_para_graficas(self, precios):
+    def _procesar_datos_para_graficas(self, contexto, secciones):
         """
-        Procesa los datos del SIPSA para generar información para gráficas lineales
+        Procesa los datos del SIPSA para generar información para gráficas lineales.
+        Solo se construyen las secciones solicitadas.
         """
-        # Agrupar precios por producto y fecha
-        productos_agrupados = {}
-        
-        for precio in precios:
-            producto = precio['producto']
-            fecha = precio['fecha']
-            
-            if producto not in productos_agrupados:
-                productos_agrupados[producto] = {}
-            
-            productos_agrupados[producto][fecha] = precio['precio_mayorista']
-        
-        # Preparar datos para gráficas lineales
-        graficas_data = {
-            'precios_tendencia': self._generar_grafica_tendencias(productos_agrupados),
-            'productos_top': self._generar_top_productos(productos_agrupados),
-            'evolucion_precios': self._generar_evolucion_precios(productos_agrupados),
-            'comparativa_municipios': self._generar_comparativa_municipios(),
-            'estadisticas_mercado': self._generar_estadisticas_mercado(precios)
+        generadores = {
+            'precios_tendencia': lambda: self._generar_grafica_tendencias(contexto.series),
+            'productos_top': lambda: self._generar_top_productos(contexto.series),
+            'evolucion_precios': lambda: self._generar_evolucion_precios(contexto.series),
+            'comparativa_municipios': lambda: self._generar_comparativa_municipios(contexto.sipsa_service),
+            'estadisticas_mercado': lambda: self._generar_estadisticas_mercado(contexto.precios),
         }
         
-        return graficas_data
+        # Preparar datos para gráficas lineales
+        return {seccion: generar() for seccion, generar in generadores.items() if seccion in secciones}
     
-    def _generar_grafica_tendencias(self, productos_agrupados):
+    def _generar_grafica_tendencias(self, series):
         """
         Genera datos para gráfica de tendencias de precios
         """
         tendencias = {}
         
-        for producto, precios_por_fecha in productos_agrupados.items():
-            if len(precios_por_fecha) >= 2:
-                fechas = sorted(precios_por_fecha.keys())
-                precios = [precios_por_fecha[fecha] for fecha in fechas]
+        for producto, (fechas, precios) in series.items():
+            # Calcular tendencia (último precio vs precio anterior)
+            if len(precios) >= 2:
+                ultimo_precio = precios[0]
+                precio_anterior = precios[1]
+                
+                if ultimo_precio > precio_anterior:
+                    tendencia = "subiendo"
+                elif ultimo_precio < precio_anterior:
+                    tendencia = "bajando"
+                else:
+                    tendencia = "estable"
+                
+                variacion = ((ultimo_precio - precio_anterior) / precio_anterior) * 100
                 
-                # Calcular tendencia (último precio vs precio anterior)
-                if len(precios) >= 2:
-                    ultimo_precio = precios[0]
-                    precio_anterior = precios[1]
-                    
-                    if ultimo_precio > precio_anterior:
-                        tendencia = "subiendo"
-                    elif ultimo_precio < precio_anterior:
-                        tendencia = "bajando"
-                    else:
-                        tendencia = "estable"
-                    
-                    variacion = ((ultimo_precio - precio_anterior) / precio_anterior) * 100
-                    
-                    tendencias[producto] = {
-                        'tendencia': tendencia,
-                        'variacion_porcentaje': round(variacion, 2),
-                        'ultimo_precio': ultimo_precio,
-                        'fecha_ultimo': fechas[0]
-                    }
+                tendencias[producto] = {
+                    'tendencia': tendencia,
+                    'variacion_porcentaje': round(variacion, 2),
+                    'ultimo_precio': ultimo_precio,
+                    'fecha_ultimo': fechas[0]
+                }
         
         return tendencias
     
-    def _generar_top_productos(self, productos_agrupados):
+    def _generar_top_productos(self, series):
         """
         Genera datos para top productos por rentabilidad
         """
         top_productos = []
         
-        for producto, precios_por_fecha in productos_agrupados.items():
-            if precios_por_fecha:
-                fechas = sorted(precios_por_fecha.keys(), reverse=True)
-                ultimo_precio = precios_por_fecha[fechas[0]] if fechas else 0
+        for producto, (fechas, precios) in series.items():
+            if precios:
+                ultimo_precio = precios[-1]
                 
                 # Simular rentabilidad basada en el precio (esto podría mejorarse)
                 rentabilidad_estimada = min(100, max(0, (ultimo_precio / 100) * 2))
@@ -273,7 +254,7 @@ class GraficasDataView(View):
                     'producto': producto,
                     'precio_actual': ultimo_precio,
                     'rentabilidad_estimada': round(rentabilidad_estimada, 1),
-                    'tendencia': self._obtener_tendencia_producto(precios_por_fecha)
+                    'tendencia': self._obtener_tendencia_producto(precios)
                 })
         
         # Ordenar por rentabilidad descendente
@@ -281,25 +262,18 @@ class GraficasDataView(View):
         
         return top_productos[:10]  # Top 10 productos
     
-    def _generar_evolucion_precios(self, productos_agrupados):
+    def _generar_evolucion_precios(self, series):
         """
-        Genera datos para gráfica de evolución de precios
+        Genera datos para gráfica de evolución de precios en formato columnar:
+        un eje de fechas común y, por producto, sus precios alineados a ese eje
         """
-        evolucion = {}
-        
-        for producto, precios_por_fecha in productos_agrupados.items():
-            fechas = sorted(precios_por_fecha.keys())
-            precios = [precios_por_fecha[fecha] for fecha in fechas]
-            
-            evolucion[producto] = {
-                'fechas': fechas,
-                'precios': precios,
-                'precio_promedio': round(sum(precios) / len(precios), 2) if precios else 0
-            }
+        evolucion = series_columnares(series)
+        evolucion['precio_promedio'] = [round(sum(precios) / len(precios), 2) if precios else 0
+                                        for _, precios in series.values()]
         
         return evolucion
     
-    def _generar_comparativa_municipios(self):
+    def _generar_comparativa_municipios(self, sipsa_service):
         """
         Genera datos para comparativa entre municipios (simulado)
         """
@@ -307,8 +281,6 @@ class GraficasDataView(View):
         municipios = ['Facatativá', 'Madrid', 'Mosquera', 'Funza']
         comparativa = {}
         
-        sipsa_service = SipsaService()
-        
         for municipio in municipios:
             # Simular precios por municipio usando el factor de municipio del servicio
             precios_simulados = []
@@ -347,16 +319,14 @@ class GraficasDataView(View):
             'fecha_actualizacion': datetime.now().strftime('%Y-%m-%d %H:%M')
         }
     
-    def _obtener_tendencia_producto(self, precios_por_fecha):
+    def _obtener_tendencia_producto(self, precios):
         """
         Determina la tendencia de un producto basado en sus precios históricos
+        (ordenados por fecha)
         """
-        if len(precios_por_fecha) < 2:
+        if len(precios) < 2:
             return "estable"
         
-        fechas = sorted(precios_por_fecha.keys())
-        precios = [precios_por_fecha[fecha] for fecha in fechas]
-        
         # Últimos 3 precios para determinar tendencia
         if len(precios) >= 3:
             ultimos_precios = precios[:3]
@@ -370,30 +340,46 @@ class GraficasDataView(View):
 
 # Vista adicional para datos específicos de recomendaciones
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(cache_por_snapshot('graficas_recomendaciones'), name='get')
 class GraficasRecomendacionesView(View):
     """
     Vista para datos de gráficas específicas de recomendaciones
     """
     
     def get(self, request):
+        cronometro = Cronometro('graficas_recomendaciones')
         try:
-            sipsa_service = SipsaService()
-            
             # Obtener parámetros de filtro
             municipio = request.GET.get('municipio', 'Facatativá')
             
-            # Obtener recomendaciones con filtro de municipio
-            recomendaciones = sipsa_service.obtener_productos_recomendados(municipio)
+            contenido = contenido_en_cache('graficas_recomendaciones', request)
+            if contenido is not None:
+                cronometro.registrar(municipio=municipio, bytes=len(contenido), desde_cache=True)
+                return respuesta_json(contenido)
             
-            datos_recomendaciones = {
-                'recomendaciones': recomendaciones,
-                'top_recomendados': self._procesar_top_recomendados(recomendaciones),
-                'rentabilidades': self._procesar_rentabilidades(recomendaciones)
-            }
+            sipsa_service = SipsaService()
+            
+            # Obtener recomendaciones precalculadas con filtro de municipio
+            with cronometro.etapa('obtener'):
+                recomendaciones = MatrizRecomendaciones(sipsa_service).obtener(municipio)
+            
+            with cronometro.etapa('graficas'):
+                datos_recomendaciones = {
+                    'recomendaciones': recomendaciones,
+                    'top_recomendados': self._procesar_top_recomendados(recomendaciones),
+                    'rentabilidades': self._procesar_rentabilidades(recomendaciones)
+                }
             
-            return JsonResponse(datos_recomendaciones)
+            with cronometro.etapa('serializar'):
+                contenido = a_json(datos_recomendaciones)
+            guardar_contenido('graficas_recomendaciones', request, contenido)
+            respuesta = respuesta_json(contenido)
+            respuesta['Server-Timing'] = cronometro.server_timing()
+            cronometro.registrar(municipio=municipio, bytes=len(contenido), desde_cache=False)
+            return respuesta
             
         except Exception as e:
+            logger.exception("Error generando datos de recomendaciones")
             return JsonResponse({'error': str(e)}, status=500)
     
     def _procesar_top_recomendados(self, recomendaciones):
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from .models import Productor, Cultivo
-from .models import BoletinPrecios
+from .models import BoletinPrecios, ClimaDiario, PrecioSipsa
 
 admin.site.register(BoletinPrecios)
 admin.site.register(Productor)
-admin.site.register(Cultivo)
\ No newline at end of file
+admin.site.register(Cultivo)
+admin.site.register(PrecioSipsa)
+admin.site.register(ClimaDiario)
@@ -0,0 +1,57 @@
+import hashlib
+import random
+
+import numpy as np
+
+# Constantes de SplitMix64
+_MASCARA_64 = (1 << 64) - 1
+_DORADO = 0x9E3779B97F4A7C15
+_MEZCLA_1 = 0xBF58476D1CE4E5B9
+_MEZCLA_2 = 0x94D049BB133111EB
+_ESCALA_53 = 1.0 / 9007199254740992.0
+
+
+def semilla_estable(*partes) -> int:
+    """
+    Semilla de 64 bits derivada de las partes de una clave.
+    A diferencia de `hash()`, no cambia entre procesos (PYTHONHASHSEED),
+    así que workers distintos generan los mismos valores para la misma clave.
+    """
+    clave = '\x1f'.join(str(parte) for parte in partes)
+    return int.from_bytes(hashlib.blake2b(clave.encode(), digest_size=8).digest(), 'little')
+
+
+def generador(*partes) -> random.Random:
+    """
+    Generador `random.Random` independiente para la clave; reemplaza a
+    `random.seed(...)` sobre el estado global, que no es seguro entre hilos
+    """
+    return random.Random(semilla_estable(*partes))
+
+
+def uniforme(semilla: int, contador: int, a: float, b: float) -> float:
+    """
+    Número pseudoaleatorio en [a, b) determinado solo por (semilla, contador).
+    No depende de estado global: el mismo par produce el mismo valor en
+    cualquier hilo o proceso, y `uniformes` lo reproduce vectorizado.
+    """
+    z = ((semilla ^ (contador * _DORADO)) + _DORADO) & _MASCARA_64
+    z = ((z ^ (z >> 30)) * _MEZCLA_1) & _MASCARA_64
+    z = ((z ^ (z >> 27)) * _MEZCLA_2) & _MASCARA_64
+    z ^= z >> 31
+    return a + (b - a) * ((z >> 11) * _ESCALA_53)
+
+
+def uniformes(semillas, contadores, a: float, b: float) -> np.ndarray:
+    """
+    Versión vectorizada de `uniforme`; `semillas` y `contadores` se combinan
+    por broadcasting de NumPy y el resultado coincide bit a bit con la escalar
+    """
+    semillas = np.asarray(semillas, dtype=np.uint64)
+    contadores = np.asarray(contadores, dtype=np.uint64)
+
+    z = (semillas ^ (contadores * np.uint64(_DORADO))) + np.uint64(_DORADO)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(_MEZCLA_1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(_MEZCLA_2)
+    z ^= z >> np.uint64(31)
+    return a + (b - a) * ((z >> np.uint64(11)).astype(np.float64) * _ESCALA_53)
@@ -0,0 +1,105 @@
+import hashlib
+from datetime import datetime, time, timedelta
+from functools import wraps
+from typing import Dict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.views.decorators.http import condition
+
+from .versiones import avanzar_version, estado_version
+
+CLAVE_SNAPSHOT = 'sipsa:snapshot'
+
+# Intervalo de la ingesta programada (ver DEPLOYMENT.md), en segundos
+INTERVALO_INGESTA = 6 * 3600
+
+
+def snapshot_precios(alias: str = 'default') -> Dict:
+    """
+    Versión del snapshot de precios vigente y el instante de la ingesta que lo creó
+    """
+    return estado_version(CLAVE_SNAPSHOT, alias)
+
+
+def avanzar_snapshot(alias: str = 'default', ahora: datetime = None) -> Dict:
+    """
+    Registra un snapshot nuevo tras una ingesta con cambios; invalida los
+    validadores HTTP (ETag / Last-Modified) de las APIs de precios y gráficas
+    """
+    return avanzar_version(CLAVE_SNAPSHOT, alias, ahora)
+
+
+def _inicio_de_hoy() -> datetime:
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+
+
+def ultima_modificacion(request, *args, **kwargs) -> datetime:
+    """
+    Las respuestas cambian con cada ingesta y con el día (precios simulados y
+    ventanas de fechas), así que se toma el más reciente de ambos
+    """
+    actualizado = snapshot_precios()['actualizado']
+    inicio_hoy = _inicio_de_hoy()
+    return max(actualizado, inicio_hoy) if actualizado else inicio_hoy
+
+
+def segundos_de_vigencia(ahora: datetime = None) -> int:
+    """
+    Segundos hasta la próxima ingesta esperada o el cambio de día, lo que ocurra primero
+    """
+    ahora = ahora or timezone.now()
+    intervalo = getattr(settings, 'SIPSA_INTERVALO_INGESTA', INTERVALO_INGESTA)
+    actualizado = snapshot_precios()['actualizado']
+    proxima_ingesta = actualizado + timedelta(seconds=intervalo) if actualizado else ahora + timedelta(seconds=intervalo)
+    cambio_de_dia = _inicio_de_hoy() + timedelta(days=1)
+    return max(0, int((min(proxima_ingesta, cambio_de_dia) - ahora).total_seconds()))
+
+
+def clave_snapshot(vista: str, request) -> str:
+    """
+    Identifica la respuesta de la vista según el snapshot, el día y los
+    parámetros de la consulta (base del ETag y del contenido serializado)
+    """
+    parametros = urlencode(sorted((clave, sorted(valores)) for clave, valores in request.GET.lists()), doseq=True)
+    base = f"{vista}:{snapshot_precios()['version']}:{timezone.localdate().isoformat()}:{parametros}"
+    return hashlib.sha1(base.encode()).hexdigest()
+
+
+def etag_por_snapshot(vista: str):
+    """
+    ETag de la vista según el snapshot, el día y los parámetros de la consulta
+    """
+    def etag(request, *args, **kwargs) -> str:
+        return clave_snapshot(vista, request)[:20]
+    return etag
+
+
+def cache_por_snapshot(vista: str):
+    """
+    GET condicional para APIs JSON que solo cambian con el snapshot de precios.
+
+    Agrega ETag y Last-Modified; si el cliente ya tiene la versión vigente
+    responde 304 sin ejecutar la vista. Cache-Control permite a un proxy
+    inverso servir la respuesta hasta la próxima ingesta, mientras que los
+    navegadores revalidan con el ETag. Las respuestas de error no se cachean.
+    """
+    def decorador(funcion):
+        condicional = condition(etag_func=etag_por_snapshot(vista), last_modified_func=ultima_modificacion)(funcion)
+
+        @wraps(funcion)
+        def envoltura(request, *args, **kwargs):
+            respuesta = condicional(request, *args, **kwargs)
+            if respuesta.status_code in (200, 304):
+                patch_cache_control(respuesta, public=True, max_age=0, must_revalidate=True,
+                                    s_maxage=segundos_de_vigencia())
+            else:
+                for cabecera in ('ETag', 'Last-Modified'):
+                    if respuesta.has_header(cabecera):
+                        del respuesta[cabecera]
+                add_never_cache_headers(respuesta)
+            return respuesta
+        return envoltura
+    return decorador
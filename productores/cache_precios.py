@@ -0,0 +1,117 @@
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+from django.core.cache import caches
+
+
+class CachePreciosCompartido:
+    """
+    Cache de precios compartido entre instancias y workers de gunicorn.
+    Se apoya en el framework de cache de Django (locmem, archivo o base de datos),
+    por lo que funciona sin servicios externos.
+
+    Cada entrada guarda los datos junto con su instante de expiración lógica. Al
+    vencer el TTL la entrada se conserva un tiempo de gracia adicional: un solo
+    worker obtiene el candado y refresca mientras los demás siguen sirviendo la
+    copia vencida (protección contra estampidas).
+    """
+
+    PREFIJO = 'sipsa:precios'
+
+    def __init__(self, alias: str = 'default', ttl: int = 3600,
+                 gracia: int = 600, timeout_candado: int = 60):
+        self.alias = alias
+        self.ttl = ttl
+        self.gracia = gracia
+        self.timeout_candado = timeout_candado
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _clave(self, clave: str) -> str:
+        return f"{self.PREFIJO}:{clave}"
+
+    def _clave_candado(self, clave: str) -> str:
+        return f"{self.PREFIJO}:{clave}:candado"
+
+    def adquirir_candado(self, clave: str) -> Optional[str]:
+        """
+        Toma el candado de la clave si está libre y retorna el token que lo
+        identifica (None si otro worker lo tiene)
+        """
+        token = uuid.uuid4().hex
+        return token if self.cache.add(self._clave_candado(clave), token, self.timeout_candado) else None
+
+    def liberar_candado(self, clave: str, token: str) -> None:
+        """
+        Libera el candado solo si sigue siendo nuestro: si expiró y otro worker
+        lo tomó, borrarlo dejaría entrar a un tercero a recalcular
+        """
+        clave_candado = self._clave_candado(clave)
+        if self.cache.get(clave_candado) == token:
+            self.cache.delete(clave_candado)
+
+    def leer(self, clave: str) -> Optional[Any]:
+        """
+        Retorna los datos almacenados (vigentes o vencidos) sin refrescar
+        """
+        entrada = self.cache.get(self._clave(clave))
+        return entrada['datos'] if entrada else None
+
+    def es_vigente(self, clave: str) -> bool:
+        """
+        Verifica si existe una entrada cuyo TTL no ha vencido
+        """
+        entrada = self.cache.get(self._clave(clave))
+        return bool(entrada) and entrada['expira'] > time.time()
+
+    def guardar(self, clave: str, datos: Any) -> None:
+        """
+        Almacena los datos con TTL lógico más el periodo de gracia
+        """
+        entrada = {'datos': datos, 'expira': time.time() + self.ttl}
+        self.cache.set(self._clave(clave), entrada, self.ttl + self.gracia)
+
+    def invalidar(self, clave: str) -> None:
+        """
+        Elimina explícitamente la entrada (por ejemplo tras una nueva ingesta)
+        """
+        self.cache.delete_many([self._clave(clave), self._clave_candado(clave)])
+
+    def obtener(self, clave: str, cargador: Callable[[], Any],
+                espera_maxima: float = 5.0) -> Any:
+        """
+        Obtiene los datos del cache o los recarga con `cargador`.
+        Solo el worker que adquiere el candado ejecuta el cargador; los demás
+        sirven la copia vencida o, si no existe, esperan brevemente a que aparezca.
+        Los resultados vacíos no se almacenan.
+        """
+        entrada = self.cache.get(self._clave(clave))
+        if entrada and entrada['expira'] > time.time():
+            return entrada['datos']
+
+        token = self.adquirir_candado(clave)
+        if token:
+            try:
+                datos = cargador()
+                if datos:
+                    self.guardar(clave, datos)
+                return datos
+            finally:
+                self.liberar_candado(clave, token)
+
+        # Otro worker está refrescando: servir la copia vencida si existe
+        if entrada:
+            return entrada['datos']
+
+        limite = time.time() + espera_maxima
+        while time.time() < limite:
+            time.sleep(0.1)
+            entrada = self.cache.get(self._clave(clave))
+            if entrada:
+                return entrada['datos']
+
+        # El refresco del otro worker tardó demasiado: cargar sin almacenar
+        return cargador()
@@ -0,0 +1,110 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .cache_precios import CachePreciosCompartido
+from .sesion_http import obtener_sesion
+
+# Municipios de la Sabana Occidental atendidos por el sistema
+MUNICIPIOS_SABANA = ['Facatativá', 'Madrid', 'Mosquera', 'El Rosal', 'Subachoque', 'Bojacá', 'Funza']
+
+URL_OPENWEATHER = "https://api.openweathermap.org/data/2.5/weather"
+
+
+class CacheClimaCompartido(CachePreciosCompartido):
+    """
+    Cache compartido de temperaturas actuales por municipio
+    """
+
+    PREFIJO = 'clima:openweather'
+
+
+def consultar_openweather(ciudad: str, api_key: str, timeout: int = 5) -> Optional[float]:
+    """
+    Temperatura actual (°C) de la ciudad usando la sesión HTTP compartida
+    """
+    respuesta = obtener_sesion().get(
+        URL_OPENWEATHER,
+        params={'q': f"{ciudad},CO", 'appid': api_key, 'units': 'metric', 'lang': 'es'},
+        timeout=timeout,
+    )
+    if respuesta.status_code == 200:
+        return round(respuesta.json()['main']['temp'], 1)
+    return None
+
+
+class ServicioClima:
+    """
+    Temperaturas actuales de OpenWeatherMap servidas desde un cache compartido.
+
+    Las vistas nunca esperan a la API: leen la última temperatura conocida y, si
+    está vencida, disparan en segundo plano un barrido concurrente de todos los
+    municipios. Un candado en el cache asegura un solo barrido a la vez entre
+    workers, de modo que el consumo es de 7 llamadas por TTL (cuota: 60/min).
+    """
+
+    # Vigencia de una lectura y tiempo adicional en que se sirve vencida
+    TTL = 600
+    GRACIA = 3 * 3600
+
+    def __init__(self, api_key: str = None, municipios: List[str] = None, alias: str = 'default'):
+        self.api_key = api_key if api_key is not None else os.getenv("OPENWEATHER_API_KEY")
+        self.municipios = municipios or MUNICIPIOS_SABANA
+        self.cache = CacheClimaCompartido(alias, ttl=self.TTL, gracia=self.GRACIA)
+
+    def temperatura_actual(self, ciudad: str) -> Optional[float]:
+        """
+        Última temperatura conocida de la ciudad (None si no hay datos)
+        """
+        if not self.api_key:
+            return None
+
+        temperatura = self.cache.leer(ciudad)
+        if temperatura is None or not self.cache.es_vigente(ciudad):
+            self.programar_refresco(ciudad)
+        return temperatura
+
+    def refrescar(self, municipios: List[str] = None) -> Dict[str, float]:
+        """
+        Consulta en paralelo la temperatura de los municipios y la guarda en el cache
+        """
+        municipios = municipios or self.municipios
+        if not self.api_key:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=len(municipios), thread_name_prefix='clima') as executor:
+            futuros = {ciudad: executor.submit(consultar_openweather, ciudad, self.api_key) for ciudad in municipios}
+
+        temperaturas = {}
+        for ciudad, futuro in futuros.items():
+            try:
+                temperatura = futuro.result()
+            except Exception:
+                continue
+            if temperatura is not None:
+                self.cache.guardar(ciudad, temperatura)
+                temperaturas[ciudad] = temperatura
+        return temperaturas
+
+    def programar_refresco(self, ciudad: str = None) -> bool:
+        """
+        Lanza un barrido en segundo plano si ningún otro worker lo está haciendo.
+        Una ciudad fuera de la lista de municipios se incluye en el barrido.
+        """
+        token = self.cache.adquirir_candado('barrido')
+        if not token:
+            return False
+
+        municipios = list(self.municipios)
+        if ciudad and ciudad not in municipios:
+            municipios.append(ciudad)
+
+        def barrido():
+            try:
+                self.refrescar(municipios)
+            finally:
+                self.cache.liberar_candado('barrido', token)
+
+        threading.Thread(target=barrido, name='clima-barrido', daemon=True).start()
+        return True
@@ -0,0 +1,98 @@
+import csv
+from datetime import date, datetime, timedelta
+from typing import Iterable, List
+
+from .aleatoriedad import generador
+from .clima import MUNICIPIOS_SABANA
+from .models import ClimaDiario
+
+# Temperatura media anual (°C) por municipio de la Sabana de Bogotá
+TEMPERATURAS_BASE = {
+    'Facatativá': 16.5,
+    'Madrid': 15.8,
+    'Mosquera': 16.8,
+    'El Rosal': 14.2,
+    'Subachoque': 13.5,
+    'Bojacá': 16.3,
+    'Funza': 16.1
+}
+
+# Desviación mensual respecto a la media anual (°C)
+VARIACION_ESTACIONAL = {
+    1: -2.0, 2: -1.5, 3: 0.0, 4: 1.5, 5: 1.0, 6: -0.5,
+    7: -1.5, 8: -1.0, 9: 0.0, 10: 0.8, 11: 0.5, 12: -1.8
+}
+
+
+def _como_fecha(fecha) -> date:
+    return fecha.date() if isinstance(fecha, datetime) else fecha
+
+
+def temperatura_simulada(ciudad: str, fecha) -> float:
+    """
+    Temperatura simulada con variación estacional y geográfica.
+    Determinística por (ciudad, fecha) en cualquier proceso.
+    """
+    temp_base = TEMPERATURAS_BASE.get(ciudad, 15.5)
+    variacion_mes = VARIACION_ESTACIONAL.get(fecha.month, 0)
+    variacion_diaria = generador('clima', ciudad, fecha.strftime('%Y-%m-%d')).uniform(-2.0, 2.0)
+
+    temperatura_final = temp_base + variacion_mes + variacion_diaria
+    return round(max(6.0, min(temperatura_final, 28.0)), 1)
+
+
+def temperatura_diaria(ciudad: str, fecha) -> float:
+    """
+    Temperatura del municipio en la fecha según la tabla de clima diario.
+    Si la fecha no está cargada se usa el mismo valor simulado que la tabla.
+    """
+    temperatura = (ClimaDiario.objects
+                   .filter(municipio=ciudad, fecha=_como_fecha(fecha))
+                   .values_list('temperatura', flat=True)
+                   .first())
+    if temperatura is None:
+        temperatura = temperatura_simulada(ciudad, fecha)
+    return temperatura
+
+
+def generar_clima_diario(desde: date, dias: int, municipios: Iterable[str] = None,
+                         tamano_lote: int = 1000) -> int:
+    """
+    Precalcula la temperatura simulada de cada municipio para `dias` días desde
+    `desde`. No reemplaza registros existentes (p. ej. los cargados desde CSV).
+    Retorna la cantidad de registros procesados.
+    """
+    municipios = list(municipios or MUNICIPIOS_SABANA)
+    registros = [
+        ClimaDiario(municipio=municipio, fecha=fecha, temperatura=temperatura_simulada(municipio, fecha),
+                    fuente=ClimaDiario.FUENTE_SIMULADA)
+        for municipio in municipios
+        for fecha in (desde + timedelta(days=d) for d in range(dias))
+    ]
+    ClimaDiario.objects.bulk_create(registros, batch_size=tamano_lote, ignore_conflicts=True)
+    return len(registros)
+
+
+def cargar_clima_csv(archivo, tamano_lote: int = 1000) -> int:
+    """
+    Carga temperaturas diarias desde un CSV con columnas municipio, fecha
+    (AAAA-MM-DD) y temperatura, por ejemplo normales climatológicas del IDEAM.
+    Los registros existentes se actualizan. Retorna la cantidad cargada.
+    """
+    registros: List[ClimaDiario] = []
+    for fila in csv.DictReader(archivo):
+        registros.append(ClimaDiario(
+            municipio=fila['municipio'].strip(),
+            fecha=date.fromisoformat(fila['fecha'].strip()),
+            temperatura=float(fila['temperatura']),
+            fuente=ClimaDiario.FUENTE_CSV,
+        ))
+
+    ClimaDiario.objects.bulk_create(
+        registros,
+        batch_size=tamano_lote,
+        update_conflicts=True,
+        unique_fields=['municipio', 'fecha'],
+        update_fields=['temperatura', 'fuente'],
+    )
+    return len(registros)
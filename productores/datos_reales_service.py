@@ -83,9 +83,9 @@ class DatosRealesService:
         precios = []
         fecha_hoy = datetime.now()
         
-        # Usar fecha como semilla para consistencia diaria
+        # Usar fecha como semilla para consistencia diaria (generador propio, sin estado global)
         semilla_diaria = int(fecha_hoy.strftime('%Y%m%d'))
-        random.seed(semilla_diaria)
+        aleatorio = random.Random(semilla_diaria)
         
         for producto, info in self.precios_reales_base.items():
             # Generar historial de 7 días
@@ -93,7 +93,7 @@ class DatosRealesService:
                 fecha = fecha_hoy - timedelta(days=i)
                 
                 # Precio base con variación diaria realista
-                variacion_diaria = random.uniform(1 - info['volatilidad'], 1 + info['volatilidad'])
+                variacion_diaria = aleatorio.uniform(1 - info['volatilidad'], 1 + info['volatilidad'])
                 precio_actual = int(info['precio_base'] * variacion_diaria)
                 
                 # Asegurar que esté dentro del rango realista
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+
+from .models import PrecioSipsa
+from .sesion_http import obtener_sesion
+
+# Los validadores HTTP se conservan una semana; si expiran se descarga completo
+DURACION_VALIDADORES = 7 * 24 * 3600
+
+
+class ResultadoDescarga:
+    """
+    Resultado de descargar un endpoint del SIPSA.
+    `no_modificado` indica que el servidor respondió 304 (sin cambios).
+    """
+
+    def __init__(self, url: str = None, precios: List[Dict] = None, no_modificado: bool = False,
+                 validadores: Dict = None, metricas: Dict = None):
+        self.url = url
+        self.precios = precios or []
+        self.no_modificado = no_modificado
+        self.validadores = validadores or {}
+        self.metricas = metricas
+
+
+def _clave_validadores(url: str) -> str:
+    return 'sipsa:validadores:' + hashlib.sha1(url.encode()).hexdigest()
+
+
+def hay_precios_guardados() -> bool:
+    """
+    Con la tabla de precios vacía (base nueva o truncada) se descarga completo:
+    un 304 dejaría la tabla sin datos indefinidamente
+    """
+    return PrecioSipsa.objects.exists()
+
+
+def solicitar_condicional(url: str, timeout: int = 15, stream: bool = False, condicional: bool = None):
+    """
+    GET con la sesión compartida enviando If-None-Match / If-Modified-Since
+    según los validadores de la última descarga confirmada de la URL.
+    `condicional` indica si se envían; por defecto, solo si hay precios guardados.
+    """
+    if condicional is None:
+        condicional = hay_precios_guardados()
+    headers = {}
+    validadores = (cache.get(_clave_validadores(url)) or {}) if condicional else {}
+    if validadores.get('etag'):
+        headers['If-None-Match'] = validadores['etag']
+    if validadores.get('last_modified'):
+        headers['If-Modified-Since'] = validadores['last_modified']
+
+    return obtener_sesion().get(url, headers=headers, timeout=timeout, stream=stream)
+
+
+def validadores_de(response) -> Dict:
+    """
+    Extrae ETag y Last-Modified de la respuesta
+    """
+    validadores = {}
+    if response.headers.get('ETag'):
+        validadores['etag'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        validadores['last_modified'] = response.headers['Last-Modified']
+    return validadores
+
+
+def confirmar_validadores(resultado: Optional[ResultadoDescarga]) -> None:
+    """
+    Guarda los validadores una vez que los datos descargados fueron persistidos,
+    para que la próxima solicitud sin cambios se resuelva con un 304
+    """
+    if resultado and resultado.url and resultado.validadores:
+        cache.set(_clave_validadores(resultado.url), resultado.validadores, DURACION_VALIDADORES)
+
+
+class DescargadorSipsa:
+    """
+    Consulta en paralelo los endpoints del SIPSA y se queda con el primer
+    resultado válido: una respuesta 304 o una lista de precios no vacía.
+    Un endpoint lento o caído ya no retrasa a los demás.
+    """
+
+    def __init__(self, sipsa_service, timeout: int = 15):
+        self.sipsa_service = sipsa_service
+        self.timeout = timeout
+
+    def descargar(self, urls: List[str]) -> ResultadoDescarga:
+        detener = threading.Event()
+        # Se consulta la tabla antes de lanzar los hilos, que no comparten la conexión
+        condicional = hay_precios_guardados()
+        executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix='sipsa')
+        futuros = [executor.submit(self._descargar_endpoint, url, detener, condicional) for url in urls]
+        ganador = ResultadoDescarga()
+
+        try:
+            for futuro in as_completed(futuros):
+                try:
+                    resultado = futuro.result()
+                except Exception:
+                    continue
+                if resultado.no_modificado or resultado.precios:
+                    ganador = resultado
+                    break
+        finally:
+            # Los endpoints que siguen descargando se detienen en la siguiente fila
+            detener.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return ganador
+
+    def _descargar_endpoint(self, url: str, detener: threading.Event, condicional: bool = True) -> ResultadoDescarga:
+        es_json = 'json' in url
+        with solicitar_condicional(url, timeout=self.timeout, stream=not es_json, condicional=condicional) as response:
+            if response.status_code == 304:
+                return ResultadoDescarga(url, no_modificado=True)
+            response.raise_for_status()
+
+            metricas = self.sipsa_service._nuevas_metricas()
+            if es_json:
+                precios = self.sipsa_service._procesar_json_sipsa(response.json(), metricas)
+            else:
+                precios = []
+                for precio_info in self.sipsa_service._procesar_csv_stream(response, metricas):
+                    if detener.is_set():
+                        return ResultadoDescarga(url)
+                    precios.append(precio_info)
+
+            return ResultadoDescarga(url, precios, validadores=validadores_de(response), metricas=metricas)
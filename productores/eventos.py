@@ -0,0 +1,124 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .clima import MUNICIPIOS_SABANA
+from .models import EventoRecomendacion, ResumenEventosDiario
+from .registro_solicitudes import obtener_escritor
+from .sipsa_service import SipsaService
+
+# Catálogos de ids compactos: posición + 1; el 0 agrupa valores desconocidos
+MUNICIPIOS = tuple(MUNICIPIOS_SABANA)
+PRODUCTOS = tuple(SipsaService.PRODUCTOS_BASE)
+OTRO = 'Otro'
+
+
+def id_municipio(nombre: str) -> int:
+    return MUNICIPIOS.index(nombre) + 1 if nombre in MUNICIPIOS else 0
+
+
+def id_producto(nombre: str) -> int:
+    return PRODUCTOS.index(nombre) + 1 if nombre in PRODUCTOS else 0
+
+
+def nombre_municipio(identificador: int) -> str:
+    return MUNICIPIOS[identificador - 1] if 0 < identificador <= len(MUNICIPIOS) else OTRO
+
+
+def nombre_producto(identificador: int) -> str:
+    return PRODUCTOS[identificador - 1] if 0 < identificador <= len(PRODUCTOS) else OTRO
+
+
+def _inicio_del_dia(dia: date) -> datetime:
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def registrar_recomendaciones_mostradas(usuario_id: Optional[int], municipio: str,
+                                        recomendaciones: Iterable[Dict]) -> None:
+    """
+    Encola un evento por producto recomendado; se escriben en lote en segundo plano
+    """
+    ahora = timezone.now()
+    municipio_id = id_municipio(municipio)
+    obtener_escritor(EventoRecomendacion).registrar(
+        EventoRecomendacion(
+            usuario_id=usuario_id,
+            municipio=municipio_id,
+            producto=id_producto(rec['producto']),
+            puntaje=round(rec['rentabilidad_estimada'] * 10),
+            fecha=ahora,
+        )
+        for rec in recomendaciones
+    )
+
+
+def compactar_eventos(retencion_dias: int = 30, hoy: date = None) -> Tuple[int, int]:
+    """
+    Resume por día, municipio y producto todos los eventos de días cerrados y
+    elimina los eventos crudos con más de `retencion_dias`. Los días dentro de
+    la retención se recalculan en cada ejecución, así que los eventos que
+    llegan tarde quedan incluidos. Retorna (filas de resumen, eventos eliminados).
+    """
+    hoy = hoy or timezone.localdate()
+    inicio_hoy = _inicio_del_dia(hoy)
+    limite_retencion = _inicio_del_dia(hoy - timedelta(days=retencion_dias))
+
+    resumen = (EventoRecomendacion.objects
+               .filter(fecha__lt=inicio_hoy)
+               .annotate(dia=TruncDate('fecha'))
+               .values('dia', 'municipio', 'producto')
+               .annotate(eventos=Count('id'), usuarios=Count('usuario_id', distinct=True),
+                         suma_puntaje=Sum('puntaje')))
+    filas = [ResumenEventosDiario(**fila) for fila in resumen]
+
+    with transaction.atomic():
+        ResumenEventosDiario.objects.bulk_create(
+            filas,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['dia', 'municipio', 'producto'],
+            update_fields=['eventos', 'usuarios', 'suma_puntaje'],
+        )
+        eliminados, _ = EventoRecomendacion.objects.filter(fecha__lt=limite_retencion).delete()
+
+    return len(filas), eliminados
+
+
+def productos_mas_recomendados(dias: int = 30, limite: int = 5, hoy: date = None) -> List[Dict]:
+    """
+    Productos más recomendados en los últimos `dias`: lee el resumen diario y
+    solo los eventos crudos posteriores al último día compactado
+    """
+    hoy = hoy or timezone.localdate()
+    desde = hoy - timedelta(days=dias)
+
+    ultimo_resumido = ResumenEventosDiario.objects.aggregate(ultimo=Max('dia'))['ultimo']
+    inicio_crudos = max(desde, ultimo_resumido + timedelta(days=1)) if ultimo_resumido else desde
+
+    totales: Dict[int, List[int]] = {}
+    resumidos = (ResumenEventosDiario.objects
+                 .filter(dia__gte=desde, dia__lt=inicio_crudos)
+                 .values('producto')
+                 .annotate(total=Sum('eventos'), puntaje=Sum('suma_puntaje')))
+    crudos = (EventoRecomendacion.objects
+              .filter(fecha__gte=_inicio_del_dia(inicio_crudos))
+              .values('producto')
+              .annotate(total=Count('id'), puntaje=Sum('puntaje')))
+    for fila in list(resumidos) + list(crudos):
+        acumulado = totales.setdefault(fila['producto'], [0, 0])
+        acumulado[0] += fila['total']
+        acumulado[1] += fila['puntaje'] or 0
+
+    ranking = sorted(totales.items(), key=lambda item: item[1][0], reverse=True)[:limite]
+    return [
+        {
+            'producto': nombre_producto(producto),
+            'total': total,
+            'rentabilidad_promedio': round(puntaje / total / 10, 1),
+        }
+        for producto, (total, puntaje) in ranking
+    ]
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from .cache_http import avanzar_snapshot
+from .matriz_recomendaciones import MatrizRecomendaciones
+from .models import PrecioSipsa
+from .sipsa_service import SipsaService
+
+CAMPOS_ACTUALIZABLES = [
+    'variedad', 'precio_mayorista', 'precio_minorista',
+    'unidad', 'presentacion', 'actualizado',
+]
+
+
+def _crear_registro(precio: Dict) -> PrecioSipsa:
+    fecha = precio['fecha_obj']
+    if isinstance(fecha, datetime):
+        fecha = fecha.date()
+    return PrecioSipsa(
+        producto=precio['producto'][:100],
+        mercado=str(precio['mercado'])[:100],
+        fecha=fecha,
+        variedad=str(precio.get('variedad') or 'Estándar')[:100],
+        precio_mayorista=precio['precio_mayorista'],
+        precio_minorista=precio['precio_minorista'],
+        unidad=str(precio.get('unidad') or 'KILO')[:50],
+        presentacion=str(precio.get('presentacion') or 'BULTO')[:100],
+    )
+
+
+def _escribir_lote(registros: List[PrecioSipsa]) -> None:
+    PrecioSipsa.objects.bulk_create(
+        registros,
+        update_conflicts=True,
+        unique_fields=['producto', 'mercado', 'fecha'],
+        update_fields=CAMPOS_ACTUALIZABLES,
+    )
+
+
+def guardar_precios(precios: Iterable[Dict], tamano_lote: int = 1000) -> int:
+    """
+    Inserta o actualiza en lotes los precios normalizados del SIPSA.
+    Un registro se identifica por (producto, mercado, fecha); dentro de un lote
+    el último gana. Consume `precios` de forma incremental, por lo que acepta
+    generadores de tamaño arbitrario. Retorna la cantidad de registros escritos.
+    """
+    total = 0
+    lote = {}
+    for precio in precios:
+        registro = _crear_registro(precio)
+        lote[(registro.producto, registro.mercado, registro.fecha)] = registro
+        if len(lote) >= tamano_lote:
+            _escribir_lote(list(lote.values()))
+            total += len(lote)
+            lote = {}
+
+    if lote:
+        _escribir_lote(list(lote.values()))
+        total += len(lote)
+
+    return total
+
+
+def ingestar_precios_sipsa(sipsa_service=None, completo: bool = False) -> int:
+    """
+    Descarga los precios del SIPSA, los persiste e invalida el cache compartido
+    para que las vistas lean la nueva información desde la tabla local. También
+    avanza la versión de la matriz de recomendaciones precalculadas y la del
+    snapshot de precios usada por los validadores HTTP de las APIs.
+    Con `completo=True` procesa en streaming el dataset nacional completo.
+    Si el SIPSA responde 304 (sin cambios) no se escribe nada.
+    """
+    if sipsa_service is None:
+        sipsa_service = SipsaService()
+
+    if completo:
+        precios = sipsa_service.iterar_precios_csv()
+    else:
+        precios = sipsa_service._descargar_precios_sipsa()
+
+    total = guardar_precios(precios)
+    sipsa_service.confirmar_descarga()
+    if total:
+        sipsa_service.invalidar_cache()
+        MatrizRecomendaciones(sipsa_service).invalidar()
+        avanzar_snapshot()
+    return total
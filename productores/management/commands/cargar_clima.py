@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from productores.clima_historico import cargar_clima_csv, generar_clima_diario
+
+
+class Command(BaseCommand):
+    help = 'Llena la tabla de clima diario por municipio (simulado o desde un CSV de normales)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde', type=date.fromisoformat, default=None,
+            help='Fecha inicial AAAA-MM-DD (por defecto, hace un año)',
+        )
+        parser.add_argument(
+            '--dias', type=int, default=365 + 180,
+            help='Cantidad de días a generar desde la fecha inicial',
+        )
+        parser.add_argument(
+            '--csv', default=None,
+            help='Archivo CSV con columnas municipio, fecha, temperatura; reemplaza los valores simulados',
+        )
+
+    def handle(self, *args, **options):
+        if options['csv']:
+            with open(options['csv'], newline='', encoding='utf-8') as archivo:
+                total = cargar_clima_csv(archivo)
+            self.stdout.write(self.style.SUCCESS(f"Clima cargado desde CSV: {total} registros"))
+            return
+
+        desde = options['desde'] or date.today() - timedelta(days=365)
+        total = generar_clima_diario(desde, options['dias'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Clima diario generado: {total} registros desde {desde.isoformat()}"
+        ))
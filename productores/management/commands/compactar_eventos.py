@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from productores.eventos import compactar_eventos
+
+
+class Command(BaseCommand):
+    help = 'Resume por día los eventos de recomendación y elimina los eventos crudos antiguos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retencion', type=int, default=30,
+            help='Días de eventos crudos que se conservan',
+        )
+
+    def handle(self, *args, **options):
+        resumidos, eliminados = compactar_eventos(options['retencion'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Eventos compactados: {resumidos} filas de resumen, {eliminados} eventos crudos eliminados"
+        ))
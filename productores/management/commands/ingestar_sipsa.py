@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from productores.ingesta import ingestar_precios_sipsa
+from productores.sipsa_service import SipsaService
+
+
+class Command(BaseCommand):
+    help = 'Descarga los precios del SIPSA y los persiste en la tabla local de precios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=int, default=0,
+            help='Minutos entre ingestas; si es 0 se ejecuta una sola vez (para cron)',
+        )
+        parser.add_argument(
+            '--completo', action='store_true',
+            help='Procesa en streaming el CSV nacional completo en lugar de los últimos registros',
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo']
+
+        while True:
+            inicio = time.monotonic()
+            try:
+                sipsa_service = SipsaService()
+                total = ingestar_precios_sipsa(sipsa_service, completo=options['completo'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Ingesta SIPSA completada: {total} registros en {time.monotonic() - inicio:.1f}s"
+                ))
+                self._reportar_metricas(sipsa_service.metricas_ingesta)
+            except Exception as e:
+                self.stderr.write(f"Error en la ingesta SIPSA: {e}")
+
+            if not intervalo:
+                break
+            time.sleep(intervalo * 60)
+
+    def _reportar_metricas(self, metricas):
+        if not metricas:
+            return
+        self.stdout.write(
+            f"Filas leídas: {metricas['filas_leidas']} | "
+            f"registros válidos: {metricas['registros_validos']} | "
+            f"fechas inválidas: {metricas['fechas_invalidas']}"
+        )
+        if metricas['fechas_invalidas']:
+            self.stderr.write(self.style.WARNING(
+                f"{metricas['fechas_invalidas']} registros sin fecha válida quedaron con la fecha actual"
+            ))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from productores.matriz_recomendaciones import MatrizRecomendaciones
+
+
+class Command(BaseCommand):
+    help = 'Precalcula las recomendaciones por municipio, día y temperatura en el cache compartido'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=int, default=0,
+            help='Minutos entre actualizaciones; si es 0 se ejecuta una sola vez (para cron)',
+        )
+        parser.add_argument(
+            '--completo', action='store_true',
+            help='Invalida la matriz vigente y recalcula todo el horizonte',
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo']
+        matriz = MatrizRecomendaciones()
+        if options['completo']:
+            matriz.invalidar()
+
+        while True:
+            inicio = time.monotonic()
+            try:
+                calculadas = matriz.actualizar()
+                self.stdout.write(self.style.SUCCESS(
+                    f"Matriz de recomendaciones actualizada: {calculadas} días-municipio calculados "
+                    f"en {time.monotonic() - inicio:.1f}s"
+                ))
+            except Exception as e:
+                self.stderr.write(f"Error al precalcular recomendaciones: {e}")
+
+            if not intervalo:
+                break
+            time.sleep(intervalo * 60)
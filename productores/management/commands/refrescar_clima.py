@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from productores.clima import ServicioClima
+
+
+class Command(BaseCommand):
+    help = 'Consulta en un solo barrido la temperatura actual de los municipios y la guarda en el cache compartido'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=int, default=0,
+            help='Minutos entre barridos; si es 0 se ejecuta una sola vez (para cron)',
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo']
+        servicio = ServicioClima()
+        if not servicio.api_key:
+            self.stderr.write("OPENWEATHER_API_KEY no está configurada")
+            return
+
+        while True:
+            inicio = time.monotonic()
+            temperaturas = servicio.refrescar()
+            self.stdout.write(self.style.SUCCESS(
+                f"Clima actualizado: {len(temperaturas)}/{len(servicio.municipios)} municipios "
+                f"en {time.monotonic() - inicio:.1f}s"
+            ))
+
+            if not intervalo:
+                break
+            time.sleep(intervalo * 60)
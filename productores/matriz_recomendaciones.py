@@ -0,0 +1,199 @@
+import hashlib
+import math
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import caches
+
+from .recomendaciones_lote import EvaluadorLote
+from .versiones import avanzar_version, leer_version
+
+
+class MatrizRecomendaciones:
+    """
+    Recomendaciones precalculadas por municipio × día × temperatura.
+
+    Cada entrada del cache corresponde a un (municipio, día) y guarda el top 10
+    de todas las temperaturas de la grilla (buckets de 0.5 °C), de modo que una
+    consulta es una sola lectura por clave. Las claves incluyen la versión del
+    snapshot de precios y el mes de costos: al ingerir precios nuevos la versión
+    avanza y `actualizar` recalcula solo los días que faltan para la versión
+    vigente (en el día a día, solo el día que entra al horizonte).
+    """
+
+    PREFIJO = 'recomendaciones'
+
+    # Días hacia adelante que se mantienen precalculados
+    HORIZONTE_DIAS = 180
+
+    # Grilla de temperaturas (°C): mismo rango que el clima simulado
+    TEMPERATURA_MINIMA = 6.0
+    TEMPERATURA_MAXIMA = 28.0
+    PASO_TEMPERATURA = 0.5
+
+    def __init__(self, sipsa_service=None, alias: str = 'default'):
+        self.evaluador = EvaluadorLote(sipsa_service)
+        self.sipsa_service = self.evaluador.sipsa_service
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def municipios(self) -> List[str]:
+        return list(self.sipsa_service.FACTORES_MUNICIPIO)
+
+    # --- Claves y versiones ---
+
+    def version(self) -> int:
+        return leer_version(f"{self.PREFIJO}:version", self.alias)
+
+    def invalidar(self) -> None:
+        """
+        Avanza la versión del snapshot de precios; las entradas anteriores
+        dejan de usarse y expiran solas
+        """
+        avanzar_version(f"{self.PREFIJO}:version", self.alias)
+
+    def _clave(self, municipio: str, dia: date, version: int, mes_costos: int) -> str:
+        # El nombre del municipio puede tener espacios: se usa su hash en la clave
+        municipio = hashlib.sha1(municipio.encode()).hexdigest()[:12]
+        return f"{self.PREFIJO}:{version}:{mes_costos}:{municipio}:{dia.isoformat()}"
+
+    def bucket(self, temperatura: Optional[float]) -> Optional[int]:
+        """
+        Índice del bucket de temperatura (en medios grados), None sin datos de clima
+        """
+        if temperatura is None:
+            return None
+        return math.floor(temperatura / self.PASO_TEMPERATURA + 0.5)
+
+    def temperatura_bucket(self, bucket: Optional[int]) -> Optional[float]:
+        return None if bucket is None else bucket * self.PASO_TEMPERATURA
+
+    def buckets(self) -> List[Optional[int]]:
+        inicio = self.bucket(self.TEMPERATURA_MINIMA)
+        fin = self.bucket(self.TEMPERATURA_MAXIMA)
+        return [None] + list(range(inicio, fin + 1))
+
+    # --- Cálculo ---
+
+    def _calcular_dias(self, municipios: Iterable[str], dias: List[date], mes_costos: int) -> Dict:
+        """
+        Evalúa en lote los días indicados y retorna {(municipio, día): {bucket: filas}}
+        """
+        municipios = list(municipios)
+        buckets = self.buckets()
+        fechas = [datetime.combine(dia, datetime.min.time()) for dia in dias]
+        resultado = self.evaluador.evaluar(municipios, fechas, [self.temperatura_bucket(b) for b in buckets],
+                                           mes_costos)
+        indices = {producto: p for p, producto in enumerate(resultado.productos)}
+
+        entradas = {}
+        for m, municipio in enumerate(municipios):
+            for f, dia in enumerate(dias):
+                entradas[(municipio, dia)] = {
+                    bucket: [self._comprimir(rec, indices) for rec in resultado.recomendaciones(m, f, t)]
+                    for t, bucket in enumerate(buckets)
+                }
+        return entradas
+
+    def _comprimir(self, recomendacion: Dict, indices: Dict) -> tuple:
+        # Solo se guardan los campos que dependen de los precios; el resto se reconstruye
+        return (indices[recomendacion['producto']], recomendacion['precio_actual'],
+                recomendacion['precio_promedio'], recomendacion['tendencia'],
+                recomendacion['rentabilidad_estimada'])
+
+    def _expandir(self, filas: List[tuple], municipio: str, dia: date, temperatura: Optional[float]) -> List[Dict]:
+        servicio = self.sipsa_service
+        productos = list(servicio.PRODUCTOS_BASE)
+        fecha = datetime.combine(dia, datetime.min.time())
+        recomendaciones = []
+        for indice, precio_actual, precio_promedio, tendencia, rentabilidad in filas:
+            producto = productos[indice]
+            info = servicio.PRODUCTOS_BASE[producto]
+            recomendaciones.append({
+                'producto': producto,
+                'precio_actual': precio_actual,
+                'precio_promedio': precio_promedio,
+                'tendencia': tendencia,
+                'unidad': info['unidad'],
+                'presentacion': info['presentacion'],
+                'fecha_ultimo_precio': fecha,
+                'rentabilidad_estimada': rentabilidad,
+                'municipio_factor': servicio._obtener_factor_municipio(municipio, producto),
+                'clima_factor': servicio._obtener_factor_climatico(producto, temperatura),
+            })
+        return recomendaciones
+
+    def _timeout(self, dia: date, hoy: date) -> int:
+        # Cada día se conserva hasta que sale del horizonte (mínimo un día, máximo el horizonte)
+        return min(max((dia - hoy).days, 0) + 1, self.HORIZONTE_DIAS) * 24 * 3600
+
+    def en_matriz(self, municipio: str, dia: date, hoy: date = None) -> bool:
+        """
+        Solo los municipios conocidos dentro del horizonte se precalculan y
+        guardan; cualquier otra consulta se calcula sin tocar el cache, para
+        que un cliente no pueda llenarlo con municipios o fechas arbitrarios
+        """
+        hoy = hoy or date.today()
+        return municipio in self.municipios and hoy <= dia < hoy + timedelta(days=self.HORIZONTE_DIAS)
+
+    # --- API pública ---
+
+    def actualizar(self, hoy: date = None, mes_costos: int = None) -> int:
+        """
+        Precalcula los días del horizonte que no existen para la versión vigente.
+        Retorna la cantidad de entradas (municipio, día) calculadas.
+        """
+        hoy = hoy or date.today()
+        mes_costos = mes_costos or datetime.now().month
+        version = self.version()
+        dias = [hoy + timedelta(days=d) for d in range(self.HORIZONTE_DIAS)]
+
+        claves = {self._clave(m, dia, version, mes_costos): (m, dia) for m in self.municipios for dia in dias}
+        existentes = self.cache.get_many(list(claves))
+        faltantes = [claves[clave] for clave in claves if clave not in existentes]
+        if not faltantes:
+            return 0
+
+        dias_faltantes = sorted({dia for _, dia in faltantes})
+        municipios_faltantes = [m for m in self.municipios if m in {mf for mf, _ in faltantes}]
+        entradas = self._calcular_dias(municipios_faltantes, dias_faltantes, mes_costos)
+
+        pendientes = set(faltantes)
+        for (municipio, dia), entrada in entradas.items():
+            if (municipio, dia) in pendientes:
+                self.cache.set(self._clave(municipio, dia, version, mes_costos), entrada, self._timeout(dia, hoy))
+        return len(pendientes)
+
+    def obtener(self, municipio: str, fecha_siembra: datetime = None, clima_temp: float = None) -> List[Dict]:
+        """
+        Top 10 de recomendaciones para el municipio, día y bucket de temperatura.
+        Si el día no está precalculado se calcula (con toda su grilla de
+        temperaturas) y se guarda para las siguientes consultas. Fuera de la
+        matriz (ver `en_matriz`) se calcula directo sin almacenar.
+        """
+        fecha_siembra = fecha_siembra or datetime.now()
+        dia = fecha_siembra.date() if isinstance(fecha_siembra, datetime) else fecha_siembra
+        mes_costos = datetime.now().month
+        bucket = self.bucket(clima_temp)
+        temperatura = self.temperatura_bucket(bucket)
+
+        if not self.en_matriz(municipio, dia):
+            fecha = datetime.combine(dia, datetime.min.time())
+            return self.sipsa_service.obtener_productos_recomendados(municipio, fecha, temperatura)
+
+        clave = self._clave(municipio, dia, self.version(), mes_costos)
+        entrada = self.cache.get(clave)
+        if entrada is None:
+            entrada = self._calcular_dias([municipio], [dia], mes_costos)[(municipio, dia)]
+            self.cache.set(clave, entrada, self._timeout(dia, date.today()))
+
+        if bucket not in entrada:
+            # Temperatura fuera de la grilla: cálculo directo sin almacenar
+            fecha = datetime.combine(dia, datetime.min.time())
+            return self.sipsa_service.obtener_productos_recomendados(municipio, fecha, temperatura)
+
+        return self._expandir(entrada[bucket], municipio, dia, temperatura)
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productores', '0002_boletinprecios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecioSipsa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('producto', models.CharField(max_length=100)),
+                ('mercado', models.CharField(max_length=100)),
+                ('fecha', models.DateField()),
+                ('variedad', models.CharField(default='Estándar', max_length=100)),
+                ('precio_mayorista', models.IntegerField()),
+                ('precio_minorista', models.IntegerField()),
+                ('unidad', models.CharField(default='KILO', max_length=50)),
+                ('presentacion', models.CharField(default='BULTO', max_length=100)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha'], name='precio_sipsa_fecha_idx'), models.Index(fields=['producto', 'fecha'], name='precio_sipsa_prod_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('producto', 'mercado', 'fecha'), name='precio_sipsa_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productores', '0003_preciosipsa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClimaDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('municipio', models.CharField(max_length=100)),
+                ('fecha', models.DateField()),
+                ('temperatura', models.FloatField()),
+                ('fuente', models.CharField(choices=[('simulada', 'Simulada'), ('csv', 'Archivo CSV')], default='simulada', max_length=20)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('municipio', 'fecha'), name='clima_diario_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productores', '0004_climadiario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoRecomendacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('usuario_id', models.IntegerField(null=True)),
+                ('municipio', models.PositiveSmallIntegerField()),
+                ('producto', models.PositiveSmallIntegerField()),
+                ('puntaje', models.SmallIntegerField(help_text='Rentabilidad estimada en décimas de punto porcentual')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha'], name='evento_rec_fecha_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenEventosDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('municipio', models.PositiveSmallIntegerField()),
+                ('producto', models.PositiveSmallIntegerField()),
+                ('eventos', models.PositiveIntegerField()),
+                ('usuarios', models.PositiveIntegerField(help_text='Usuarios autenticados distintos')),
+                ('suma_puntaje', models.BigIntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'municipio', 'producto'), name='resumen_eventos_unico')],
+            },
+        ),
+    ]
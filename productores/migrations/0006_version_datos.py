@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productores', '0005_eventos_recomendacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=150, unique=True)),
+                ('valor', models.PositiveBigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
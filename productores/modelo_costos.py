@@ -0,0 +1,226 @@
+import hashlib
+import math
+import random
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Sequence
+
+import numpy as np
+
+# Costos balanceados para rango completo 0-100% con distribución realista
+COSTOS_PRODUCCION = {
+    'PAPA CRIOLLA': {
+        'semilla': 2800000, 'fertilizantes': 2200000, 'pesticidas': 1600000,
+        'mano_obra': 4200000, 'maquinaria': 1100000, 'otros': 800000,
+        'rendimiento_kg_ha': 16000, 'ciclo_meses': 5, 'riesgo_factor': 0.80,
+        'dificultad': 'media', 'volatilidad_mercado': 0.25, 'rentabilidad_base': 45
+    },
+    'PAPA PASTUSA': {
+        'semilla': 2400000, 'fertilizantes': 1900000, 'pesticidas': 1400000,
+        'mano_obra': 3800000, 'maquinaria': 1000000, 'otros': 700000,
+        'rendimiento_kg_ha': 18000, 'ciclo_meses': 4, 'riesgo_factor': 0.85,
+        'dificultad': 'baja', 'volatilidad_mercado': 0.20, 'rentabilidad_base': 55
+    },
+    'ZANAHORIA': {
+        'semilla': 1200000, 'fertilizantes': 1800000, 'pesticidas': 1300000,
+        'mano_obra': 3200000, 'maquinaria': 800000, 'otros': 500000,
+        'rendimiento_kg_ha': 22000, 'ciclo_meses': 4, 'riesgo_factor': 0.90,
+        'dificultad': 'baja', 'volatilidad_mercado': 0.15, 'rentabilidad_base': 65
+    },
+    'CEBOLLA CABEZONA': {
+        'semilla': 1600000, 'fertilizantes': 2200000, 'pesticidas': 1800000,
+        'mano_obra': 3600000, 'maquinaria': 900000, 'otros': 600000,
+        'rendimiento_kg_ha': 20000, 'ciclo_meses': 5, 'riesgo_factor': 0.70,
+        'dificultad': 'alta', 'volatilidad_mercado': 0.30, 'rentabilidad_base': 35
+    },
+    'CEBOLLA LARGA': {
+        'semilla': 1400000, 'fertilizantes': 2000000, 'pesticidas': 1600000,
+        'mano_obra': 4200000, 'maquinaria': 700000, 'otros': 500000,
+        'rendimiento_kg_ha': 12000, 'ciclo_meses': 4, 'riesgo_factor': 0.60,
+        'dificultad': 'muy_alta', 'volatilidad_mercado': 0.40, 'rentabilidad_base': 25
+    },
+    'LECHUGA': {
+        'semilla': 800000, 'fertilizantes': 1200000, 'pesticidas': 900000,
+        'mano_obra': 2400000, 'maquinaria': 500000, 'otros': 300000,
+        'rendimiento_kg_ha': 10000, 'ciclo_meses': 3, 'riesgo_factor': 0.95,
+        'dificultad': 'muy_baja', 'volatilidad_mercado': 0.12, 'rentabilidad_base': 75
+    },
+    'CILANTRO': {
+        'semilla': 1000000, 'fertilizantes': 1600000, 'pesticidas': 1200000,
+        'mano_obra': 3000000, 'maquinaria': 600000, 'otros': 400000,
+        'rendimiento_kg_ha': 5000, 'ciclo_meses': 2, 'riesgo_factor': 0.50,
+        'dificultad': 'extrema', 'volatilidad_mercado': 0.60, 'rentabilidad_base': 15
+    },
+    'BRÓCOLI': {
+        'semilla': 2000000, 'fertilizantes': 2600000, 'pesticidas': 2000000,
+        'mano_obra': 3800000, 'maquinaria': 1000000, 'otros': 700000,
+        'rendimiento_kg_ha': 13000, 'ciclo_meses': 4, 'riesgo_factor': 0.75,
+        'dificultad': 'media', 'volatilidad_mercado': 0.22, 'rentabilidad_base': 40
+    }
+}
+
+# Promedio usado para productos sin costos específicos
+COSTOS_PROMEDIO = {
+    'semilla': 1600000, 'fertilizantes': 2000000, 'pesticidas': 1500000,
+    'mano_obra': 3400000, 'maquinaria': 800000, 'otros': 600000,
+    'rendimiento_kg_ha': 15000, 'ciclo_meses': 4, 'riesgo_factor': 0.75,
+    'dificultad': 'media', 'volatilidad_mercado': 0.25, 'rentabilidad_base': 45
+}
+
+# Factor de dificultad con rango más amplio
+FACTORES_DIFICULTAD = {
+    'muy_baja': 1.25,   # Cultivos muy fáciles
+    'baja': 1.15,       # Cultivos fáciles
+    'media': 1.00,      # Neutro
+    'alta': 0.85,       # Cultivos difíciles
+    'muy_alta': 0.70,   # Muy difíciles
+    'extrema': 0.50     # Extremadamente difíciles
+}
+
+# Factor estacional balanceado por mes
+FACTORES_ESTACIONALES = {
+    1: 1.10, 2: 1.05, 3: 1.00, 4: 0.95, 5: 0.98, 6: 1.02,
+    7: 0.85, 8: 0.90, 9: 0.95, 10: 1.05, 11: 1.12, 12: 1.08
+}
+
+
+class PerfilCosto(NamedTuple):
+    """Modelo de costos precompilado de un producto"""
+    costo_por_kg: float
+    rentabilidad_base: float
+    factor_riesgo: float
+    factor_dificultad: float
+    factor_ciclo: float
+    factor_mercado: float
+
+
+def _factor_mercado(producto: str, volatilidad: float) -> float:
+    """
+    Variabilidad simétrica de mercado, determinística por producto
+    """
+    semilla = int(hashlib.md5(producto.encode()).hexdigest()[:8], 16) % 10000
+    return random.Random(semilla).uniform(1 - volatilidad, 1 + volatilidad)
+
+
+def compilar_perfil(producto: str, datos: Dict) -> PerfilCosto:
+    """
+    Precalcula los términos del modelo de costos que no dependen del precio
+    """
+    costo_total = (datos['semilla'] + datos['fertilizantes'] + datos['pesticidas'] +
+                   datos['mano_obra'] + datos['maquinaria'] + datos['otros'])
+
+    # Factor de ciclo más balanceado (base 3.5 meses, ventaja máxima limitada)
+    factor_ciclo = min(3.5 / datos['ciclo_meses'], 1.5)
+
+    return PerfilCosto(
+        costo_por_kg=costo_total / datos['rendimiento_kg_ha'],
+        rentabilidad_base=datos.get('rentabilidad_base', 45),
+        factor_riesgo=datos.get('riesgo_factor', 0.75),
+        factor_dificultad=FACTORES_DIFICULTAD.get(datos.get('dificultad', 'media'), 1.0),
+        factor_ciclo=factor_ciclo,
+        factor_mercado=_factor_mercado(producto, datos.get('volatilidad_mercado', 0.25)),
+    )
+
+
+# Perfiles compilados una sola vez al importar el módulo
+PERFILES_COSTO = {producto: compilar_perfil(producto, datos) for producto, datos in COSTOS_PRODUCCION.items()}
+
+
+@lru_cache(maxsize=256)
+def obtener_perfil(producto: str) -> PerfilCosto:
+    """
+    Perfil del producto; los productos sin costos propios usan el promedio
+    con su propio factor de mercado
+    """
+    return PERFILES_COSTO.get(producto) or compilar_perfil(producto, COSTOS_PROMEDIO)
+
+
+@lru_cache(maxsize=8192)
+def calcular_rentabilidad(precio_promedio: float, producto: str, mes: int) -> float:
+    """
+    Rentabilidad estimada (%) como función pura de (precio, producto, mes).
+    Compara el precio de venta contra el costo de producción por kg y aplica
+    riesgo, dificultad, ciclo, mercado, estacionalidad y curva de saturación.
+    """
+    if not precio_promedio or not producto:
+        return 0
+
+    perfil = obtener_perfil(producto)
+    costo_por_kg = perfil.costo_por_kg
+
+    # Calcular factor de precio vs costo
+    if precio_promedio > costo_por_kg:
+        ratio_precio_costo = precio_promedio / costo_por_kg
+        # Escala más amplia para permitir rango completo
+        if ratio_precio_costo > 2.0:
+            rentabilidad_calculada = perfil.rentabilidad_base * (ratio_precio_costo * 0.8)
+        elif ratio_precio_costo > 1.5:
+            rentabilidad_calculada = perfil.rentabilidad_base * (ratio_precio_costo * 0.9)
+        else:
+            rentabilidad_calculada = perfil.rentabilidad_base * (ratio_precio_costo * 1.1)
+    else:
+        # Pérdida cuando precio < costo
+        rentabilidad_calculada = -((costo_por_kg - precio_promedio) / costo_por_kg) * 80
+
+    rentabilidad_ajustada = rentabilidad_calculada * perfil.factor_riesgo
+    rentabilidad_ajustada *= perfil.factor_dificultad
+    rentabilidad_ajustada *= perfil.factor_ciclo
+
+    rentabilidad_final = rentabilidad_ajustada * perfil.factor_mercado
+    rentabilidad_final *= FACTORES_ESTACIONALES.get(mes, 1.0)
+
+    # Curva logarítmica que hace más difícil llegar a valores altos
+    if rentabilidad_final > 60:
+        exceso = rentabilidad_final - 60
+        rentabilidad_final = 60 + (40 * (1 - math.exp(-exceso / 25)))
+
+    # Factor de realismo adicional - reducir rentabilidades muy altas
+    if rentabilidad_final > 80:
+        rentabilidad_final *= 0.85
+
+    # Rango completo 0-100% con distribución más realista
+    return max(-20, min(rentabilidad_final, 100))
+
+
+def calcular_rentabilidades(precios: Iterable[float], productos: Iterable[str], mes: int) -> List[float]:
+    """
+    Evalúa en lote la rentabilidad de pares (precio, producto) para un mes
+    """
+    return [calcular_rentabilidad(precio, producto, mes) for precio, producto in zip(precios, productos)]
+
+
+def calcular_rentabilidad_vectorizada(precios: np.ndarray, productos: Sequence[str], mes: int) -> np.ndarray:
+    """
+    Versión NumPy de `calcular_rentabilidad` para una matriz de precios cuyo
+    último eje corresponde a `productos`. Aplica las mismas operaciones en el
+    mismo orden, por lo que coincide con la evaluación escalar.
+    """
+    perfiles = [obtener_perfil(producto) for producto in productos]
+    costo_por_kg = np.array([p.costo_por_kg for p in perfiles])
+    rentabilidad_base = np.array([p.rentabilidad_base for p in perfiles], dtype=np.float64)
+    precios = np.asarray(precios, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio_precio_costo = precios / costo_por_kg
+        ganancia = np.where(
+            ratio_precio_costo > 2.0, rentabilidad_base * (ratio_precio_costo * 0.8),
+            np.where(ratio_precio_costo > 1.5, rentabilidad_base * (ratio_precio_costo * 0.9),
+                     rentabilidad_base * (ratio_precio_costo * 1.1)))
+        perdida = -((costo_por_kg - precios) / costo_por_kg) * 80
+    rentabilidad = np.where(precios > costo_por_kg, ganancia, perdida)
+
+    rentabilidad = rentabilidad * np.array([p.factor_riesgo for p in perfiles])
+    rentabilidad = rentabilidad * np.array([p.factor_dificultad for p in perfiles])
+    rentabilidad = rentabilidad * np.array([p.factor_ciclo for p in perfiles])
+    rentabilidad = rentabilidad * np.array([p.factor_mercado for p in perfiles])
+    rentabilidad = rentabilidad * FACTORES_ESTACIONALES.get(mes, 1.0)
+
+    # Curva de saturación; math.exp garantiza el mismo redondeo que la versión escalar
+    saturados = rentabilidad > 60
+    if saturados.any():
+        exceso = rentabilidad[saturados] - 60
+        rentabilidad[saturados] = 60 + (40 * (1 - np.array([math.exp(-e / 25) for e in exceso.tolist()])))
+
+    rentabilidad = np.where(rentabilidad > 80, rentabilidad * 0.85, rentabilidad)
+    rentabilidad = np.clip(rentabilidad, -20, 100)
+
+    return np.where(precios == 0, 0.0, rentabilidad)
@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+from datetime import datetime, time
 
 class BoletinPrecios(models.Model):
     fecha = models.DateField()
@@ -25,3 +27,108 @@ class Cultivo(models.Model):
 
     def __str__(self):
         return self.nombre
+
+class PrecioSipsa(models.Model):
+    """Precio diario del SIPSA persistido por la ingesta programada"""
+    producto = models.CharField(max_length=100)
+    mercado = models.CharField(max_length=100)
+    fecha = models.DateField()
+    variedad = models.CharField(max_length=100, default='Estándar')
+    precio_mayorista = models.IntegerField()
+    precio_minorista = models.IntegerField()
+    unidad = models.CharField(max_length=50, default='KILO')
+    presentacion = models.CharField(max_length=100, default='BULTO')
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'mercado', 'fecha'], name='precio_sipsa_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha'], name='precio_sipsa_fecha_idx'),
+            models.Index(fields=['producto', 'fecha'], name='precio_sipsa_prod_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto} - {self.mercado} ({self.fecha})"
+
+    def como_dict(self):
+        """Convierte el registro al formato de precios usado por SipsaService"""
+        fecha_obj = datetime.combine(self.fecha, time.min)
+        return {
+            'fecha': self.fecha.strftime('%Y-%m-%d'),
+            'fecha_obj': fecha_obj,
+            'mercado': self.mercado,
+            'producto': self.producto,
+            'variedad': self.variedad,
+            'precio_mayorista': self.precio_mayorista,
+            'precio_minorista': self.precio_minorista,
+            'unidad': self.unidad,
+            'presentacion': self.presentacion,
+        }
+
+class ClimaDiario(models.Model):
+    """Temperatura media diaria por municipio (simulada o cargada desde normales climatológicas)"""
+    FUENTE_SIMULADA = 'simulada'
+    FUENTE_CSV = 'csv'
+    FUENTES = [(FUENTE_SIMULADA, 'Simulada'), (FUENTE_CSV, 'Archivo CSV')]
+
+    municipio = models.CharField(max_length=100)
+    fecha = models.DateField()
+    temperatura = models.FloatField()
+    fuente = models.CharField(max_length=20, choices=FUENTES, default=FUENTE_SIMULADA)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['municipio', 'fecha'], name='clima_diario_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.municipio} ({self.fecha}): {self.temperatura} °C"
+
+class EventoRecomendacion(models.Model):
+    """
+    Evento de solo inserción: un producto mostrado como recomendación.
+    Esquema compacto (ids numéricos, puntaje en décimas) para analítica;
+    los eventos antiguos se compactan en ResumenEventosDiario.
+    """
+    usuario_id = models.IntegerField(null=True)
+    municipio = models.PositiveSmallIntegerField()
+    producto = models.PositiveSmallIntegerField()
+    puntaje = models.SmallIntegerField(help_text="Rentabilidad estimada en décimas de punto porcentual")
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha'], name='evento_rec_fecha_idx'),
+        ]
+
+
+class ResumenEventosDiario(models.Model):
+    """Roll-up diario de EventoRecomendacion por municipio y producto"""
+    dia = models.DateField()
+    municipio = models.PositiveSmallIntegerField()
+    producto = models.PositiveSmallIntegerField()
+    eventos = models.PositiveIntegerField()
+    usuarios = models.PositiveIntegerField(help_text="Usuarios autenticados distintos")
+    suma_puntaje = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'municipio', 'producto'], name='resumen_eventos_unico'),
+        ]
+
+
+class VersionDatos(models.Model):
+    """
+    Contador de versión de datos cacheados (snapshot de precios, matriz de
+    recomendaciones, reportes). Vive en la base de datos porque el cache
+    puede desalojar cualquier clave: un contador reiniciado en 0 volvería a
+    servir entradas de versiones anteriores.
+    """
+    nombre = models.CharField(max_length=150, unique=True)
+    valor = models.PositiveBigIntegerField(default=0)
+    actualizado = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.nombre} = {self.valor}"
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .aleatoriedad import uniformes
+from .modelo_costos import calcular_rentabilidad_vectorizada
+
+# Tendencias codificadas en la matriz de resultados
+BAJANDO, ESTABLE, SUBIENDO = -1, 0, 1
+NOMBRES_TENDENCIA = {BAJANDO: 'Bajando', ESTABLE: 'Estable', SUBIENDO: 'Subiendo'}
+
+# Ajuste de la rentabilidad según la tendencia (mismo orden que NOMBRES_TENDENCIA)
+AJUSTE_TENDENCIA = {BAJANDO: 0.75, ESTABLE: 0.95, SUBIENDO: 1.05}
+
+# Registros recientes usados para tendencia y precio promedio
+REGISTROS_ANALISIS = 3
+
+
+class ResultadoLote:
+    """
+    Matrices de una evaluación en lote con forma (municipio, fecha, temperatura, producto).
+    `recomendaciones(m, f, t)` materializa el top 10 de un punto de la grilla
+    con el mismo formato que `SipsaService.obtener_productos_recomendados`.
+    """
+
+    def __init__(self, municipios, fechas, temperaturas, productos, precios, precio_promedio,
+                 tendencia, rentabilidad, factores_municipio, factores_climaticos, unidades, presentaciones):
+        self.municipios = municipios
+        self.fechas = fechas
+        self.temperaturas = temperaturas
+        self.productos = productos
+        self.precios = precios
+        self.precio_promedio = precio_promedio
+        self.tendencia = tendencia
+        self.rentabilidad = rentabilidad
+        self.factores_municipio = factores_municipio
+        self.factores_climaticos = factores_climaticos
+        self.unidades = unidades
+        self.presentaciones = presentaciones
+
+    @property
+    def forma(self):
+        return self.rentabilidad.shape
+
+    def recomendaciones(self, m: int, f: int, t: int, limite: int = 10) -> List[Dict]:
+        recomendaciones = []
+        for p, producto in enumerate(self.productos):
+            recomendaciones.append({
+                'producto': producto,
+                'precio_actual': int(self.precios[m, f, t, p, 0]),
+                'precio_promedio': round(float(self.precio_promedio[m, f, t, p]), 0),
+                'tendencia': NOMBRES_TENDENCIA[int(self.tendencia[m, f, t, p])],
+                'unidad': self.unidades[p],
+                'presentacion': self.presentaciones[p],
+                'fecha_ultimo_precio': self.fechas[f],
+                'rentabilidad_estimada': round(float(self.rentabilidad[m, f, t, p]), 1),
+                'municipio_factor': self.factores_municipio[m][p],
+                'clima_factor': self.factores_climaticos[t][p],
+            })
+
+        recomendaciones.sort(key=lambda x: x['rentabilidad_estimada'], reverse=True)
+        return recomendaciones[:limite]
+
+
+class EvaluadorLote:
+    """
+    Evalúa las recomendaciones de cultivos para una grilla completa de
+    municipios × fechas de siembra × temperaturas con operaciones NumPy.
+    Reproduce paso a paso el cálculo escalar de SipsaService (mismo orden de
+    operaciones flotantes y mismo ruido por contador), así que cada punto de
+    la grilla coincide con `obtener_productos_recomendados`.
+    """
+
+    def __init__(self, sipsa_service=None):
+        if sipsa_service is None:
+            from .sipsa_service import SipsaService
+            sipsa_service = SipsaService()
+        self.sipsa_service = sipsa_service
+
+    def evaluar(self, municipios: Sequence[str], fechas: Sequence[datetime],
+                temperaturas: Sequence[Optional[float]], mes_costos: int = None) -> ResultadoLote:
+        servicio = self.sipsa_service
+        productos = list(servicio.PRODUCTOS_BASE)
+        if mes_costos is None:
+            mes_costos = datetime.now().month
+
+        # Factores por eje de la grilla (se calculan con las funciones escalares)
+        factores_municipio = [[servicio._obtener_factor_municipio(m, p) for p in productos] for m in municipios]
+        factores_estacionales = [[servicio._obtener_factor_estacional(p, f) for p in productos] for f in fechas]
+        factores_climaticos = [[servicio._obtener_factor_climatico(p, t) for p in productos] for t in temperaturas]
+
+        fm = np.array(factores_municipio)[:, None, None, :]
+        fe = np.array(factores_estacionales)[None, :, None, :]
+        fc = np.array(factores_climaticos)[None, None, :, :]
+        precio_base = np.array([servicio.PRODUCTOS_BASE[p]['precio_base'] for p in productos], dtype=np.float64)
+
+        # Ruido determinístico: mismo (semilla, contador) que la generación escalar
+        semillas = np.array([[[servicio._semilla_contexto(m, f, t) for t in temperaturas]
+                              for f in fechas] for m in municipios], dtype=np.uint64)
+        contadores = (np.arange(len(productos))[:, None] * servicio.SEMANAS_HISTORIAL
+                      + np.arange(REGISTROS_ANALISIS)[None, :])
+        variacion = uniformes(semillas[..., None, None], contadores, 0.85, 1.15)
+
+        precio_ajustado = ((precio_base * fm) * fe) * fc
+        precios = np.trunc(precio_ajustado[..., None] * variacion).astype(np.int64)
+
+        actual, anterior = precios[..., 0], precios[..., 1]
+        precio_promedio = precios.sum(axis=-1) / REGISTROS_ANALISIS
+        tendencia = np.where(actual > anterior * 1.05, SUBIENDO,
+                             np.where(actual < anterior * 0.95, BAJANDO, ESTABLE))
+
+        rentabilidad = calcular_rentabilidad_vectorizada(precio_promedio, productos, mes_costos)
+        rentabilidad = self._ajustar_por_contexto(rentabilidad, fm, fe, fc)
+
+        ajuste = np.select([tendencia == BAJANDO, tendencia == ESTABLE],
+                           [AJUSTE_TENDENCIA[BAJANDO], AJUSTE_TENDENCIA[ESTABLE]], AJUSTE_TENDENCIA[SUBIENDO])
+        rentabilidad = np.minimum(rentabilidad * ajuste, 100.0)
+
+        return ResultadoLote(
+            list(municipios), list(fechas), list(temperaturas), productos, precios, precio_promedio,
+            tendencia, rentabilidad, factores_municipio, factores_climaticos,
+            [servicio.PRODUCTOS_BASE[p]['unidad'] for p in productos],
+            [servicio.PRODUCTOS_BASE[p]['presentacion'] for p in productos],
+        )
+
+    def _ajustar_por_contexto(self, rentabilidad: np.ndarray, fm: np.ndarray, fe: np.ndarray,
+                              fc: np.ndarray) -> np.ndarray:
+        """
+        Versión vectorizada de `SipsaService._ajustar_rentabilidad_por_contexto`
+        """
+        forma = rentabilidad.shape
+        fm, fe, fc = (np.broadcast_to(f, forma) for f in (fm, fe, fc))
+
+        # Rentabilidades positivas
+        bajos = (fm < 0.95).astype(np.int64) + (fe < 0.95) + (fc < 0.95)
+        combinado = (fm * fe) * fc
+        combinado = np.where(bajos >= 1, combinado * 0.90, combinado)
+        combinado = np.where(bajos >= 2, combinado * 0.85, combinado)
+        positiva = rentabilidad * combinado
+        excepcional = (fe > 1.15) & (fm > 1.1) & (fc > 1.15)
+        muy_buena = ~excepcional & (fe > 1.1) & (fm > 1.05) & (fc > 1.1)
+        positiva = np.where(excepcional, positiva * 1.05, np.where(muy_buena, positiva * 1.02, positiva))
+        positiva = np.minimum(positiva, 100.0)
+
+        # Rentabilidades negativas (o nulas)
+        promedio = ((fm + fe) + fc) / 3
+        negativa = np.where(promedio > 1.1, rentabilidad * 0.7,
+                            np.where(promedio < 0.9, rentabilidad * 1.2, rentabilidad))
+        negativa = np.maximum(negativa, -40)
+
+        return np.where(rentabilidad > 0, positiva, negativa)
+
+    def recomendaciones_por_dia(self, municipio: str, fecha_inicio: datetime, dias: int,
+                                temperatura: float = None) -> Dict[str, List[Dict]]:
+        """
+        Top 10 por día para un municipio durante `dias` días a partir de `fecha_inicio`
+        """
+        fechas = [fecha_inicio + timedelta(days=d) for d in range(dias)]
+        resultado = self.evaluar([municipio], fechas, [temperatura])
+        return {fecha.strftime('%Y-%m-%d'): resultado.recomendaciones(0, f, 0) for f, fecha in enumerate(fechas)}
@@ -0,0 +1,111 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class EscritorDiferido:
+    """
+    Escritura diferida (write-behind) de filas de un modelo.
+
+    Las vistas solo encolan las filas en memoria; un hilo en segundo plano las
+    agrupa y las escribe con un `bulk_create` por lote dentro de una
+    transacción, fuera de la latencia de la página. Al terminar el proceso se
+    vacía lo pendiente. Un fallo del proceso puede perder como máximo las
+    filas del último intervalo.
+    """
+
+    TAMANO_LOTE = 500
+    INTERVALO = 2.0
+
+    def __init__(self, modelo, tamano_lote: int = None, intervalo: float = None):
+        self.modelo = modelo
+        self.tamano_lote = tamano_lote or self.TAMANO_LOTE
+        self.intervalo = intervalo if intervalo is not None else self.INTERVALO
+        self._cola = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._candado = threading.Lock()
+
+    def registrar(self, filas: Iterable) -> None:
+        """
+        Encola las filas para la próxima escritura en lote (no bloquea)
+        """
+        for fila in filas:
+            self._cola.put(fila)
+        self._asegurar_hilo()
+
+    def pendientes(self) -> int:
+        return self._cola.qsize()
+
+    def vaciar(self) -> int:
+        """
+        Escribe de inmediato todo lo encolado; retorna las filas escritas
+        """
+        total = 0
+        while True:
+            lote = self._tomar_lote(self.tamano_lote)
+            if not lote:
+                return total
+            self._escribir(lote)
+            total += len(lote)
+
+    def _tomar_lote(self, maximo: int) -> List:
+        lote = []
+        while len(lote) < maximo:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self, lote: List) -> None:
+        with transaction.atomic():
+            self.modelo.objects.bulk_create(lote)
+
+    def _asegurar_hilo(self) -> None:
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._candado:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ejecutar, name=f"registro-{self.modelo._meta.model_name}",
+                                              daemon=True)
+                self._hilo.start()
+
+    def _ejecutar(self) -> None:
+        while True:
+            # Esperar la primera fila y dar tiempo a que se acumule el lote
+            primera = self._cola.get()
+            limite = time.monotonic() + self.intervalo
+            while self._cola.qsize() + 1 < self.tamano_lote and time.monotonic() < limite:
+                time.sleep(0.05)
+
+            lote = [primera] + self._tomar_lote(self.tamano_lote - 1)
+            close_old_connections()
+            try:
+                self._escribir(lote)
+            except Exception:
+                logger.exception("No se pudieron registrar %d filas de %s", len(lote), self.modelo.__name__)
+            finally:
+                close_old_connections()
+
+
+_escritores: Dict[type, EscritorDiferido] = {}
+_candado_escritor = threading.Lock()
+
+
+def obtener_escritor(modelo) -> EscritorDiferido:
+    """
+    Escritor diferido compartido del proceso para el modelo
+    """
+    with _candado_escritor:
+        if modelo not in _escritores:
+            escritor = EscritorDiferido(modelo)
+            atexit.register(escritor.vaciar)
+            _escritores[modelo] = escritor
+    return _escritores[modelo]
@@ -0,0 +1,89 @@
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from .cache_http import clave_snapshot
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la biblioteca estándar
+    orjson = None
+
+# Campos de cada registro de precio que viajan como columnas por producto
+# (`fecha_obj` se omite: repite `fecha` como datetime)
+COLUMNAS_PRECIO = ('fecha', 'mercado', 'variedad', 'precio_mayorista', 'precio_minorista', 'unidad', 'presentacion')
+
+# La clave incluye la versión del snapshot y el día, así que el contenido
+# nunca queda desactualizado; el TTL solo limita lo que ocupa en el cache
+VIGENCIA_CONTENIDO = 24 * 3600
+
+
+def _por_defecto(valor):
+    return DjangoJSONEncoder().default(valor)
+
+
+def a_json(datos) -> bytes:
+    """
+    Serializa a JSON compacto en UTF-8; usa orjson si está instalado
+    """
+    if orjson is not None:
+        return orjson.dumps(datos, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def respuesta_json(contenido: bytes, status: int = 200) -> HttpResponse:
+    """
+    Respuesta con JSON ya serializado (por ejemplo, leído del cache)
+    """
+    return HttpResponse(contenido, content_type='application/json', status=status)
+
+
+def _clave_contenido(vista: str, request) -> str:
+    return f"json:{clave_snapshot(vista, request)}"
+
+
+def contenido_en_cache(vista: str, request, alias: str = 'default') -> Optional[bytes]:
+    """
+    JSON serializado de la vista para el snapshot vigente, si ya se calculó
+    """
+    return caches[alias].get(_clave_contenido(vista, request))
+
+
+def guardar_contenido(vista: str, request, contenido: bytes, alias: str = 'default') -> None:
+    caches[alias].set(_clave_contenido(vista, request), contenido, VIGENCIA_CONTENIDO)
+
+
+def precios_columnares(precios: Iterable[Dict]) -> Dict[str, Dict[str, List]]:
+    """
+    Agrupa los registros por producto en arreglos paralelos (una lista por
+    campo) en lugar de una lista de diccionarios
+    """
+    productos: Dict[str, Dict[str, List]] = {}
+    for precio in precios:
+        columnas = productos.get(precio['producto'])
+        if columnas is None:
+            columnas = productos[precio['producto']] = {campo: [] for campo in COLUMNAS_PRECIO}
+        for campo in COLUMNAS_PRECIO:
+            columnas[campo].append(precio.get(campo))
+    return productos
+
+
+def series_columnares(series: Dict[str, Tuple[List[str], List]]) -> Dict[str, List]:
+    """
+    Series de precios por producto sobre un eje de fechas común: `precios[i][j]`
+    es el precio de `productos[i]` en `fechas[j]` (None si no hay registro)
+    """
+    fechas = sorted({fecha for fechas_producto, _ in series.values() for fecha in fechas_producto})
+    posicion = {fecha: j for j, fecha in enumerate(fechas)}
+
+    matriz = []
+    for fechas_producto, precios_producto in series.values():
+        fila = [None] * len(fechas)
+        for fecha, precio in zip(fechas_producto, precios_producto):
+            fila[posicion[fecha]] = precio
+        matriz.append(fila)
+
+    return {'fechas': fechas, 'productos': list(series), 'precios': matriz}
@@ -0,0 +1,32 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_sesion = None
+_candado = threading.Lock()
+
+
+def obtener_sesion() -> requests.Session:
+    """
+    Retorna la sesión HTTP compartida del proceso.
+    Mantiene conexiones keep-alive en un pool y reintenta con backoff
+    exponencial los errores transitorios de las APIs externas.
+    """
+    global _sesion
+    with _candado:
+        if _sesion is None:
+            reintentos = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET']),
+                respect_retry_after_header=True,
+            )
+            adaptador = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=reintentos)
+            sesion = requests.Session()
+            sesion.mount('https://', adaptador)
+            sesion.mount('http://', adaptador)
+            _sesion = sesion
+    return _sesion
@@ -0,0 +1,226 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+# Productos relevantes para la Sabana Occidental
+PRODUCTOS_RELEVANTES = (
+    'PAPA', 'ZANAHORIA', 'CEBOLLA', 'LECHUGA', 'REPOLLO',
+    'CILANTRO', 'PEREJIL', 'APIO', 'ACELGA', 'ESPINACA',
+    'BRÓCOLI', 'COLIFLOR', 'REMOLACHA'
+)
+
+# Una sola búsqueda reemplaza el recorrido de la lista por cada fila
+PATRON_PRODUCTOS_RELEVANTES = re.compile('|'.join(re.escape(p) for p in PRODUCTOS_RELEVANTES))
+
+# Nombres alternativos de cada columna en los archivos del SIPSA, en orden de prioridad
+COLUMNAS_SIPSA = {
+    'fecha': ('fecha', 'Fecha'),
+    'producto': ('producto', 'Producto', 'PRODUCTO'),
+    'mercado': ('mercado', 'Mercado', 'MERCADO'),
+    'precio_mayorista': ('precio_mayorista', 'Precio Mayorista', 'PRECIO_MAYORISTA', 'precio'),
+    'precio_minorista': ('precio_minorista', 'Precio Minorista', 'PRECIO_MINORISTA'),
+    'variedad': ('variedad', 'Variedad'),
+    'unidad': ('unidad', 'Unidad'),
+    'presentacion': ('presentacion', 'Presentacion'),
+}
+
+FORMATOS_FECHA = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d']
+
+# Marca en el memo de los textos que no se pudieron interpretar
+_FECHA_INVALIDA = object()
+
+
+def es_producto_relevante(producto: str) -> bool:
+    """
+    Verifica si el producto pertenece a los cultivos de la Sabana Occidental
+    """
+    return PATRON_PRODUCTOS_RELEVANTES.search(producto) is not None
+
+
+class DetectorFechas:
+    """
+    Interpreta las fechas de una columna del SIPSA detectando el formato una
+    sola vez y reutilizándolo en las filas siguientes. Los archivos repiten
+    pocas fechas miles de veces, por lo que cada texto se interpreta una vez
+    y se memoriza, incluidos los que no se pudieron interpretar. Lleva la
+    cuenta de las filas que terminan en la fecha actual por no poder
+    interpretarse, para que la pérdida de datos sea visible. Cada descarga
+    usa su propio detector, así que las métricas no se mezclan entre corridas.
+    """
+
+    MAX_MEMO = 4096
+
+    def __init__(self, formatos: Sequence[str] = FORMATOS_FECHA):
+        self.formatos = list(formatos)
+        self.formato_detectado = None
+        self.acepta_iso = '%Y-%m-%d' in self.formatos
+        self.memo = {}
+        self.fallidas = 0
+
+    def parsear(self, fecha_str: str) -> datetime:
+        """
+        Retorna la fecha interpretada o la fecha actual si no hay formato válido
+        """
+        fecha = self.memo.get(fecha_str)
+        if fecha is None:
+            fecha = self._interpretar(fecha_str)
+            if fecha is None:
+                fecha = _FECHA_INVALIDA
+            if len(self.memo) < self.MAX_MEMO:
+                self.memo[fecha_str] = fecha
+
+        if fecha is _FECHA_INVALIDA:
+            self.fallidas += 1
+            return datetime.now()
+        return fecha
+
+    def _interpretar(self, fecha_str: str) -> Optional[datetime]:
+        if not fecha_str:
+            return None
+
+        # Ruta rápida para fechas ISO (AAAA-MM-DD)
+        if self.acepta_iso and len(fecha_str) == 10 and fecha_str[4] == '-' and fecha_str[7] == '-':
+            try:
+                return datetime.fromisoformat(fecha_str)
+            except ValueError:
+                pass
+
+        if self.formato_detectado:
+            try:
+                return datetime.strptime(fecha_str, self.formato_detectado)
+            except ValueError:
+                pass
+
+        for formato in self.formatos:
+            if formato == self.formato_detectado:
+                continue
+            try:
+                fecha = datetime.strptime(fecha_str, formato)
+            except ValueError:
+                continue
+            self.formato_detectado = formato
+            return fecha
+
+        return None
+
+
+def limpiar_precio(precio_str) -> Optional[float]:
+    """
+    Limpia y convierte string de precio a float
+    """
+    if not precio_str:
+        return None
+
+    try:
+        precio_str = str(precio_str)
+        if precio_str.isdigit():
+            return float(precio_str)
+
+        # Remover caracteres no numéricos excepto punto y coma
+        precio_limpio = ''.join(c for c in precio_str if c.isdigit() or c in '.,')
+        precio_limpio = precio_limpio.replace(',', '')
+        return float(precio_limpio) if precio_limpio else None
+    except (ValueError, TypeError):
+        return None
+
+
+@lru_cache(maxsize=32)
+def _indices_columnas(encabezado: Tuple[str, ...]) -> Dict:
+    """
+    Posición de cada campo en un encabezado, reutilizada entre archivos iguales
+    """
+    indices = {}
+    for i, nombre in enumerate(encabezado):
+        indices.setdefault(nombre, i)
+
+    def primera(campo: str) -> Optional[int]:
+        return next((indices[c] for c in COLUMNAS_SIPSA[campo] if c in indices), None)
+
+    def todas(campo: str) -> Tuple[int, ...]:
+        return tuple(indices[c] for c in COLUMNAS_SIPSA[campo] if c in indices)
+
+    posiciones = {campo: primera(campo) for campo in ('fecha', 'producto', 'mercado', 'variedad',
+                                                      'unidad', 'presentacion')}
+    # Los precios toman el primer valor no vacío entre las columnas candidatas
+    posiciones['mayorista'] = todas('precio_mayorista')
+    posiciones['minorista'] = todas('precio_minorista')
+    return posiciones
+
+
+class ExtractorFilasSipsa:
+    """
+    Extractor de filas del CSV del SIPSA compilado a partir del encabezado.
+    Resuelve una sola vez por archivo el índice de cada campo, de modo que
+    procesar una fila se reduce a unas pocas consultas por posición. Los
+    índices se comparten entre archivos con el mismo encabezado; el detector
+    de fechas es propio de cada extractor.
+    """
+
+    def __init__(self, encabezado: Sequence[str]):
+        posiciones = _indices_columnas(tuple(encabezado))
+        self.i_fecha = posiciones['fecha']
+        self.i_producto = posiciones['producto']
+        self.i_mercado = posiciones['mercado']
+        self.i_variedad = posiciones['variedad']
+        self.i_unidad = posiciones['unidad']
+        self.i_presentacion = posiciones['presentacion']
+        self.i_mayorista = posiciones['mayorista']
+        self.i_minorista = posiciones['minorista']
+        self.detector_fechas = DetectorFechas()
+
+        usados = [i for i in (self.i_fecha, self.i_producto, self.i_mercado, self.i_variedad,
+                              self.i_unidad, self.i_presentacion) if i is not None]
+        usados.extend(self.i_mayorista + self.i_minorista)
+        self.ancho = max(usados) + 1 if usados else 0
+
+    def procesar(self, fila: Sequence[str]) -> Optional[Dict]:
+        """
+        Convierte una fila (lista de valores) al formato de precios del servicio.
+        Retorna None si la fila no tiene datos mínimos o el producto no es relevante.
+        """
+        try:
+            if len(fila) < self.ancho:
+                fila = list(fila) + [''] * (self.ancho - len(fila))
+
+            if self.i_producto is None:
+                return None
+            producto = fila[self.i_producto].strip().upper()
+            if not producto or not PATRON_PRODUCTOS_RELEVANTES.search(producto):
+                return None
+
+            for i in self.i_mayorista:
+                if fila[i]:
+                    precio_mayorista = limpiar_precio(fila[i])
+                    break
+            else:
+                return None
+
+            if not precio_mayorista or precio_mayorista <= 0:
+                return None
+
+            precio_minorista = None
+            for i in self.i_minorista:
+                if fila[i]:
+                    precio_minorista = limpiar_precio(fila[i])
+                    break
+            precio_minorista = precio_minorista or precio_mayorista * 1.3
+
+            fecha_obj = self.detector_fechas.parsear(fila[self.i_fecha] if self.i_fecha is not None else '')
+
+            return {
+                'fecha': fecha_obj.strftime('%Y-%m-%d'),
+                'fecha_obj': fecha_obj,
+                'mercado': fila[self.i_mercado] if self.i_mercado is not None else 'Corabastos',
+                'producto': producto,
+                'variedad': fila[self.i_variedad] if self.i_variedad is not None else 'Estándar',
+                'precio_mayorista': int(precio_mayorista),
+                'precio_minorista': int(precio_minorista),
+                'unidad': fila[self.i_unidad] if self.i_unidad is not None else 'KILO',
+                'presentacion': fila[self.i_presentacion] if self.i_presentacion is not None else 'BULTO',
+            }
+
+        except Exception:
+            return None
+
+
@@ -1,11 +1,15 @@
-import requests
 import json
 import random
 import csv
-import io
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional
+from .aleatoriedad import generador, semilla_estable, uniforme
 from .datos_reales_service import DatosRealesService
+from .cache_precios import CachePreciosCompartido
+from .descarga_sipsa import DescargadorSipsa, ResultadoDescarga, confirmar_validadores, solicitar_condicional, validadores_de
+from .modelo_costos import calcular_rentabilidad
+from .models import PrecioSipsa
+from .sipsa_parser import DetectorFechas, ExtractorFilasSipsa, es_producto_relevante, limpiar_precio
 
 class SipsaService:
     """
@@ -20,6 +24,15 @@ class SipsaService:
         "https://www.datos.gov.co/api/views/wspg-shym/rows.csv?accessType=DOWNLOAD&api_foundry=true"
     ]
 
+    # Clave del cache compartido para la descarga del SIPSA
+    CLAVE_CACHE_REALES = 'reales'
+
+    # Registros recientes de la tabla local que se mantienen en cache
+    MAX_REGISTROS_ALMACENADOS = 5000
+
+    # Tamaño de bloque para la lectura en streaming del CSV completo
+    TAMANO_BLOQUE_CSV = 64 * 1024
+
     # Datos base de productos típicos de la Sabana Occidental
     PRODUCTOS_BASE = {
         'PAPA CRIOLLA': {'precio_base': 2500, 'unidad': 'KILO', 'presentacion': 'BULTO 50KG'},
@@ -39,70 +52,206 @@ class SipsaService:
         'REMOLACHA': {'precio_base': 1800, 'unidad': 'KILO', 'presentacion': 'BULTO 25KG'},
     }
     
+    # Registros semanales simulados por producto para el análisis de tendencia
+    SEMANAS_HISTORIAL = 5
+
+    # Cada municipio tiene diferentes condiciones para diferentes productos
+    FACTORES_MUNICIPIO = {
+        'Facatativá': {
+            'PAPA CRIOLLA': 1.1, 'PAPA PASTUSA': 1.05, 'ZANAHORIA': 0.95,
+            'CEBOLLA CABEZONA': 1.0, 'LECHUGA': 1.05, 'CILANTRO': 1.15
+        },
+        'Madrid': {
+            'PAPA CRIOLLA': 1.05, 'PAPA PASTUSA': 1.1, 'ZANAHORIA': 1.0,
+            'CEBOLLA CABEZONA': 1.05, 'LECHUGA': 1.1, 'CILANTRO': 1.0
+        },
+        'Mosquera': {
+            'PAPA CRIOLLA': 0.95, 'PAPA PASTUSA': 1.0, 'ZANAHORIA': 1.1,
+            'CEBOLLA CABEZONA': 1.1, 'LECHUGA': 0.95, 'CILANTRO': 1.05
+        },
+        'El Rosal': {
+            'PAPA CRIOLLA': 1.0, 'PAPA PASTUSA': 0.95, 'ZANAHORIA': 1.05,
+            'CEBOLLA CABEZONA': 0.95, 'LECHUGA': 1.0, 'CILANTRO': 1.1
+        },
+        'Subachoque': {
+            'PAPA CRIOLLA': 1.15, 'PAPA PASTUSA': 1.1, 'ZANAHORIA': 0.9,
+            'CEBOLLA CABEZONA': 0.9, 'LECHUGA': 0.95, 'CILANTRO': 1.05
+        },
+        'Bojacá': {
+            'PAPA CRIOLLA': 1.05, 'PAPA PASTUSA': 1.0, 'ZANAHORIA': 1.05,
+            'CEBOLLA CABEZONA': 1.0, 'LECHUGA': 1.05, 'CILANTRO': 0.95
+        },
+        'Funza': {
+            'PAPA CRIOLLA': 1.02, 'PAPA PASTUSA': 1.00, 'ZANAHORIA': 1.12,
+            'CEBOLLA CABEZONA': 1.08, 'CEBOLLA LARGA': 1.05, 'LECHUGA': 1.06,
+            'CILANTRO': 1.10, 'BRÓCOLI': 0.98, 'COLIFLOR': 0.95,
+            'APIO': 1.08, 'PEREJIL': 1.05, 'ACELGA': 1.03
+        }
+    }
+
+    # Factores estacionales por producto (simulando épocas de cosecha)
+    FACTORES_ESTACIONALES = {
+        'PAPA CRIOLLA': [1.2, 1.1, 0.9, 0.8, 0.9, 1.0, 1.1, 1.2, 1.1, 1.0, 1.1, 1.2],
+        'PAPA PASTUSA': [1.1, 1.0, 0.9, 0.9, 1.0, 1.1, 1.2, 1.1, 1.0, 1.0, 1.1, 1.1],
+        'ZANAHORIA': [0.9, 1.0, 1.1, 1.2, 1.1, 1.0, 0.9, 0.9, 1.0, 1.1, 1.0, 0.9],
+        'LECHUGA': [1.0, 1.1, 1.2, 1.1, 1.0, 0.9, 0.8, 0.9, 1.0, 1.1, 1.1, 1.0],
+        'CILANTRO': [1.1, 1.2, 1.1, 1.0, 0.9, 0.9, 1.0, 1.1, 1.2, 1.1, 1.0, 1.1]
+    }
+
+    # Temperaturas ideales para cada producto (°C) - rangos más específicos
+    TEMPERATURAS_IDEALES = {
+        'PAPA CRIOLLA': {'min': 8, 'ideal': 14, 'max': 18, 'optimo_bajo': 12, 'optimo_alto': 16},
+        'PAPA PASTUSA': {'min': 6, 'ideal': 12, 'max': 16, 'optimo_bajo': 10, 'optimo_alto': 14},
+        'ZANAHORIA': {'min': 12, 'ideal': 18, 'max': 24, 'optimo_bajo': 16, 'optimo_alto': 20},
+        'CEBOLLA CABEZONA': {'min': 10, 'ideal': 16, 'max': 22, 'optimo_bajo': 14, 'optimo_alto': 18},
+        'CEBOLLA LARGA': {'min': 14, 'ideal': 20, 'max': 26, 'optimo_bajo': 18, 'optimo_alto': 22},
+        'LECHUGA': {'min': 8, 'ideal': 14, 'max': 20, 'optimo_bajo': 12, 'optimo_alto': 16},
+        'REPOLLO': {'min': 6, 'ideal': 13, 'max': 18, 'optimo_bajo': 11, 'optimo_alto': 15},
+        'CILANTRO': {'min': 12, 'ideal': 18, 'max': 25, 'optimo_bajo': 16, 'optimo_alto': 20},
+        'PEREJIL': {'min': 10, 'ideal': 16, 'max': 22, 'optimo_bajo': 14, 'optimo_alto': 18},
+        'APIO': {'min': 8, 'ideal': 14, 'max': 20, 'optimo_bajo': 12, 'optimo_alto': 16},
+        'ACELGA': {'min': 6, 'ideal': 13, 'max': 20, 'optimo_bajo': 11, 'optimo_alto': 15},
+        'ESPINACA': {'min': 4, 'ideal': 10, 'max': 16, 'optimo_bajo': 8, 'optimo_alto': 12},
+        'BRÓCOLI': {'min': 6, 'ideal': 13, 'max': 18, 'optimo_bajo': 11, 'optimo_alto': 15},
+        'COLIFLOR': {'min': 8, 'ideal': 14, 'max': 20, 'optimo_bajo': 12, 'optimo_alto': 16},
+        'REMOLACHA': {'min': 10, 'ideal': 16, 'max': 22, 'optimo_bajo': 14, 'optimo_alto': 18},
+    }
+
     def __init__(self):
         self.fecha_base = datetime.now()
         self.use_real_data = True
         self.cache_duration = 3600
-        self._cached_data = None
-        self._cache_timestamp = None
+        self.cache_precios = CachePreciosCompartido(ttl=self.cache_duration)
         self.datos_reales_service = DatosRealesService()
+        # Métricas y resultado de la última descarga procesada (ingesta)
+        self.metricas_ingesta = {}
+        self.ultima_descarga = None
 
     def obtener_precios_actuales(self, limit: int = 1000) -> List[Dict]:
         """
         Obtiene datos de precios con sistema de fallback jerárquico.
-        Prioriza fuentes de datos en orden de confiabilidad.
+        Prioriza fuentes de datos en orden de confiabilidad: primero la tabla
+        local alimentada por la ingesta programada (`manage.py ingestar_sipsa`).
         """
         if self.use_real_data:
+            try:
+                precios = self._obtener_precios_reales(limit)
+                if precios:
+                    return precios
+            except Exception:
+                pass
+
             try:
                 return self.datos_reales_service.obtener_precios_actuales_reales(limit)
             except Exception as e:
-                try:
-                    return self._obtener_precios_reales(limit)
-                except Exception as e2:
-                    return self._obtener_precios_simulados(limit)
+                return self._obtener_precios_simulados(limit)
         else:
             return self._obtener_precios_simulados(limit)
 
     def _obtener_precios_reales(self, limit: int = 1000) -> List[Dict]:
         """
-        Extrae datos del SIPSA-DANE mediante múltiples endpoints.
-        Implementa sistema de cache para optimizar rendimiento.
+        Lee los precios del SIPSA persistidos localmente por la ingesta.
+        Usa el cache compartido entre workers para evitar consultas repetidas;
+        ninguna petición HTTP externa ocurre en el ciclo de la solicitud.
         """
-        if self._is_cache_valid():
-            return self._cached_data[:limit]
+        precios = self.cache_precios.obtener(self.CLAVE_CACHE_REALES, self._leer_precios_almacenados)
+        return precios[:limit]
 
-        precios = []
+    def _leer_precios_almacenados(self) -> List[Dict]:
+        """
+        Consulta los registros más recientes de la tabla de precios del SIPSA
+        """
+        registros = PrecioSipsa.objects.order_by('-fecha', 'producto')[:self.MAX_REGISTROS_ALMACENADOS]
+        return [registro.como_dict() for registro in registros]
 
-        for i, url in enumerate(self.SIPSA_API_URLS):
-            try:
-                response = requests.get(url, timeout=15)
-                response.raise_for_status()
-
-                if 'json' in url:
-                    data = response.json()
-                    precios = self._procesar_json_sipsa(data)
-                else:
-                    csv_data = response.text
-                    reader = csv.DictReader(io.StringIO(csv_data))
-
-                    for row in reader:
-                        try:
-                            precio_info = self._procesar_fila_sipsa(row)
-                            if precio_info:
-                                precios.append(precio_info)
-                        except Exception as e:
-                            continue
+    def _descargar_precios_sipsa(self) -> List[Dict]:
+        """
+        Descarga y procesa los precios consultando en paralelo los endpoints del SIPSA.
+        Solo se invoca desde la ingesta programada, nunca desde las vistas.
+        Retorna una lista vacía si el servidor indica que no hay cambios (304).
+        """
+        self.ultima_descarga = DescargadorSipsa(self).descargar(self.SIPSA_API_URLS)
+        if self.ultima_descarga.metricas:
+            self.metricas_ingesta = self.ultima_descarga.metricas
+        return self.ultima_descarga.precios
 
-                if precios:
-                    break
+    def iterar_precios_csv(self, url: str = None, timeout: int = 60) -> Iterator[Dict]:
+        """
+        Descarga en streaming el CSV completo del SIPSA y produce registros
+        normalizados a medida que llegan, descartando productos no relevantes.
+        La memoria se mantiene constante sin importar el tamaño del dataset.
+        """
+        url = url or self.SIPSA_API_URLS[2]
+        with solicitar_condicional(url, timeout=timeout, stream=True) as response:
+            if response.status_code == 304:
+                self.ultima_descarga = ResultadoDescarga(url, no_modificado=True)
+                return
+            response.raise_for_status()
+            yield from self._procesar_csv_stream(response)
+            self.ultima_descarga = ResultadoDescarga(url, validadores=validadores_de(response))
 
-            except Exception as e:
-                continue
+    def confirmar_descarga(self) -> None:
+        """
+        Confirma que la última descarga quedó persistida, habilitando las
+        solicitudes condicionales (ETag / If-Modified-Since) para la próxima
+        """
+        confirmar_validadores(self.ultima_descarga)
 
-        self._cached_data = precios
-        self._cache_timestamp = datetime.now()
+    def _procesar_csv_stream(self, response, metricas: Dict = None) -> Iterator[Dict]:
+        """
+        Recorre el cuerpo de la respuesta por bloques con `iter_lines` y
+        procesa cada fila del CSV sin cargar el archivo completo en memoria
+        """
+        # Sin charset explícito requests asume ISO-8859-1; el SIPSA publica en UTF-8
+        content_type = response.headers.get('content-type', '')
+        encoding = response.encoding if 'charset' in content_type.lower() else 'utf-8'
 
-        return precios[:limit]
+        lineas = response.iter_lines(chunk_size=self.TAMANO_BLOQUE_CSV)
+        reader = csv.reader(self._decodificar_lineas(lineas, encoding or 'utf-8'))
+
+        # El encabezado se resuelve una sola vez en un extractor por posición
+        encabezado = next(reader, None)
+        if not encabezado:
+            return
+        extractor = ExtractorFilasSipsa(encabezado)
+        if metricas is None:
+            metricas = self.metricas_ingesta = self._nuevas_metricas()
+
+        try:
+            for fila in reader:
+                metricas['filas_leidas'] += 1
+                precio_info = extractor.procesar(fila)
+                if precio_info:
+                    metricas['registros_validos'] += 1
+                    yield precio_info
+        finally:
+            metricas['fechas_invalidas'] = extractor.detector_fechas.fallidas
+
+    def _decodificar_lineas(self, lineas: Iterator[bytes], encoding: str) -> Iterator[str]:
+        """
+        Decodifica incrementalmente las líneas recibidas, eliminando el BOM inicial
+        """
+        primera = True
+        for linea in lineas:
+            texto = linea.decode(encoding, errors='replace') if isinstance(linea, bytes) else linea
+            if primera:
+                texto = texto.lstrip('\ufeff')
+                primera = False
+            yield texto
+
+    def _nuevas_metricas(self) -> Dict:
+        """
+        Métricas de procesamiento de una descarga.
+        `fechas_invalidas` cuenta las filas cuya fecha no pudo interpretarse
+        y quedaron registradas con la fecha actual.
+        """
+        return {'filas_leidas': 0, 'registros_validos': 0, 'fechas_invalidas': 0}
+
+    def invalidar_cache(self) -> None:
+        """
+        Invalida explícitamente el cache compartido de precios del SIPSA
+        """
+        self.cache_precios.invalidar(self.CLAVE_CACHE_REALES)
 
     def _obtener_precios_simulados(self, limit: int = 1000) -> List[Dict]:
         """
@@ -110,11 +259,12 @@ class SipsaService:
         Utilizado como sistema de respaldo cuando fallan fuentes primarias.
         """
         precios = []
+        aleatorio = generador('simulados', self.fecha_base.strftime('%Y-%m-%d'))
 
         for producto, info in self.PRODUCTOS_BASE.items():
             for i in range(5):
                 fecha = self.fecha_base - timedelta(days=i*7)
-                variacion = random.uniform(0.8, 1.2)
+                variacion = aleatorio.uniform(0.8, 1.2)
                 precio_actual = int(info['precio_base'] * variacion)
 
                 precio_info = {
@@ -234,167 +384,20 @@ class SipsaService:
     def _calcular_rentabilidad(self, precio_promedio: float, producto: str = None) -> float:
         """
         Calcula rentabilidad basada en costos de producción reales y precio de venta.
-        Utiliza datos aproximados del sector agrícola colombiano.
-        """
-        if not precio_promedio or not producto:
-            return 0
-
-        # Costos balanceados para rango completo 0-100% con distribución realista
-        costos_produccion = {
-            'PAPA CRIOLLA': {
-                'semilla': 2800000, 'fertilizantes': 2200000, 'pesticidas': 1600000,
-                'mano_obra': 4200000, 'maquinaria': 1100000, 'otros': 800000,
-                'rendimiento_kg_ha': 16000, 'ciclo_meses': 5, 'riesgo_factor': 0.80,
-                'dificultad': 'media', 'volatilidad_mercado': 0.25, 'rentabilidad_base': 45
-            },
-            'PAPA PASTUSA': {
-                'semilla': 2400000, 'fertilizantes': 1900000, 'pesticidas': 1400000,
-                'mano_obra': 3800000, 'maquinaria': 1000000, 'otros': 700000,
-                'rendimiento_kg_ha': 18000, 'ciclo_meses': 4, 'riesgo_factor': 0.85,
-                'dificultad': 'baja', 'volatilidad_mercado': 0.20, 'rentabilidad_base': 55
-            },
-            'ZANAHORIA': {
-                'semilla': 1200000, 'fertilizantes': 1800000, 'pesticidas': 1300000,
-                'mano_obra': 3200000, 'maquinaria': 800000, 'otros': 500000,
-                'rendimiento_kg_ha': 22000, 'ciclo_meses': 4, 'riesgo_factor': 0.90,
-                'dificultad': 'baja', 'volatilidad_mercado': 0.15, 'rentabilidad_base': 65
-            },
-            'CEBOLLA CABEZONA': {
-                'semilla': 1600000, 'fertilizantes': 2200000, 'pesticidas': 1800000,
-                'mano_obra': 3600000, 'maquinaria': 900000, 'otros': 600000,
-                'rendimiento_kg_ha': 20000, 'ciclo_meses': 5, 'riesgo_factor': 0.70,
-                'dificultad': 'alta', 'volatilidad_mercado': 0.30, 'rentabilidad_base': 35
-            },
-            'CEBOLLA LARGA': {
-                'semilla': 1400000, 'fertilizantes': 2000000, 'pesticidas': 1600000,
-                'mano_obra': 4200000, 'maquinaria': 700000, 'otros': 500000,
-                'rendimiento_kg_ha': 12000, 'ciclo_meses': 4, 'riesgo_factor': 0.60,
-                'dificultad': 'muy_alta', 'volatilidad_mercado': 0.40, 'rentabilidad_base': 25
-            },
-            'LECHUGA': {
-                'semilla': 800000, 'fertilizantes': 1200000, 'pesticidas': 900000,
-                'mano_obra': 2400000, 'maquinaria': 500000, 'otros': 300000,
-                'rendimiento_kg_ha': 10000, 'ciclo_meses': 3, 'riesgo_factor': 0.95,
-                'dificultad': 'muy_baja', 'volatilidad_mercado': 0.12, 'rentabilidad_base': 75
-            },
-            'CILANTRO': {
-                'semilla': 1000000, 'fertilizantes': 1600000, 'pesticidas': 1200000,
-                'mano_obra': 3000000, 'maquinaria': 600000, 'otros': 400000,
-                'rendimiento_kg_ha': 5000, 'ciclo_meses': 2, 'riesgo_factor': 0.50,
-                'dificultad': 'extrema', 'volatilidad_mercado': 0.60, 'rentabilidad_base': 15
-            },
-            'BRÓCOLI': {
-                'semilla': 2000000, 'fertilizantes': 2600000, 'pesticidas': 2000000,
-                'mano_obra': 3800000, 'maquinaria': 1000000, 'otros': 700000,
-                'rendimiento_kg_ha': 13000, 'ciclo_meses': 4, 'riesgo_factor': 0.75,
-                'dificultad': 'media', 'volatilidad_mercado': 0.22, 'rentabilidad_base': 40
-            }
-        }
-
-        # Obtener datos del producto o usar promedio
-        datos = costos_produccion.get(producto, {
-            'semilla': 1600000, 'fertilizantes': 2000000, 'pesticidas': 1500000,
-            'mano_obra': 3400000, 'maquinaria': 800000, 'otros': 600000,
-            'rendimiento_kg_ha': 15000, 'ciclo_meses': 4, 'riesgo_factor': 0.75,
-            'dificultad': 'media', 'volatilidad_mercado': 0.25, 'rentabilidad_base': 45
-        })
-
-        # Calcular costo total de producción
-        costo_total = (datos['semilla'] + datos['fertilizantes'] + datos['pesticidas'] +
-                      datos['mano_obra'] + datos['maquinaria'] + datos['otros'])
-
-        # Costo por kilogramo
-        costo_por_kg = costo_total / datos['rendimiento_kg_ha']
-
-        # Usar rentabilidad base del producto como punto de partida
-        rentabilidad_base_producto = datos.get('rentabilidad_base', 45)
-
-        # Calcular factor de precio vs costo
-        if precio_promedio > costo_por_kg:
-            ratio_precio_costo = precio_promedio / costo_por_kg
-            # Escala más amplia para permitir rango completo
-            if ratio_precio_costo > 2.0:
-                # Precios muy altos pueden dar rentabilidades altas
-                rentabilidad_calculada = rentabilidad_base_producto * (ratio_precio_costo * 0.8)
-            elif ratio_precio_costo > 1.5:
-                rentabilidad_calculada = rentabilidad_base_producto * (ratio_precio_costo * 0.9)
-            else:
-                rentabilidad_calculada = rentabilidad_base_producto * (ratio_precio_costo * 1.1)
-        else:
-            # Pérdida cuando precio < costo
-            rentabilidad_calculada = -((costo_por_kg - precio_promedio) / costo_por_kg) * 80
-
-        # Aplicar factor de riesgo
-        factor_riesgo = datos.get('riesgo_factor', 0.75)
-        rentabilidad_ajustada = rentabilidad_calculada * factor_riesgo
-
-        # Factor de dificultad con rango más amplio
-        dificultad = datos.get('dificultad', 'media')
-        factor_dificultad = {
-            'muy_baja': 1.25,   # Cultivos muy fáciles
-            'baja': 1.15,       # Cultivos fáciles
-            'media': 1.00,      # Neutro
-            'alta': 0.85,       # Cultivos difíciles
-            'muy_alta': 0.70,   # Muy difíciles
-            'extrema': 0.50     # Extremadamente difíciles
-        }.get(dificultad, 1.0)
-
-        rentabilidad_ajustada *= factor_dificultad
-
-        # Factor de ciclo más balanceado
-        factor_ciclo = 3.5 / datos['ciclo_meses']  # Base 3.5 meses
-        if factor_ciclo > 1.5:
-            factor_ciclo = 1.5  # Limitar ventaja máxima
-        rentabilidad_ajustada *= factor_ciclo
-
-        # Volatilidad del mercado balanceada
-        volatilidad = datos.get('volatilidad_mercado', 0.25)
-        import random
-        import hashlib
-        semilla = int(hashlib.md5(producto.encode()).hexdigest()[:8], 16) % 10000
-        random.seed(semilla)
-
-        # Variabilidad simétrica
-        factor_mercado = random.uniform(1 - volatilidad, 1 + volatilidad)
-        rentabilidad_final = rentabilidad_ajustada * factor_mercado
-
-        # Factor estacional balanceado
-        fecha_actual = datetime.now()
-        mes = fecha_actual.month
-        factor_estacional = {
-            1: 1.10, 2: 1.05, 3: 1.00, 4: 0.95, 5: 0.98, 6: 1.02,
-            7: 0.85, 8: 0.90, 9: 0.95, 10: 1.05, 11: 1.12, 12: 1.08
-        }.get(mes, 1.0)
-
-        rentabilidad_final *= factor_estacional
-
-        # Aplicar curva de saturación más agresiva para distribución realista
-        if rentabilidad_final > 60:
-            import math
-            # Curva logarítmica que hace más difícil llegar a valores altos
-            exceso = rentabilidad_final - 60
-            rentabilidad_final = 60 + (40 * (1 - math.exp(-exceso / 25)))
-
-        # Factor de realismo adicional - reducir rentabilidades muy altas
-        if rentabilidad_final > 80:
-            factor_realismo = 0.85  # 15% de reducción para valores muy altos
-            rentabilidad_final *= factor_realismo
-
-        # Rango completo 0-100% con distribución más realista
-        return max(-20, min(rentabilidad_final, 100))
+        Utiliza el modelo de costos precompilado por producto (ver modelo_costos).
+        """
+        return calcular_rentabilidad(precio_promedio, producto, datetime.now().month)
 
     def _generar_precios_por_contexto(self, municipio: str, fecha_siembra: datetime, clima_temp: float = None) -> List[Dict]:
         """
         Genera precios específicos según municipio, fecha y clima
         """
         # Usar municipio, fecha y clima como semilla
-        clima_factor = int(clima_temp * 10) if clima_temp else 150  # Default ~15°C
-        semilla = hash(f"{municipio}_{fecha_siembra.strftime('%Y-%m-%d')}_{clima_factor}") % 10000
-        random.seed(semilla)
+        semilla = self._semilla_contexto(municipio, fecha_siembra, clima_temp)
 
         precios = []
 
-        for producto, info in self.PRODUCTOS_BASE.items():
+        for indice, (producto, info) in enumerate(self.PRODUCTOS_BASE.items()):
             # Factor de municipio (cada municipio tiene diferentes condiciones)
             factor_municipio = self._obtener_factor_municipio(municipio, producto)
 
@@ -405,12 +408,12 @@ class SipsaService:
             factor_climatico = self._obtener_factor_climatico(producto, clima_temp)
 
             # Generar varios registros históricos
-            for i in range(5):
+            for i in range(self.SEMANAS_HISTORIAL):
                 fecha = fecha_siembra - timedelta(days=i*7)
 
                 # Aplicar todos los factores
                 precio_base_ajustado = info['precio_base'] * factor_municipio * factor_estacional * factor_climatico
-                variacion_aleatoria = random.uniform(0.85, 1.15)
+                variacion_aleatoria = uniforme(semilla, indice * self.SEMANAS_HISTORIAL + i, 0.85, 1.15)
                 precio_final = int(precio_base_ajustado * variacion_aleatoria)
 
                 precio_info = {
@@ -428,44 +431,18 @@ class SipsaService:
 
         return precios
 
+    def _semilla_contexto(self, municipio: str, fecha_siembra: datetime, clima_temp: float = None) -> int:
+        """
+        Semilla de la variación de precios para un municipio, fecha y clima
+        """
+        clima_factor = int(clima_temp * 10) if clima_temp else 150  # Default ~15°C
+        return semilla_estable(municipio, fecha_siembra.strftime('%Y-%m-%d'), clima_factor)
+
     def _obtener_factor_municipio(self, municipio: str, producto: str) -> float:
         """
         Cada municipio tiene diferentes condiciones para diferentes productos
         """
-        factores_municipio = {
-            'Facatativá': {
-                'PAPA CRIOLLA': 1.1, 'PAPA PASTUSA': 1.05, 'ZANAHORIA': 0.95,
-                'CEBOLLA CABEZONA': 1.0, 'LECHUGA': 1.05, 'CILANTRO': 1.15
-            },
-            'Madrid': {
-                'PAPA CRIOLLA': 1.05, 'PAPA PASTUSA': 1.1, 'ZANAHORIA': 1.0,
-                'CEBOLLA CABEZONA': 1.05, 'LECHUGA': 1.1, 'CILANTRO': 1.0
-            },
-            'Mosquera': {
-                'PAPA CRIOLLA': 0.95, 'PAPA PASTUSA': 1.0, 'ZANAHORIA': 1.1,
-                'CEBOLLA CABEZONA': 1.1, 'LECHUGA': 0.95, 'CILANTRO': 1.05
-            },
-            'El Rosal': {
-                'PAPA CRIOLLA': 1.0, 'PAPA PASTUSA': 0.95, 'ZANAHORIA': 1.05,
-                'CEBOLLA CABEZONA': 0.95, 'LECHUGA': 1.0, 'CILANTRO': 1.1
-            },
-            'Subachoque': {
-                'PAPA CRIOLLA': 1.15, 'PAPA PASTUSA': 1.1, 'ZANAHORIA': 0.9,
-                'CEBOLLA CABEZONA': 0.9, 'LECHUGA': 0.95, 'CILANTRO': 1.05
-            },
-            'Bojacá': {
-                'PAPA CRIOLLA': 1.05, 'PAPA PASTUSA': 1.0, 'ZANAHORIA': 1.05,
-                'CEBOLLA CABEZONA': 1.0, 'LECHUGA': 1.05, 'CILANTRO': 0.95
-            },
-            'Funza': {
-                'PAPA CRIOLLA': 1.02, 'PAPA PASTUSA': 1.00, 'ZANAHORIA': 1.12,
-                'CEBOLLA CABEZONA': 1.08, 'CEBOLLA LARGA': 1.05, 'LECHUGA': 1.06,
-                'CILANTRO': 1.10, 'BRÓCOLI': 0.98, 'COLIFLOR': 0.95,
-                'APIO': 1.08, 'PEREJIL': 1.05, 'ACELGA': 1.03
-            }
-        }
-
-        return factores_municipio.get(municipio, {}).get(producto, 1.0)
+        return self.FACTORES_MUNICIPIO.get(municipio, {}).get(producto, 1.0)
 
     def _obtener_factor_estacional(self, producto: str, fecha: datetime) -> float:
         """
@@ -473,16 +450,7 @@ class SipsaService:
         """
         mes = fecha.month
 
-        # Factores estacionales por producto (simulando épocas de cosecha)
-        factores_estacionales = {
-            'PAPA CRIOLLA': [1.2, 1.1, 0.9, 0.8, 0.9, 1.0, 1.1, 1.2, 1.1, 1.0, 1.1, 1.2],
-            'PAPA PASTUSA': [1.1, 1.0, 0.9, 0.9, 1.0, 1.1, 1.2, 1.1, 1.0, 1.0, 1.1, 1.1],
-            'ZANAHORIA': [0.9, 1.0, 1.1, 1.2, 1.1, 1.0, 0.9, 0.9, 1.0, 1.1, 1.0, 0.9],
-            'LECHUGA': [1.0, 1.1, 1.2, 1.1, 1.0, 0.9, 0.8, 0.9, 1.0, 1.1, 1.1, 1.0],
-            'CILANTRO': [1.1, 1.2, 1.1, 1.0, 0.9, 0.9, 1.0, 1.1, 1.2, 1.1, 1.0, 1.1]
-        }
-
-        return factores_estacionales.get(producto, [1.0] * 12)[mes - 1]
+        return self.FACTORES_ESTACIONALES.get(producto, [1.0] * 12)[mes - 1]
 
     def _ajustar_rentabilidad_por_contexto(self, rentabilidad_base: float, producto: str,
                                          municipio: str, fecha: datetime, clima_temp: float = None) -> float:
@@ -540,106 +508,24 @@ class SipsaService:
 
     def _is_cache_valid(self) -> bool:
         """
-        Verifica si el cache sigue siendo válido
+        Verifica si el cache compartido sigue siendo válido
         """
-        if not self._cached_data or not self._cache_timestamp:
-            return False
+        return self.cache_precios.es_vigente(self.CLAVE_CACHE_REALES)
 
-        tiempo_transcurrido = datetime.now() - self._cache_timestamp
-        return tiempo_transcurrido.total_seconds() < self.cache_duration
-
-    def _procesar_fila_sipsa(self, row: Dict) -> Optional[Dict]:
+    @property
+    def _cached_data(self) -> Optional[List[Dict]]:
         """
-        Procesa una fila del CSV del SIPSA y la convierte a nuestro formato
+        Datos almacenados en el cache compartido (vigentes o vencidos)
         """
-        try:
-            # Mapear campos del SIPSA a nuestro formato
-            # Nota: Los nombres exactos pueden variar, necesitamos verificar la estructura real
-
-            # Intentar extraer información básica
-            fecha_str = row.get('fecha', row.get('Fecha', ''))
-            producto = row.get('producto', row.get('Producto', row.get('PRODUCTO', ''))).strip().upper()
-            mercado = row.get('mercado', row.get('Mercado', row.get('MERCADO', 'Corabastos')))
-
-            # Precios (pueden estar en diferentes columnas)
-            precio_mayorista_str = (row.get('precio_mayorista', '') or
-                                  row.get('Precio Mayorista', '') or
-                                  row.get('PRECIO_MAYORISTA', '') or
-                                  row.get('precio', ''))
-
-            precio_minorista_str = (row.get('precio_minorista', '') or
-                                  row.get('Precio Minorista', '') or
-                                  row.get('PRECIO_MINORISTA', ''))
-
-            # Validar datos mínimos
-            if not producto or not precio_mayorista_str:
-                return None
-
-            # Limpiar y convertir precios
-            precio_mayorista = self._limpiar_precio(precio_mayorista_str)
-            precio_minorista = self._limpiar_precio(precio_minorista_str) or precio_mayorista * 1.3
-
-            if not precio_mayorista or precio_mayorista <= 0:
-                return None
-
-            # Procesar fecha
-            try:
-                if fecha_str:
-                    # Intentar diferentes formatos de fecha
-                    for formato in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d']:
-                        try:
-                            fecha_obj = datetime.strptime(fecha_str, formato)
-                            break
-                        except ValueError:
-                            continue
-                    else:
-                        fecha_obj = datetime.now()
-                else:
-                    fecha_obj = datetime.now()
-            except:
-                fecha_obj = datetime.now()
-
-            # Filtrar solo productos relevantes para la Sabana Occidental
-            productos_relevantes = [
-                'PAPA', 'ZANAHORIA', 'CEBOLLA', 'LECHUGA', 'REPOLLO',
-                'CILANTRO', 'PEREJIL', 'APIO', 'ACELGA', 'ESPINACA',
-                'BRÓCOLI', 'COLIFLOR', 'REMOLACHA'
-            ]
-
-            if not any(prod in producto for prod in productos_relevantes):
-                return None
-
-            return {
-                'fecha': fecha_obj.strftime('%Y-%m-%d'),
-                'fecha_obj': fecha_obj,
-                'mercado': mercado,
-                'producto': producto,
-                'variedad': row.get('variedad', row.get('Variedad', 'Estándar')),
-                'precio_mayorista': int(precio_mayorista),
-                'precio_minorista': int(precio_minorista),
-                'unidad': row.get('unidad', row.get('Unidad', 'KILO')),
-                'presentacion': row.get('presentacion', row.get('Presentacion', 'BULTO')),
-            }
-
-        except Exception as e:
-            return None
+        return self.cache_precios.leer(self.CLAVE_CACHE_REALES)
 
     def _limpiar_precio(self, precio_str: str) -> Optional[float]:
         """
         Limpia y convierte string de precio a float
         """
-        if not precio_str:
-            return None
-
-        try:
-            # Remover caracteres no numéricos excepto punto y coma
-            precio_limpio = ''.join(c for c in str(precio_str) if c.isdigit() or c in '.,')
-            precio_limpio = precio_limpio.replace(',', '')
-            return float(precio_limpio) if precio_limpio else None
-        except (ValueError, TypeError):
-            return None
+        return limpiar_precio(precio_str)
 
-    def _procesar_json_sipsa(self, data: Dict) -> List[Dict]:
+    def _procesar_json_sipsa(self, data: Dict, metricas: Dict = None) -> List[Dict]:
         """
         Procesa datos JSON del SIPSA
         """
@@ -656,21 +542,30 @@ class SipsaService:
                 name = col.get('name', '').lower()
                 column_map[name] = i
 
+            detector_fechas = DetectorFechas(['%Y-%m-%d'])
+            if metricas is None:
+                metricas = self.metricas_ingesta = self._nuevas_metricas()
+
             for row in rows:
+                metricas['filas_leidas'] += 1
                 try:
                     # Extraer datos usando el mapeo de columnas
-                    precio_info = self._procesar_fila_json(row, column_map)
+                    precio_info = self._procesar_fila_json(row, column_map, detector_fechas)
                     if precio_info:
                         precios.append(precio_info)
                 except Exception as e:
                     continue
 
+            metricas['registros_validos'] = len(precios)
+            metricas['fechas_invalidas'] = detector_fechas.fallidas
+
         except Exception as e:
             print(f"Error procesando JSON: {e}")
 
         return precios
 
-    def _procesar_fila_json(self, row: List, column_map: Dict) -> Optional[Dict]:
+    def _procesar_fila_json(self, row: List, column_map: Dict,
+                            detector_fechas: DetectorFechas = None) -> Optional[Dict]:
         """
         Procesa una fila de datos JSON
         """
@@ -705,23 +600,13 @@ class SipsaService:
                 return None
 
             # Filtrar productos relevantes
-            productos_relevantes = [
-                'PAPA', 'ZANAHORIA', 'CEBOLLA', 'LECHUGA', 'REPOLLO',
-                'CILANTRO', 'PEREJIL', 'APIO', 'ACELGA', 'ESPINACA',
-                'BRÓCOLI', 'COLIFLOR', 'REMOLACHA'
-            ]
-
-            if not any(prod in producto for prod in productos_relevantes):
+            if not es_producto_relevante(producto):
                 return None
 
-            # Procesar fecha
-            try:
-                if fecha_str:
-                    fecha_obj = datetime.strptime(fecha_str[:10], '%Y-%m-%d')
-                else:
-                    fecha_obj = datetime.now()
-            except:
-                fecha_obj = datetime.now()
+            # Procesar fecha (formato y textos ya vistos se reutilizan)
+            if detector_fechas is None:
+                detector_fechas = DetectorFechas(['%Y-%m-%d'])
+            fecha_obj = detector_fechas.parsear(fecha_str[:10])
 
             return {
                 'fecha': fecha_obj.strftime('%Y-%m-%d'),
@@ -745,26 +630,7 @@ class SipsaService:
         if temperatura is None:
             return 1.0  # Neutral si no hay datos climáticos
 
-        # Temperaturas ideales para cada producto (°C) - rangos más específicos
-        temperaturas_ideales = {
-            'PAPA CRIOLLA': {'min': 8, 'ideal': 14, 'max': 18, 'optimo_bajo': 12, 'optimo_alto': 16},
-            'PAPA PASTUSA': {'min': 6, 'ideal': 12, 'max': 16, 'optimo_bajo': 10, 'optimo_alto': 14},
-            'ZANAHORIA': {'min': 12, 'ideal': 18, 'max': 24, 'optimo_bajo': 16, 'optimo_alto': 20},
-            'CEBOLLA CABEZONA': {'min': 10, 'ideal': 16, 'max': 22, 'optimo_bajo': 14, 'optimo_alto': 18},
-            'CEBOLLA LARGA': {'min': 14, 'ideal': 20, 'max': 26, 'optimo_bajo': 18, 'optimo_alto': 22},
-            'LECHUGA': {'min': 8, 'ideal': 14, 'max': 20, 'optimo_bajo': 12, 'optimo_alto': 16},
-            'REPOLLO': {'min': 6, 'ideal': 13, 'max': 18, 'optimo_bajo': 11, 'optimo_alto': 15},
-            'CILANTRO': {'min': 12, 'ideal': 18, 'max': 25, 'optimo_bajo': 16, 'optimo_alto': 20},
-            'PEREJIL': {'min': 10, 'ideal': 16, 'max': 22, 'optimo_bajo': 14, 'optimo_alto': 18},
-            'APIO': {'min': 8, 'ideal': 14, 'max': 20, 'optimo_bajo': 12, 'optimo_alto': 16},
-            'ACELGA': {'min': 6, 'ideal': 13, 'max': 20, 'optimo_bajo': 11, 'optimo_alto': 15},
-            'ESPINACA': {'min': 4, 'ideal': 10, 'max': 16, 'optimo_bajo': 8, 'optimo_alto': 12},
-            'BRÓCOLI': {'min': 6, 'ideal': 13, 'max': 18, 'optimo_bajo': 11, 'optimo_alto': 15},
-            'COLIFLOR': {'min': 8, 'ideal': 14, 'max': 20, 'optimo_bajo': 12, 'optimo_alto': 16},
-            'REMOLACHA': {'min': 10, 'ideal': 16, 'max': 22, 'optimo_bajo': 14, 'optimo_alto': 18},
-        }
-
-        rango = temperaturas_ideales.get(producto)
+        rango = self.TEMPERATURAS_IDEALES.get(producto)
         if not rango:
             return 1.0
 
@@ -1,3 +1,701 @@
+import io
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import JsonResponse
+from asgiref.sync import sync_to_async
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .aleatoriedad import generador, semilla_estable
+from .cache_http import avanzar_snapshot, segundos_de_vigencia, snapshot_precios
+from .cache_precios import CachePreciosCompartido
+from .clima import ServicioClima
+from .clima_historico import cargar_clima_csv, generar_clima_diario, temperatura_diaria, temperatura_simulada
+from .descarga_sipsa import DescargadorSipsa, ResultadoDescarga, confirmar_validadores
+from .ingesta import guardar_precios, ingestar_precios_sipsa
+from .modelo_costos import (PERFILES_COSTO, calcular_rentabilidad, calcular_rentabilidad_vectorizada,
+                            calcular_rentabilidades, obtener_perfil)
+from .matriz_recomendaciones import MatrizRecomendaciones
+from .models import ClimaDiario, EventoRecomendacion, PrecioSipsa, ResumenEventosDiario
+from .recomendaciones_lote import EvaluadorLote
+from .eventos import compactar_eventos, id_municipio, id_producto, productos_mas_recomendados
+from .registro_solicitudes import EscritorDiferido
+from .serializacion import a_json, precios_columnares
+from .sipsa_parser import DetectorFechas, ExtractorFilasSipsa
+from .sipsa_service import SipsaService
+from .views import obtener_clima_simulado
+from usuarios.models import SolicitudRecomendacion
+
+
+class CachePreciosCompartidoTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cache_precios = CachePreciosCompartido(ttl=60)
+
+    def test_cache_compartido_entre_instancias(self):
+        cargador = mock.Mock(return_value=[{'producto': 'PAPA CRIOLLA'}])
+
+        self.cache_precios.obtener('prueba', cargador)
+        CachePreciosCompartido(ttl=60).obtener('prueba', cargador)
+
+        self.assertEqual(cargador.call_count, 1)
+
+    def test_invalidar_fuerza_recarga(self):
+        cargador = mock.Mock(return_value=[1, 2, 3])
+
+        self.cache_precios.obtener('prueba', cargador)
+        self.cache_precios.invalidar('prueba')
+        self.cache_precios.obtener('prueba', cargador)
+
+        self.assertEqual(cargador.call_count, 2)
+
+    def test_sirve_copia_vencida_mientras_otro_worker_refresca(self):
+        self.cache_precios.guardar('prueba', ['vencido'])
+        entrada = cache.get('sipsa:precios:prueba')
+        entrada['expira'] = time.time() - 1
+        cache.set('sipsa:precios:prueba', entrada)
+        cache.add('sipsa:precios:prueba:candado', 1)
+        cargador = mock.Mock(return_value=['nuevo'])
+
+        datos = self.cache_precios.obtener('prueba', cargador)
+
+        self.assertEqual(datos, ['vencido'])
+        cargador.assert_not_called()
+
+    def test_no_libera_el_candado_de_otro_worker(self):
+        def cargador():
+            # El candado de este worker expiró y otro worker lo tomó
+            cache.set('sipsa:precios:prueba:candado', 'otro-worker')
+            return ['nuevo']
+
+        self.cache_precios.obtener('prueba', cargador)
+
+        self.assertEqual(cache.get('sipsa:precios:prueba:candado'), 'otro-worker')
+        self.assertIsNone(self.cache_precios.adquirir_candado('prueba'))
+
+    def test_servicio_sipsa_reutiliza_lectura(self):
+        with mock.patch.object(SipsaService, '_leer_precios_almacenados',
+                               return_value=[{'producto': 'ZANAHORIA'}]) as lectura:
+            SipsaService()._obtener_precios_reales()
+            SipsaService()._obtener_precios_reales()
+
+        self.assertEqual(lectura.call_count, 1)
+        self.assertTrue(SipsaService()._is_cache_valid())
+
+
+class IngestaSipsaTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _precio(self, producto, fecha, precio):
+        return {
+            'fecha': fecha.strftime('%Y-%m-%d'), 'fecha_obj': fecha, 'mercado': 'Corabastos',
+            'producto': producto, 'variedad': 'Primera', 'precio_mayorista': precio,
+            'precio_minorista': int(precio * 1.3), 'unidad': 'KILO', 'presentacion': 'BULTO',
+        }
+
+    def test_guardar_precios_actualiza_registros_existentes(self):
+        fecha = datetime(2025, 8, 1)
+        guardar_precios([self._precio('ZANAHORIA', fecha, 1200)])
+        guardar_precios([self._precio('ZANAHORIA', fecha, 1350), self._precio('APIO', fecha, 2800)])
+
+        self.assertEqual(PrecioSipsa.objects.count(), 2)
+        self.assertEqual(PrecioSipsa.objects.get(producto='ZANAHORIA').precio_mayorista, 1350)
+
+    def test_vistas_leen_de_la_tabla_local_tras_la_ingesta(self):
+        servicio = SipsaService()
+        precios = [self._precio('PAPA CRIOLLA', datetime(2025, 8, 1), 2500)]
+
+        with mock.patch.object(SipsaService, '_descargar_precios_sipsa', return_value=precios):
+            ingestar_precios_sipsa(servicio)
+
+        with mock.patch('productores.descarga_sipsa.obtener_sesion') as sesion:
+            resultado = SipsaService().obtener_precios_actuales()
+
+        sesion.assert_not_called()
+        self.assertEqual(resultado[0]['producto'], 'PAPA CRIOLLA')
+        self.assertEqual(resultado[0]['precio_mayorista'], 2500)
+
+
+class RespuestaCsvFalsa:
+    """Respuesta mínima que entrega el CSV por líneas, como requests en streaming"""
+
+    def __init__(self, contenido: str, content_type: str = 'text/csv'):
+        self.lineas = contenido.encode('utf-8').splitlines()
+        self.headers = {'content-type': content_type}
+        self.encoding = 'ISO-8859-1'
+        self.lineas_entregadas = 0
+
+    def iter_lines(self, chunk_size=512):
+        for linea in self.lineas:
+            self.lineas_entregadas += 1
+            yield linea
+
+
+class StreamingCsvSipsaTests(TestCase):
+
+    def test_procesa_y_filtra_filas_a_medida_que_llegan(self):
+        contenido = '\ufeffFecha,Producto,Mercado,Precio Mayorista\n'
+        contenido += '2025-08-01,BRÓCOLI,Corabastos,3200\n'
+        contenido += '2025-08-01,MANGO TOMMY,Corabastos,4100\n'
+        contenido += '2025-08-02,ZANAHORIA,Corabastos,1200\n'
+        respuesta = RespuestaCsvFalsa(contenido)
+
+        registros = SipsaService()._procesar_csv_stream(respuesta)
+        primero = next(registros)
+
+        self.assertEqual(primero['producto'], 'BRÓCOLI')
+        self.assertEqual(respuesta.lineas_entregadas, 2)
+        self.assertEqual([r['producto'] for r in registros], ['ZANAHORIA'])
+
+
+class ExtractorFilasSipsaTests(TestCase):
+
+    def test_resuelve_columnas_alternativas_del_encabezado(self):
+        extractor = ExtractorFilasSipsa(['producto', 'fecha', 'PRECIO_MAYORISTA', 'precio', 'mercado'])
+
+        precio = extractor.procesar([' papa criolla ', '01/08/2025', '', '$2,500', 'Paloquemao'])
+
+        self.assertEqual(precio['producto'], 'PAPA CRIOLLA')
+        self.assertEqual(precio['precio_mayorista'], 2500)
+        self.assertEqual(precio['precio_minorista'], 3250)
+        self.assertEqual(precio['fecha'], '2025-08-01')
+        self.assertEqual(precio['mercado'], 'Paloquemao')
+        self.assertEqual(precio['presentacion'], 'BULTO')
+
+    def test_descarta_productos_no_relevantes(self):
+        extractor = ExtractorFilasSipsa(['Producto', 'Precio Mayorista', 'Fecha'])
+
+        self.assertIsNone(extractor.procesar(['MANGO TOMMY', '4100', '2025-08-01']))
+
+
+class DetectorFechasTests(TestCase):
+
+    def test_reutiliza_el_formato_detectado(self):
+        detector = DetectorFechas()
+
+        detector.parsear('13/08/2025')
+        fecha = detector.parsear('14/08/2025')
+
+        self.assertEqual(detector.formato_detectado, '%d/%m/%Y')
+        self.assertEqual(fecha, datetime(2025, 8, 14))
+        self.assertEqual(detector.parsear('2025-08-01'), datetime(2025, 8, 1))
+
+    def test_cuenta_las_fechas_que_caen_en_la_fecha_actual(self):
+        detector = DetectorFechas()
+
+        detector.parsear('')
+        detector.parsear('ayer')
+        detector.parsear('2025-08-01')
+
+        self.assertEqual(detector.fallidas, 2)
+
+    def test_memoriza_las_fechas_invalidas(self):
+        detector = DetectorFechas()
+
+        with mock.patch.object(detector, '_interpretar', wraps=detector._interpretar) as interpretar:
+            for _ in range(3):
+                detector.parsear('sin fecha')
+
+        self.assertEqual(interpretar.call_count, 1)
+        self.assertEqual(detector.fallidas, 3)
+
+    def test_metricas_de_ingesta_en_streaming(self):
+        contenido = 'Fecha,Producto,Precio Mayorista\n2025-08-01,APIO,2800\nsin fecha,ACELGA,1500\n'
+        servicio = SipsaService()
+
+        registros = list(servicio._procesar_csv_stream(RespuestaCsvFalsa(contenido)))
+
+        self.assertEqual(len(registros), 2)
+        self.assertEqual(servicio.metricas_ingesta,
+                         {'filas_leidas': 2, 'registros_validos': 2, 'fechas_invalidas': 1})
+
+
+
+class DescargadorSipsaTests(TestCase):
+
+    URL_JSON = 'https://sipsa.test/rows.json'
+    URL_CSV = 'https://sipsa.test/rows.csv'
+
+    def setUp(self):
+        cache.clear()
+
+    def _respuesta(self, status=200, json_data=None, headers=None):
+        respuesta = mock.MagicMock(status_code=status, headers=headers or {})
+        respuesta.__enter__.return_value = respuesta
+        respuesta.json.return_value = json_data
+        return respuesta
+
+    def _json_sipsa(self):
+        return {
+            'meta': {'view': {'columns': [{'name': 'Producto'}, {'name': 'Precio'}, {'name': 'Fecha'}]}},
+            'data': [['Zanahoria', '1200', '2025-08-01T00:00:00']],
+        }
+
+    def test_toma_el_primer_endpoint_valido_aunque_otro_falle(self):
+        def get(url, **kwargs):
+            if url == self.URL_CSV:
+                raise ConnectionError('timeout')
+            return self._respuesta(json_data=self._json_sipsa(), headers={'ETag': '"v1"'})
+
+        with mock.patch('productores.descarga_sipsa.obtener_sesion') as sesion:
+            sesion.return_value.get.side_effect = get
+            resultado = DescargadorSipsa(SipsaService()).descargar([self.URL_CSV, self.URL_JSON])
+
+        self.assertEqual(resultado.url, self.URL_JSON)
+        self.assertEqual(resultado.precios[0]['producto'], 'ZANAHORIA')
+        self.assertEqual(resultado.validadores, {'etag': '"v1"'})
+
+    def test_envia_validadores_confirmados_y_acepta_304(self):
+        PrecioSipsa.objects.create(producto='PAPA', mercado='Corabastos', fecha=datetime(2025, 8, 1).date(),
+                                   precio_mayorista=2500, precio_minorista=3000)
+        confirmar_validadores(ResultadoDescarga(self.URL_JSON, validadores={'etag': '"v1"'}))
+
+        with mock.patch('productores.descarga_sipsa.obtener_sesion') as sesion:
+            sesion.return_value.get.return_value = self._respuesta(status=304)
+            resultado = DescargadorSipsa(SipsaService()).descargar([self.URL_JSON])
+
+        headers = sesion.return_value.get.call_args.kwargs['headers']
+        self.assertEqual(headers, {'If-None-Match': '"v1"'})
+        self.assertTrue(resultado.no_modificado)
+        self.assertEqual(resultado.precios, [])
+
+    def test_tabla_vacia_descarga_completo(self):
+        confirmar_validadores(ResultadoDescarga(self.URL_JSON, validadores={'etag': '"v1"'}))
+
+        with mock.patch('productores.descarga_sipsa.obtener_sesion') as sesion:
+            sesion.return_value.get.return_value = self._respuesta(json_data=self._json_sipsa())
+            resultado = DescargadorSipsa(SipsaService()).descargar([self.URL_JSON])
+
+        self.assertEqual(sesion.return_value.get.call_args.kwargs['headers'], {})
+        self.assertEqual(resultado.precios[0]['producto'], 'ZANAHORIA')
+
+
+class ModeloCostosTests(TestCase):
+
+    def test_no_modifica_el_estado_global_de_random(self):
+        random.seed(42)
+        esperado = random.random()
+
+        random.seed(42)
+        calcular_rentabilidad(2750.0, 'PAPA CRIOLLA', 5)
+
+        self.assertEqual(random.random(), esperado)
+
+    def test_perfil_precompila_costo_por_kg(self):
+        perfil = obtener_perfil('ZANAHORIA')
+
+        self.assertAlmostEqual(perfil.costo_por_kg, 8800000 / 22000)
+        self.assertEqual(obtener_perfil('ZANAHORIA'), PERFILES_COSTO['ZANAHORIA'])
+
+    def test_lote_equivale_a_evaluacion_individual(self):
+        precios = [900.0, 2500.0, 4100.0]
+        productos = ['LECHUGA', 'PAPA CRIOLLA', 'APIO']
+
+        self.assertEqual(calcular_rentabilidades(precios, productos, 11),
+                         [calcular_rentabilidad(p, prod, 11) for p, prod in zip(precios, productos)])
+
+    def test_version_vectorizada_coincide_con_la_escalar(self):
+        productos = ['LECHUGA', 'PAPA CRIOLLA', 'APIO', 'CILANTRO']
+        precios = [[0.0, 2500.0, 4100.0, 90000.0], [650.0, 1200.0, 2800.0, 5200.0]]
+
+        vectorizada = calcular_rentabilidad_vectorizada(precios, productos, 7)
+
+        for fila, precios_fila in zip(vectorizada.tolist(), precios):
+            self.assertEqual(fila, [calcular_rentabilidad(p, prod, 7) for p, prod in zip(precios_fila, productos)])
+
+
+class EvaluadorLoteTests(TestCase):
+
+    def test_grilla_coincide_con_recomendaciones_escalares(self):
+        servicio = SipsaService()
+        municipios = ['Facatativá', 'Funza', 'Otro']
+        fechas = [datetime(2025, 1, 15) + timedelta(days=41 * d) for d in range(9)]
+        temperaturas = [None, 7.5, 14.0, 19.5, 27.0]
+
+        resultado = EvaluadorLote(servicio).evaluar(municipios, fechas, temperaturas)
+
+        self.assertEqual(resultado.forma, (3, 9, 5, len(servicio.PRODUCTOS_BASE)))
+        for m, municipio in enumerate(municipios):
+            for f, fecha in enumerate(fechas):
+                for t, temperatura in enumerate(temperaturas):
+                    self.assertEqual(resultado.recomendaciones(m, f, t),
+                                     servicio.obtener_productos_recomendados(municipio, fecha, temperatura))
+
+
+class MatrizRecomendacionesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.servicio = SipsaService()
+        self.matriz = MatrizRecomendaciones(self.servicio)
+        self.matriz.HORIZONTE_DIAS = 3
+
+    def test_consulta_equivale_al_calculo_en_el_bucket_de_temperatura(self):
+        fecha = datetime(2025, 9, 10)
+
+        for temperatura, bucket in [(14.3, 14.5), (14.2, 14.0), (None, None)]:
+            self.assertEqual(self.matriz.obtener('Madrid', fecha, temperatura),
+                             self.servicio.obtener_productos_recomendados('Madrid', fecha, bucket))
+
+    def test_actualizacion_incremental(self):
+        hoy = datetime(2025, 9, 10).date()
+        total_municipios = len(self.matriz.municipios)
+
+        self.assertEqual(self.matriz.actualizar(hoy, 9), 3 * total_municipios)
+        self.assertEqual(self.matriz.actualizar(hoy, 9), 0)
+        # Al avanzar un día solo se calcula el día que entra al horizonte
+        self.assertEqual(self.matriz.actualizar(hoy + timedelta(days=1), 9), total_municipios)
+
+        self.matriz.invalidar()
+        self.assertEqual(self.matriz.actualizar(hoy, 9), 3 * total_municipios)
+
+    def test_horizonte_completo_cabe_en_el_cache(self):
+        matriz = MatrizRecomendaciones(self.servicio)
+        hoy = datetime(2025, 9, 10).date()
+
+        self.assertEqual(matriz.actualizar(hoy, 9), matriz.HORIZONTE_DIAS * len(matriz.municipios))
+        self.assertEqual(matriz.actualizar(hoy, 9), 0)
+
+    def test_consultas_fuera_de_la_matriz_no_se_guardan(self):
+        hoy = datetime.now()
+        consultas = [('Madrid', datetime(9999, 12, 30)), ('Madrid', hoy - timedelta(days=2)),
+                     ('Narnia', hoy), ('Narnia2', hoy)]
+
+        def clave(municipio, fecha):
+            return self.matriz._clave(municipio, fecha.date(), self.matriz.version(), hoy.month)
+
+        for municipio, fecha in consultas:
+            dia = datetime.combine(fecha.date(), datetime.min.time())
+            self.assertEqual(self.matriz.obtener(municipio, fecha, 16.0),
+                             self.servicio.obtener_productos_recomendados(municipio, dia, 16.0))
+            self.assertIsNone(cache.get(clave(municipio, fecha)))
+
+        self.matriz.obtener('Madrid', hoy, 16.0)
+        self.assertIsNotNone(cache.get(clave('Madrid', hoy)))
+        self.assertLessEqual(self.matriz._timeout(datetime(9999, 12, 30).date(), hoy.date()),
+                             self.matriz.HORIZONTE_DIAS * 24 * 3600)
+
+    def test_version_sobrevive_al_desalojo_del_cache(self):
+        self.matriz.invalidar()
+        self.matriz.invalidar()
+        cache.clear()
+
+        self.assertEqual(self.matriz.version(), 2)
+        self.assertEqual(snapshot_precios()['version'], 0)
+
+    def test_consulta_precalculada_no_recalcula(self):
+        hoy = datetime.now().date()
+        self.matriz.actualizar(hoy)
+
+        with mock.patch.object(EvaluadorLote, 'evaluar') as evaluar:
+            recomendaciones = self.matriz.obtener('Funza', datetime.now(), 16.1)
+
+        evaluar.assert_not_called()
+        self.assertEqual(len(recomendaciones), 10)
+
+
+class AleatoriedadTests(TestCase):
+
+    def test_semilla_estable_no_depende_del_proceso(self):
+        # Valor fijo: hash() cambiaría con PYTHONHASHSEED
+        self.assertEqual(semilla_estable('Madrid', '2025-09-10', 150), 0xB1D0CD40D69D424C)
+
+    def test_generadores_independientes_del_estado_global(self):
+        random.seed(7)
+        esperado = random.random()
+
+        random.seed(7)
+        valores = [generador('clima', 'Funza', '2025-09-10').uniform(0, 1) for _ in range(2)]
+        obtener_clima_simulado('Funza', datetime(2025, 9, 10))
+        SipsaService().obtener_productos_recomendados('Funza', datetime(2025, 9, 10), 16.0)
+
+        self.assertEqual(valores[0], valores[1])
+        self.assertEqual(random.random(), esperado)
+
+
+class ServicioClimaTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.servicio = ServicioClima(api_key='clave', municipios=['Madrid', 'Funza'])
+
+    def test_barrido_concurrente_guarda_en_cache(self):
+        respuesta = mock.Mock(status_code=200)
+        respuesta.json.return_value = {'main': {'temp': 15.26}}
+
+        with mock.patch('productores.clima.obtener_sesion') as sesion:
+            sesion.return_value.get.return_value = respuesta
+            temperaturas = self.servicio.refrescar()
+
+        self.assertEqual(temperaturas, {'Madrid': 15.3, 'Funza': 15.3})
+        self.assertEqual(sesion.return_value.get.call_count, 2)
+
+        with mock.patch('productores.clima.obtener_sesion') as sesion:
+            self.assertEqual(self.servicio.temperatura_actual('Funza'), 15.3)
+        sesion.assert_not_called()
+
+    def test_sin_datos_no_espera_a_la_api(self):
+        with mock.patch.object(ServicioClima, 'programar_refresco') as programar:
+            self.assertIsNone(self.servicio.temperatura_actual('Madrid'))
+
+        programar.assert_called_once_with('Madrid')
+
+    def test_un_solo_barrido_a_la_vez(self):
+        with mock.patch.object(ServicioClima, 'refrescar', side_effect=lambda m: time.sleep(0.2)):
+            self.assertTrue(self.servicio.programar_refresco())
+            self.assertFalse(self.servicio.programar_refresco())
+
+
+class ClimaHistoricoTests(TestCase):
+
+    def test_tabla_generada_coincide_con_la_simulacion(self):
+        desde = datetime(2025, 1, 1).date()
+        generar_clima_diario(desde, 10, ['Madrid', 'Funza'])
+
+        self.assertEqual(ClimaDiario.objects.count(), 20)
+        registro = ClimaDiario.objects.get(municipio='Funza', fecha=desde + timedelta(days=3))
+        self.assertEqual(registro.temperatura, temperatura_simulada('Funza', registro.fecha))
+        self.assertEqual(temperatura_diaria('Funza', datetime(2025, 1, 4)), registro.temperatura)
+
+    def test_csv_reemplaza_valores_simulados(self):
+        generar_clima_diario(datetime(2025, 3, 1).date(), 2, ['Madrid'])
+        archivo = io.StringIO("municipio,fecha,temperatura\nMadrid,2025-03-02,13.7\n")
+
+        self.assertEqual(cargar_clima_csv(archivo), 1)
+        # Regenerar no pisa el valor cargado desde el CSV
+        generar_clima_diario(datetime(2025, 3, 1).date(), 2, ['Madrid'])
+
+        self.assertEqual(temperatura_diaria('Madrid', datetime(2025, 3, 2)), 13.7)
+        self.assertEqual(ClimaDiario.objects.get(fecha='2025-03-02').fuente, ClimaDiario.FUENTE_CSV)
+
+
+class RecomendarProductosViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = get_user_model().objects.create_user(username='agricultor', password='clave-segura')
+        self.escritor = EscritorDiferido(EventoRecomendacion)
+
+    async def test_vista_asincrona_registra_eventos(self):
+        await self.async_client.aforce_login(self.usuario)
+
+        with mock.patch('productores.eventos.obtener_escritor', return_value=self.escritor), \
+                mock.patch.object(EscritorDiferido, '_asegurar_hilo'):
+            respuesta = await self.async_client.get(reverse('recomendar_productos'),
+                                                    {'municipio': 'Funza', 'fecha': '2025-09-10'})
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.context['recomendaciones']), 10)
+        # La vista solo encola; la escritura ocurre en lote y no toca SolicitudRecomendacion
+        self.assertEqual(await EventoRecomendacion.objects.acount(), 0)
+        self.assertEqual(await sync_to_async(self.escritor.vaciar)(), 10)
+        self.assertEqual(await EventoRecomendacion.objects.filter(usuario_id=self.usuario.pk).acount(), 10)
+        self.assertEqual(await SolicitudRecomendacion.objects.acount(), 0)
+
+    async def test_visitante_anonimo_recibe_recomendaciones(self):
+        with mock.patch('productores.eventos.obtener_escritor', return_value=self.escritor), \
+                mock.patch.object(EscritorDiferido, '_asegurar_hilo'):
+            respuesta = await self.async_client.get(reverse('recomendar_productos'), {'municipio': 'Madrid'})
+
+        self.assertEqual(len(respuesta.context['recomendaciones']), 10)
+        await sync_to_async(self.escritor.vaciar)()
+        self.assertEqual(await EventoRecomendacion.objects.filter(usuario_id=None).acount(), 10)
+
+
+class EventosRecomendacionTests(TestCase):
+
+    def _evento(self, fecha, producto='ZANAHORIA', usuario_id=1, puntaje=425):
+        return EventoRecomendacion(usuario_id=usuario_id, municipio=id_municipio('Funza'),
+                                   producto=id_producto(producto), puntaje=puntaje,
+                                   fecha=timezone.make_aware(fecha))
+
+    def test_compactacion_resume_y_elimina_eventos_antiguos(self):
+        hoy = datetime(2025, 9, 10).date()
+        EventoRecomendacion.objects.bulk_create([
+            self._evento(datetime(2025, 7, 1, 9)),
+            self._evento(datetime(2025, 7, 1, 15), usuario_id=2),
+            self._evento(datetime(2025, 9, 9, 12), producto='LECHUGA'),
+            self._evento(datetime(2025, 9, 10, 8)),
+        ])
+
+        self.assertEqual(compactar_eventos(retencion_dias=30, hoy=hoy), (2, 2))
+
+        resumen = ResumenEventosDiario.objects.get(dia='2025-07-01')
+        self.assertEqual((resumen.eventos, resumen.usuarios, resumen.suma_puntaje), (2, 2, 850))
+        # El día en curso y los días dentro de la retención conservan sus eventos crudos
+        self.assertEqual(EventoRecomendacion.objects.count(), 2)
+        # Recompactar es idempotente
+        self.assertEqual(compactar_eventos(retencion_dias=30, hoy=hoy), (1, 0))
+        self.assertEqual(ResumenEventosDiario.objects.get(dia='2025-09-09').eventos, 1)
+
+    def test_ranking_combina_resumen_y_eventos_recientes(self):
+        hoy = datetime(2025, 9, 10).date()
+        EventoRecomendacion.objects.bulk_create([
+            self._evento(datetime(2025, 9, 1, 9)),
+            self._evento(datetime(2025, 9, 1, 10)),
+            self._evento(datetime(2025, 9, 1, 11), producto='LECHUGA', puntaje=300),
+        ])
+        compactar_eventos(retencion_dias=1, hoy=hoy)
+        EventoRecomendacion.objects.bulk_create([
+            self._evento(datetime(2025, 9, 10, 9), producto='LECHUGA', puntaje=500),
+            self._evento(datetime(2025, 9, 10, 10), producto='LECHUGA', puntaje=100),
+        ])
+
+        self.assertEqual(productos_mas_recomendados(dias=30, hoy=hoy), [
+            {'producto': 'LECHUGA', 'total': 3, 'rentabilidad_promedio': 30.0},
+            {'producto': 'ZANAHORIA', 'total': 2, 'rentabilidad_promedio': 42.5},
+        ])
+
+
+class EscritorDiferidoTests(TestCase):
+
+    def setUp(self):
+        self.usuario = get_user_model().objects.create_user(username='agricultor', password='clave-segura')
+
+    def _solicitudes(self, cantidad):
+        return [SolicitudRecomendacion(agricultor=self.usuario, municipio='Funza', cultivo_deseado=f'P{i}')
+                for i in range(cantidad)]
+
+    def test_vaciar_escribe_en_lotes(self):
+        escritor = EscritorDiferido(SolicitudRecomendacion, tamano_lote=10)
+
+        with mock.patch.object(EscritorDiferido, '_asegurar_hilo'):
+            escritor.registrar(self._solicitudes(25))
+        with mock.patch.object(EscritorDiferido, '_escribir', wraps=escritor._escribir) as escribir:
+            self.assertEqual(escritor.vaciar(), 25)
+
+        self.assertEqual([len(llamada.args[0]) for llamada in escribir.call_args_list], [10, 10, 5])
+        self.assertEqual(SolicitudRecomendacion.objects.count(), 25)
+
+    def test_hilo_agrupa_las_filas_en_un_lote(self):
+        escritor = EscritorDiferido(SolicitudRecomendacion, intervalo=0.2)
+        escrito = threading.Event()
+
+        with mock.patch.object(EscritorDiferido, '_escribir', side_effect=lambda lote: escrito.set()) as escribir:
+            for solicitud in self._solicitudes(3):
+                escritor.registrar([solicitud])
+            self.assertTrue(escrito.wait(2))
+
+        self.assertEqual(len(escribir.call_args.args[0]), 3)
+
+
+class CacheHttpTests(TestCase):
+    """
+    GET condicional de las APIs JSON según el snapshot de precios
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('api_precios_sipsa')
+
+    def test_validadores_y_cache_control(self):
+        respuesta = self.client.get(self.url)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.has_header('ETag'))
+        self.assertTrue(respuesta.has_header('Last-Modified'))
+        self.assertIn('public', respuesta['Cache-Control'])
+        self.assertIn('s-maxage=', respuesta['Cache-Control'])
+
+    def test_304_sin_ejecutar_la_vista(self):
+        etag = self.client.get(self.url, {'producto': 'PAPA'})['ETag']
+
+        with mock.patch.object(SipsaService, 'obtener_precios_por_producto') as obtener:
+            respuesta = self.client.get(self.url, {'producto': 'PAPA'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+        self.assertIn('s-maxage=', respuesta['Cache-Control'])
+        obtener.assert_not_called()
+
+    def test_etag_depende_de_parametros_y_snapshot(self):
+        etag = self.client.get(self.url, {'producto': 'PAPA'})['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'producto': 'ARVEJA'})['ETag'], etag)
+
+        precios = [{'fecha': '2025-08-01', 'fecha_obj': datetime(2025, 8, 1), 'mercado': 'Corabastos',
+                    'producto': 'PAPA', 'precio_mayorista': 2500, 'precio_minorista': 3000}]
+        with mock.patch.object(SipsaService, '_descargar_precios_sipsa', return_value=precios):
+            ingestar_precios_sipsa(SipsaService())
+
+        self.assertEqual(snapshot_precios()['version'], 1)
+        respuesta = self.client.get(self.url, {'producto': 'PAPA'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_vigencia_hasta_la_proxima_ingesta(self):
+        ahora = timezone.make_aware(datetime(2025, 8, 1, 9, 0))
+        avanzar_snapshot(ahora=ahora - timedelta(hours=1))
+
+        with self.settings(SIPSA_INTERVALO_INGESTA=6 * 3600):
+            self.assertEqual(segundos_de_vigencia(ahora), 5 * 3600)
+        with self.settings(SIPSA_INTERVALO_INGESTA=24 * 3600), \
+                mock.patch('productores.cache_http.timezone.localdate', return_value=ahora.date()):
+            # El cambio de día llega antes que la próxima ingesta
+            self.assertEqual(segundos_de_vigencia(ahora), 15 * 3600)
+
+
+class SerializacionTests(TestCase):
+    """
+    Payloads columnares y JSON serializado una vez por snapshot
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('api_precios_sipsa')
+
+    def test_precios_columnares_sin_fecha_obj(self):
+        precios = [
+            {'fecha': '2025-08-01', 'fecha_obj': datetime(2025, 8, 1), 'mercado': 'Corabastos',
+             'producto': 'PAPA', 'precio_mayorista': 2500, 'precio_minorista': 3000},
+            {'fecha': '2025-08-08', 'fecha_obj': datetime(2025, 8, 8), 'mercado': 'Corabastos',
+             'producto': 'PAPA', 'precio_mayorista': 2600, 'precio_minorista': 3100},
+        ]
+
+        columnas = precios_columnares(precios)['PAPA']
+
+        self.assertEqual(columnas['fecha'], ['2025-08-01', '2025-08-08'])
+        self.assertEqual(columnas['precio_mayorista'], [2500, 2600])
+        self.assertNotIn('fecha_obj', columnas)
+        self.assertEqual(a_json({'nombre': 'Facatativá', 'fecha': datetime(2025, 8, 1)}),
+                         '{"nombre":"Facatativá","fecha":"2025-08-01T00:00:00"}'.encode())
+
+    def test_formato_por_defecto_sin_cambios(self):
+        precios = [{'fecha': '2025-08-0%d' % d, 'fecha_obj': datetime(2025, 8, d), 'mercado': 'Corabastos',
+                    'producto': 'PAPA', 'variedad': 'Estándar', 'precio_mayorista': 2500 + d,
+                    'precio_minorista': 3000, 'unidad': 'KILO', 'presentacion': 'BULTO'} for d in range(1, 8)]
+
+        with mock.patch.object(SipsaService, 'obtener_precios_corabastos', return_value=precios * 10):
+            respuesta = self.client.get(self.url)
+
+        anterior = JsonResponse({'precios': (precios * 10)[:50], 'total': 70})
+        self.assertEqual(respuesta.json(), json.loads(anterior.content))
+
+    def test_formato_columnar_opcional(self):
+        filas = self.client.get(self.url).json()
+        columnar = self.client.get(self.url, {'formato': 'columnas'}).json()
+
+        self.assertEqual(columnar['total'], filas['total'])
+        self.assertEqual(sum(len(c['fecha']) for c in columnar['productos'].values()), len(filas['precios']))
+        self.assertNotIn('fecha_obj', next(iter(columnar['productos'].values())))
+
+    def test_contenido_reutilizado_hasta_el_siguiente_snapshot(self):
+        primera = self.client.get(self.url, {'producto': 'PAPA'})
+
+        with mock.patch.object(SipsaService, 'obtener_precios_por_producto') as obtener:
+            self.assertEqual(self.client.get(self.url, {'producto': 'PAPA'}).content, primera.content)
+            obtener.assert_not_called()
 
-# Create your tests here.
+            obtener.return_value = []
+            avanzar_snapshot()
+            self.assertEqual(self.client.get(self.url, {'producto': 'PAPA'}).json(), {'precios': [], 'total': 0})
@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Dict
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import VersionDatos
+
+# Las lecturas se memorizan un momento en el cache; si la copia se desaloja
+# se vuelve a leer la base de datos, que es la fuente de verdad
+TTL_MEMO = 60
+
+
+def _clave_memo(nombre: str) -> str:
+    return f"version:{nombre}"
+
+
+def estado_version(nombre: str, alias: str = 'default') -> Dict:
+    """
+    Versión vigente del contador y el instante en que avanzó por última vez
+    """
+    cache = caches[alias]
+    estado = cache.get(_clave_memo(nombre))
+    if estado is None:
+        fila = VersionDatos.objects.filter(nombre=nombre).values('valor', 'actualizado').first()
+        estado = {'version': fila['valor'], 'actualizado': fila['actualizado']} if fila else \
+            {'version': 0, 'actualizado': None}
+        # add: una lectura no pisa la copia que acaba de dejar una escritura
+        cache.add(_clave_memo(nombre), estado, TTL_MEMO)
+    return estado
+
+
+def leer_version(nombre: str, alias: str = 'default') -> int:
+    return estado_version(nombre, alias)['version']
+
+
+def avanzar_version(nombre: str, alias: str = 'default', ahora: datetime = None) -> Dict:
+    """
+    Incrementa el contador de forma atómica y descarta la copia memorizada
+    (también al confirmar la transacción en curso, para que ningún lector
+    deje en el cache un valor sin confirmar o revertido)
+    """
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        VersionDatos.objects.get_or_create(nombre=nombre)
+        VersionDatos.objects.filter(nombre=nombre).update(valor=F('valor') + 1, actualizado=ahora)
+        valor = VersionDatos.objects.values_list('valor', flat=True).get(nombre=nombre)
+
+    cache = caches[alias]
+    cache.delete(_clave_memo(nombre))
+    transaction.on_commit(lambda: cache.delete(_clave_memo(nombre)))
+    return {'version': valor, 'actualizado': ahora}
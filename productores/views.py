@@ -1,74 +1,42 @@
-import os
-import requests
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse
 from datetime import datetime
 from .sipsa_service import SipsaService
+from .cache_http import cache_por_snapshot
+from .clima import ServicioClima
+from .clima_historico import temperatura_diaria
+from .matriz_recomendaciones import MatrizRecomendaciones
+from .serializacion import a_json, contenido_en_cache, guardar_contenido, precios_columnares, respuesta_json
+from .eventos import registrar_recomendaciones_mostradas
 import random
-from usuarios import models as usuarios
 
 def obtener_clima_openweather(ciudad, fecha):
     """
-    Obtiene datos meteorológicos mediante API de OpenWeatherMap.
-    Implementa sistema de fallback para fechas no actuales.
+    Obtiene datos meteorológicos de OpenWeatherMap desde el cache compartido
+    (ver ServicioClima); nunca espera a la API durante la solicitud.
+    Implementa sistema de fallback para fechas no actuales o sin datos.
     """
-    from datetime import datetime
-
     hoy = datetime.now().date()
     fecha_consulta = fecha.date() if hasattr(fecha, 'date') else fecha
     diferencia_dias = abs((fecha_consulta - hoy).days)
 
     if diferencia_dias <= 1:
-        api_key = os.getenv("OPENWEATHER_API_KEY")
-
-        if api_key:
-            try:
-                url = f"https://api.openweathermap.org/data/2.5/weather?q={ciudad},CO&appid={api_key}&units=metric&lang=es"
-
-                respuesta = requests.get(url, timeout=10)
-                if respuesta.status_code == 200:
-                    datos = respuesta.json()
-                    temperatura = round(datos['main']['temp'], 1)
-                    return temperatura
-            except requests.RequestException as e:
-                pass
+        temperatura = ServicioClima().temperatura_actual(ciudad)
+        if temperatura is not None:
+            return temperatura
 
     return obtener_clima_simulado(ciudad, fecha)
 
 def obtener_clima_simulado(ciudad, fecha):
     """
-    Genera datos climáticos simulados basados en patrones meteorológicos
-    de la Sabana de Bogotá con variación estacional y geográfica.
+    Temperatura diaria del municipio desde la tabla local de clima
+    (`manage.py cargar_clima`), con patrones meteorológicos de la Sabana
+    de Bogotá como respaldo para fechas no cargadas.
     """
-    import random
-
-    temperaturas_base = {
-        'Facatativá': 16.5,
-        'Madrid': 15.8,
-        'Mosquera': 16.8,
-        'El Rosal': 14.2,
-        'Subachoque': 13.5,
-        'Bojacá': 16.3,
-        'Funza': 16.1
-    }
-
-    mes = fecha.month
-    variacion_estacional = {
-        1: -2.0, 2: -1.5, 3: 0.0, 4: 1.5, 5: 1.0, 6: -0.5,
-        7: -1.5, 8: -1.0, 9: 0.0, 10: 0.8, 11: 0.5, 12: -1.8
-    }
-
-    temp_base = temperaturas_base.get(ciudad, 15.5)
-    variacion_mes = variacion_estacional.get(mes, 0)
-
-    semilla = hash(f"{ciudad}_{fecha.strftime('%Y-%m-%d')}") % 1000
-    random.seed(semilla)
-    variacion_diaria = random.uniform(-2.0, 2.0)
-
-    temperatura_final = temp_base + variacion_mes + variacion_diaria
-    temperatura_final = round(max(6.0, min(temperatura_final, 28.0)), 1)
-
-    return temperatura_final
+    return temperatura_diaria(ciudad, fecha)
 
 def obtener_mensaje_gracioso(max_rentabilidad, municipio, fecha):
     """
@@ -119,9 +87,11 @@ def obtener_mensaje_gracioso(max_rentabilidad, municipio, fecha):
 
     return None  # No mostrar mensaje si la rentabilidad es >= 50%
 
-def recomendar_productos(request):
+async def recomendar_productos(request):
     """
-    Vista principal para recomendaciones de productos usando datos del SIPSA
+    Vista principal para recomendaciones de productos usando datos del SIPSA.
+    Es asíncrona: bajo ASGI el clima, las recomendaciones y las estadísticas
+    del mercado se obtienen en paralelo sin bloquear el worker.
     """
     municipios = ['Facatativá', 'Madrid', 'Mosquera', 'El Rosal', 'Subachoque', 'Bojacá', 'Funza']
     fecha_siembra = request.GET.get('fecha')
@@ -140,28 +110,23 @@ def recomendar_productos(request):
     sipsa_service = SipsaService()
 
     try:
-        # Obtener clima primero
-        clima = obtener_clima_openweather(ciudad, fecha_siembra)
-
-        # Obtener recomendaciones basadas en municipio, fecha y clima
-        recomendaciones = sipsa_service.obtener_productos_recomendados(ciudad, fecha_siembra, clima)
-
-        # Registrar las solicitudes en la base de datos
+        # Clima + recomendaciones y estadísticas del mercado en paralelo
+        (clima, recomendaciones), estadisticas = await asyncio.gather(
+            _obtener_clima_y_recomendaciones(sipsa_service, ciudad, fecha_siembra),
+            sync_to_async(sipsa_service.obtener_estadisticas_mercado, thread_sensitive=False)(),
+        )
+
+        # Registrar las recomendaciones mostradas en el log de eventos; se
+        # escriben en lote en segundo plano, fuera de la latencia de la página
         if recomendaciones:
-            for rec in recomendaciones:
-                usuarios.SolicitudRecomendacion.objects.create(
-                    agricultor=request.user if request.user.is_authenticated else None,
-                    municipio=ciudad,
-                    cultivo_deseado=rec['producto'],
-                    estado="pendiente"
-                )
-
-        # Obtener estadísticas del mercado
-        estadisticas = sipsa_service.obtener_estadisticas_mercado()
+            usuario = await request.auser()
+            registrar_recomendaciones_mostradas(
+                usuario.pk if usuario.is_authenticated else None, ciudad, recomendaciones
+            )
 
         # Si no hay recomendaciones, mostrar mensaje
         if not recomendaciones:
-            return render(request, 'recomendaciones.html', {
+            return await sync_to_async(render)(request, 'recomendaciones.html', {
                 'error': 'No se pudieron obtener datos del SIPSA en este momento. Intente más tarde.',
                 'municipios': municipios,
                 'municipio_seleccionado': ciudad,
@@ -175,7 +140,7 @@ def recomendar_productos(request):
             if max_rentabilidad < 50:  # Si el máximo es menor a 50%
                 mensaje_gracioso = obtener_mensaje_gracioso(max_rentabilidad, ciudad, fecha_siembra)
 
-        return render(request, 'recomendaciones.html', {
+        return await sync_to_async(render)(request, 'recomendaciones.html', {
             'recomendaciones': recomendaciones,
             'estadisticas': estadisticas,
             'fecha_proyeccion': fecha_siembra.strftime('%Y-%m-%d'),
@@ -187,19 +152,38 @@ def recomendar_productos(request):
         })
 
     except Exception as e:
-        return render(request, 'recomendaciones.html', {
+        return await sync_to_async(render)(request, 'recomendaciones.html', {
             'error': f'Error al obtener datos: {str(e)}',
             'municipios': municipios,
             'municipio_seleccionado': ciudad,
             'fecha_proyeccion': fecha_siembra.strftime('%Y-%m-%d'),
         })
-    
-    
 
+async def _obtener_clima_y_recomendaciones(sipsa_service, ciudad, fecha_siembra):
+    """
+    Obtiene el clima y, con él, las recomendaciones precalculadas.
+    Se ejecutan en hilos del pool (cache y base de datos) para no bloquear el event loop.
+    """
+    clima = await sync_to_async(obtener_clima_openweather, thread_sensitive=False)(ciudad, fecha_siembra)
+    recomendaciones = await sync_to_async(
+        MatrizRecomendaciones(sipsa_service).obtener, thread_sensitive=False
+    )(ciudad, fecha_siembra, clima)
+    return clima, recomendaciones
+
+@cache_por_snapshot('api_precios_sipsa')
 def api_precios_sipsa(request):
     """
-    API endpoint para obtener precios del SIPSA en formato JSON
+    API endpoint para obtener precios del SIPSA en formato JSON.
+
+    Por defecto devuelve la lista de registros (`precios`); con
+    `formato=columnas` los precios van en columnas por producto (ver
+    `precios_columnares`), un payload más compacto. El JSON serializado se
+    reutiliza mientras no cambie el snapshot.
     """
+    contenido = contenido_en_cache('api_precios_sipsa', request)
+    if contenido is not None:
+        return respuesta_json(contenido)
+
     sipsa_service = SipsaService()
 
     producto = request.GET.get('producto')
@@ -208,7 +192,13 @@ def api_precios_sipsa(request):
     else:
         precios = sipsa_service.obtener_precios_corabastos()
 
-    return JsonResponse({
-        'precios': precios[:50],  # Limitar a 50 resultados
-        'total': len(precios)
-    })
\ No newline at end of file
+    seleccion = precios[:50]  # Limitar a 50 resultados
+    if request.GET.get('formato') == 'columnas':
+        datos = {'productos': precios_columnares(seleccion)}
+    else:
+        datos = {'precios': seleccion}
+    datos['total'] = len(precios)
+
+    contenido = a_json(datos)
+    guardar_contenido('api_precios_sipsa', request, contenido)
+    return respuesta_json(contenido)
\ No newline at end of file
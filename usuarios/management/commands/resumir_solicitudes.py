@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from usuarios import reportes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen diario de solicitudes usado por el panel y los reportes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=2,
+            help='Días recientes (incluido hoy) que se recalculan',
+        )
+        parser.add_argument(
+            '--completo', action='store_true',
+            help='Recalcula el resumen de toda la tabla de solicitudes',
+        )
+
+    def handle(self, *args, **options):
+        if options['completo']:
+            filas = reportes.resumir_solicitudes()
+        else:
+            hoy = timezone.localdate()
+            filas = reportes.resumir_solicitudes(hoy - timedelta(days=options['dias'] - 1), hoy)
+        reportes.invalidar()
+        self.stdout.write(self.style.SUCCESS(f"Resumen de solicitudes actualizado: {filas} filas"))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solicitudrecomendacion',
+            index=models.Index(fields=['agricultor', 'fecha'], name='solicitud_agricultor_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudrecomendacion',
+            index=models.Index(fields=['estado', 'fecha'], name='solicitud_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudrecomendacion',
+            index=models.Index(fields=['fecha'], name='solicitud_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudrecomendacion',
+            index=models.Index(fields=['municipio', 'fecha'], name='solicitud_municipio_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_indices_solicitud'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenSolicitudesDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('cultivo_deseado', models.CharField(blank=True, default='', max_length=100)),
+                ('municipio', models.CharField(blank=True, default='', max_length=100)),
+                ('estado', models.CharField(max_length=20)),
+                ('viabilidad', models.CharField(max_length=50)),
+                ('solicitudes', models.PositiveIntegerField()),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0, help_text='Cantidad total en kg', max_digits=15)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'cultivo_deseado', 'municipio', 'estado', 'viabilidad'), name='resumen_solicitudes_unico')],
+            },
+        ),
+    ]
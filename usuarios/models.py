@@ -38,6 +38,35 @@ class SolicitudRecomendacion(models.Model):
     municipio = models.CharField(max_length=100, blank=True, null=True)  # Agregar campo municipio
     estado = models.CharField(max_length=20, default='pendiente')
     clima_recomendacion = models.TextField(blank=True, null=True)
+
+    class Meta:
+        # Índices alineados con los filtros y agrupaciones de los reportes y dashboards
+        indexes = [
+            models.Index(fields=['agricultor', 'fecha'], name='solicitud_agricultor_fecha_idx'),
+            models.Index(fields=['estado', 'fecha'], name='solicitud_estado_fecha_idx'),
+            models.Index(fields=['fecha'], name='solicitud_fecha_idx'),
+            models.Index(fields=['municipio', 'fecha'], name='solicitud_municipio_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"Solicitud de {self.agricultor.username} - {self.municipio} - {self.fecha_cultivo}"
+
+
+class ResumenSolicitudesDiario(models.Model):
+    """Roll-up diario de SolicitudRecomendacion por cultivo, municipio, estado y viabilidad"""
+    dia = models.DateField()
+    cultivo_deseado = models.CharField(max_length=100, blank=True, default='')
+    municipio = models.CharField(max_length=100, blank=True, default='')
+    estado = models.CharField(max_length=20)
+    viabilidad = models.CharField(max_length=50)
+    solicitudes = models.PositiveIntegerField()
+    cantidad = models.DecimalField(max_digits=15, decimal_places=2, default=0, help_text="Cantidad total en kg")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'cultivo_deseado', 'municipio', 'estado', 'viabilidad'],
+                                    name='resumen_solicitudes_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} - {self.cultivo_deseado} - {self.municipio} ({self.estado}): {self.solicitudes}"
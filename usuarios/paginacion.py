@@ -0,0 +1,74 @@
+import math
+from typing import List, Optional
+
+
+class PaginaKeyset:
+    """
+    Página de un queryset paginado por llave (keyset) sobre la clave primaria.
+
+    En lugar de OFFSET, cada página se pide relativa al último (o primer) id
+    de la página vecina: `pk > despues` o `pk < antes`. El costo de una página
+    es proporcional a su tamaño sin importar cuántas filas haya antes. Expone
+    la misma interfaz que usan las plantillas con `Paginator`; el número de
+    página viaja en la URL porque el keyset no lo conoce.
+    """
+
+    def __init__(self, queryset, tamano: int, despues: int = None, antes: int = None,
+                 ultima: bool = False, numero: int = 1, total: int = 0):
+        self.tamano = tamano
+        self.total = total
+        self.num_pages = max(1, math.ceil(total / tamano))
+
+        if ultima:
+            # La última página tiene el resto de las filas: mismos límites que al avanzar desde el inicio
+            resto = total - (self.num_pages - 1) * tamano
+            filas = list(queryset.order_by('-pk')[:max(resto, 0)])[::-1]
+            self.number = self.num_pages
+            self._hay_anterior, self._hay_siguiente = total > len(filas), False
+        elif antes is not None:
+            filas = list(queryset.filter(pk__lt=antes).order_by('-pk')[:tamano + 1])[::-1]
+            hay_mas = len(filas) > tamano
+            filas = filas[1:] if hay_mas else filas
+            self.number = max(1, numero) if hay_mas else 1
+            self._hay_anterior, self._hay_siguiente = hay_mas, True
+        else:
+            if despues is not None:
+                queryset = queryset.filter(pk__gt=despues)
+            filas = list(queryset.order_by('pk')[:tamano + 1])
+            hay_mas = len(filas) > tamano
+            filas = filas[:tamano]
+            self.number = min(max(1, numero), self.num_pages) if despues is not None else 1
+            self._hay_anterior, self._hay_siguiente = despues is not None, hay_mas
+
+        self.object_list: List = filas
+
+    @property
+    def paginator(self):
+        # Compatibilidad con las plantillas escritas para Paginator
+        return self
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self) -> bool:
+        return self._hay_anterior and bool(self.object_list)
+
+    def has_next(self) -> bool:
+        return self._hay_siguiente and bool(self.object_list)
+
+    def previous_page_number(self) -> int:
+        return max(1, self.number - 1)
+
+    def next_page_number(self) -> int:
+        return min(self.num_pages, self.number + 1)
+
+    @property
+    def cursor_anterior(self) -> Optional[int]:
+        return self.object_list[0].pk if self.object_list else None
+
+    @property
+    def cursor_siguiente(self) -> Optional[int]:
+        return self.object_list[-1].pk if self.object_list else None
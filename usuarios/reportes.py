@@ -0,0 +1,247 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.utils import timezone
+
+from productores.versiones import avanzar_version, leer_version
+
+from .models import ResumenSolicitudesDiario, SolicitudRecomendacion
+
+PREFIJO = 'reportes:solicitudes'
+
+# Vigencia de los reportes cacheados; las escrituras los invalidan antes
+TTL = 3600
+
+
+def _cache(alias: str = 'default'):
+    return caches[alias]
+
+
+def version(alias: str = 'default') -> int:
+    return leer_version(f"{PREFIJO}:version", alias)
+
+
+def version_agricultor(agricultor_id: int, alias: str = 'default') -> int:
+    return leer_version(f"{PREFIJO}:agricultor:{agricultor_id}:version", alias)
+
+
+def invalidar(alias: str = 'default', agricultores: Iterable[int] = ()) -> None:
+    """
+    Avanza la versión de los reportes de solicitudes (y la del resumen de
+    cada agricultor indicado); las entradas anteriores dejan de usarse y
+    expiran solas
+    """
+    avanzar_version(f"{PREFIJO}:version", alias)
+    for agricultor_id in set(agricultores):
+        avanzar_version(f"{PREFIJO}:agricultor:{agricultor_id}:version", alias)
+
+
+def _inicio_del_dia(dia: date) -> datetime:
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def resumir_solicitudes(desde: date = None, hasta: date = None) -> int:
+    """
+    Recalcula el resumen diario de los días entre `desde` y `hasta` (incluidos)
+    a partir de las solicitudes crudas; sin límites recalcula toda la tabla.
+    Es la carga inicial y la reparación del resumen; las escrituras de cada
+    solicitud lo mantienen con `mover_en_resumen`.
+    Retorna la cantidad de filas de resumen escritas.
+    """
+    crudas = SolicitudRecomendacion.objects.all()
+    resumen = ResumenSolicitudesDiario.objects.all()
+    if desde:
+        crudas = crudas.filter(fecha__gte=_inicio_del_dia(desde))
+        resumen = resumen.filter(dia__gte=desde)
+    if hasta:
+        crudas = crudas.filter(fecha__lt=_inicio_del_dia(hasta + timedelta(days=1)))
+        resumen = resumen.filter(dia__lte=hasta)
+
+    grupos = (crudas
+              .annotate(dia=TruncDate('fecha'),
+                        cultivo=Coalesce('cultivo_deseado', Value('')),
+                        lugar=Coalesce('municipio', Value('')))
+              .values('dia', 'cultivo', 'lugar', 'estado', 'viabilidad')
+              .annotate(total=Count('id'), cantidad_total=Sum('cantidad'))
+              .order_by())
+    filas = [
+        ResumenSolicitudesDiario(dia=grupo['dia'], cultivo_deseado=grupo['cultivo'], municipio=grupo['lugar'],
+                                 estado=grupo['estado'], viabilidad=grupo['viabilidad'],
+                                 solicitudes=grupo['total'], cantidad=grupo['cantidad_total'] or 0)
+        for grupo in grupos
+    ]
+
+    with transaction.atomic():
+        resumen.delete()
+        ResumenSolicitudesDiario.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def aporte_al_resumen(solicitud: SolicitudRecomendacion) -> Optional[Tuple[Dict, Decimal]]:
+    """
+    Fila del resumen diario a la que suma la solicitud y la cantidad que aporta
+    """
+    if solicitud is None or solicitud.fecha is None:
+        return None
+    clave = {
+        'dia': timezone.localdate(solicitud.fecha),
+        'cultivo_deseado': solicitud.cultivo_deseado or '',
+        'municipio': solicitud.municipio or '',
+        'estado': solicitud.estado,
+        'viabilidad': solicitud.viabilidad,
+    }
+    return clave, Decimal(str(solicitud.cantidad or 0))
+
+
+def _sumar_al_resumen(clave: Dict, solicitudes: int, cantidad: Decimal) -> None:
+    filas = ResumenSolicitudesDiario.objects.filter(**clave)
+    incremento = {'solicitudes': F('solicitudes') + solicitudes, 'cantidad': F('cantidad') + cantidad}
+    if filas.update(**incremento):
+        if solicitudes < 0:
+            filas.filter(solicitudes=0).delete()
+        return
+    if solicitudes <= 0:
+        # La fila no existe (resumen aún no reconstruido): lo corrige resumir_solicitudes
+        return
+    try:
+        with transaction.atomic():
+            ResumenSolicitudesDiario.objects.create(**clave, solicitudes=solicitudes, cantidad=cantidad)
+    except IntegrityError:
+        # Otra escritura creó la fila entre la actualización y la inserción
+        filas.update(**incremento)
+
+
+def mover_en_resumen(anterior: Optional[Tuple[Dict, Decimal]], nuevo: Optional[Tuple[Dict, Decimal]]) -> None:
+    """
+    Actualiza el resumen diario en forma incremental: resta el aporte
+    anterior de una solicitud y suma el nuevo (None al crear o al borrar).
+    Cada escritura toca solo las filas afectadas; `resumir_solicitudes`
+    queda para cargas iniciales y reparaciones.
+    """
+    if anterior and nuevo and anterior[0] == nuevo[0]:
+        if anterior[1] != nuevo[1]:
+            _sumar_al_resumen(nuevo[0], 0, nuevo[1] - anterior[1])
+        return
+    if anterior:
+        _sumar_al_resumen(anterior[0], -1, -anterior[1])
+    if nuevo:
+        _sumar_al_resumen(nuevo[0], 1, nuevo[1])
+
+
+def totales_solicitudes() -> Dict[str, int]:
+    """
+    Total de solicitudes y pendientes leídos del resumen diario
+    """
+    return ResumenSolicitudesDiario.objects.aggregate(
+        total=Coalesce(Sum('solicitudes'), 0),
+        pendientes=Coalesce(Sum('solicitudes', filter=Q(estado='pendiente')), 0),
+    )
+
+
+def cultivos_populares(limite: int = 3) -> List[Dict]:
+    return list(ResumenSolicitudesDiario.objects
+                .values('cultivo_deseado')
+                .annotate(total=Sum('solicitudes'))
+                .order_by('-total', 'cultivo_deseado')[:limite])
+
+
+def totales_reporte(desde: date = None, hasta: date = None, cultivo: str = None) -> Tuple[int, float]:
+    """
+    Cantidad de solicitudes y producción total del reporte de cultivos
+    """
+    resumen = ResumenSolicitudesDiario.objects.all()
+    if desde:
+        resumen = resumen.filter(dia__gte=desde)
+    if hasta:
+        resumen = resumen.filter(dia__lte=hasta)
+    if cultivo:
+        resumen = resumen.filter(cultivo_deseado__icontains=cultivo)
+    totales = resumen.aggregate(total=Coalesce(Sum('solicitudes'), 0), produccion=Sum('cantidad'))
+    return totales['total'], totales['produccion'] or 0
+
+
+def produccion_mensual(anio: int) -> List[float]:
+    """
+    Cantidad total solicitada por mes del año (12 valores) en una sola
+    consulta sobre el resumen diario
+    """
+    produccion = [0.0] * 12
+    totales = (ResumenSolicitudesDiario.objects
+               .filter(dia__year=anio)
+               .annotate(mes=TruncMonth('dia'))
+               .values('mes')
+               .annotate(total=Sum('cantidad'))
+               .order_by())
+    for fila in totales:
+        produccion[fila['mes'].month - 1] = float(fila['total'] or 0)
+    return produccion
+
+
+def datos_reportes_graficos(anio: int = None, alias: str = 'default') -> Dict:
+    """
+    Datos de los reportes gráficos del año, cacheados por año y por versión
+    """
+    anio = anio or timezone.localdate().year
+    cache = _cache(alias)
+    clave = f"{PREFIJO}:{version(alias)}:graficos:{anio}"
+
+    datos = cache.get(clave)
+    if datos is None:
+        datos = {
+            'cultivos_data': list(ResumenSolicitudesDiario.objects.values('cultivo_deseado').annotate(
+                total=Sum('solicitudes'),
+                cantidad_total=Sum('cantidad')
+            ).order_by('-total', 'cultivo_deseado')[:10]),
+            'produccion_mensual': produccion_mensual(anio),
+            'viabilidad_data': list(ResumenSolicitudesDiario.objects.values('viabilidad').annotate(
+                total=Sum('solicitudes')
+            ).order_by('viabilidad')),
+        }
+        cache.set(clave, datos, TTL)
+    return datos
+
+
+def resumen_agricultor(agricultor_id: int, alias: str = 'default') -> Dict:
+    """
+    Resumen del dashboard de un agricultor: totales, producción por cultivo y
+    viabilidad salen de una sola consulta agrupada por (cultivo, viabilidad),
+    cuyo tamaño no depende de cuántas solicitudes tenga; las solicitudes
+    recientes, de una consulta limitada. Cacheado por agricultor y versión.
+    """
+    cache = _cache(alias)
+    clave = f"{PREFIJO}:agricultor:{agricultor_id}:{version_agricultor(agricultor_id, alias)}"
+
+    resumen = cache.get(clave)
+    if resumen is None:
+        solicitudes = SolicitudRecomendacion.objects.filter(agricultor_id=agricultor_id)
+        grupos = (solicitudes
+                  .values('cultivo_deseado', 'viabilidad')
+                  .annotate(total=Count('id'), cantidad=Sum('cantidad'), ingresos=Sum('ingreso_proyectado'))
+                  .order_by())
+
+        por_cultivo: Dict = {}
+        por_viabilidad: Dict = {}
+        total_cultivos, total_produccion, ingresos_totales = 0, 0, 0
+        for grupo in grupos:
+            cantidad = grupo['cantidad'] or 0
+            por_cultivo[grupo['cultivo_deseado']] = por_cultivo.get(grupo['cultivo_deseado'], 0) + cantidad
+            por_viabilidad[grupo['viabilidad']] = por_viabilidad.get(grupo['viabilidad'], 0) + grupo['total']
+            total_cultivos += grupo['total']
+            total_produccion += cantidad
+            ingresos_totales += grupo['ingresos'] or 0
+
+        resumen = {
+            'total_cultivos': total_cultivos,
+            'total_produccion': total_produccion,
+            'ingresos_totales': ingresos_totales,
+            'produccion_por_cultivo': sorted(por_cultivo.items(), key=lambda item: item[1], reverse=True)[:10],
+            'viabilidad': list(por_viabilidad.items()),
+            'recientes': list(solicitudes.order_by('-fecha', '-pk')[:5]),
+        }
+        cache.set(clave, resumen, TTL)
+    return resumen
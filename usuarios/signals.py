@@ -0,0 +1,46 @@
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import reportes
+from .models import SolicitudRecomendacion
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_RESUMEN = ('fecha', 'cultivo_deseado', 'municipio', 'estado', 'viabilidad', 'cantidad')
+
+
+def _actualizar_reportes(instance, anterior, nuevo):
+    """
+    Mueve el aporte de la solicitud en el resumen diario e invalida los reportes cacheados
+    """
+    try:
+        with transaction.atomic():
+            reportes.mover_en_resumen(anterior, nuevo)
+    except IntegrityError:
+        logger.warning("Resumen de solicitudes del %s en conflicto; se recalculará", instance.fecha)
+    reportes.invalidar(agricultores=[instance.agricultor_id])
+
+
+@receiver(pre_save, sender=SolicitudRecomendacion)
+def recordar_aporte_anterior(sender, instance, **kwargs):
+    """
+    En una actualización, guarda a qué fila del resumen sumaba la solicitud
+    """
+    instance._aporte_anterior = None
+    if not instance._state.adding and instance.pk is not None:
+        anterior = sender.objects.filter(pk=instance.pk).only(*CAMPOS_RESUMEN).first()
+        instance._aporte_anterior = reportes.aporte_al_resumen(anterior)
+
+
+@receiver(post_save, sender=SolicitudRecomendacion)
+def actualizar_reportes_al_guardar(sender, instance, **kwargs):
+    _actualizar_reportes(instance, getattr(instance, '_aporte_anterior', None),
+                         reportes.aporte_al_resumen(instance))
+
+
+@receiver(post_delete, sender=SolicitudRecomendacion)
+def actualizar_reportes_al_borrar(sender, instance, **kwargs):
+    _actualizar_reportes(instance, reportes.aporte_al_resumen(instance), None)
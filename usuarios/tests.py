@@ -1,3 +1,358 @@
+import json
+from datetime import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import reportes
+from .paginacion import PaginaKeyset
+from .models import ResumenSolicitudesDiario, SolicitudRecomendacion, Usuario
+
+
+class IndicesSolicitudRecomendacionTests(TestCase):
+    """
+    Regresión de planes de consulta: sobre una tabla de solicitudes con
+    estadísticas actualizadas, los filtros de los reportes y dashboards deben
+    usar índices. La búsqueda por cultivo (icontains) y la agrupación por
+    viabilidad no tienen índice: un LIKE '%...%' no puede usarlo y los
+    reportes leen esos totales del resumen diario.
+    """
+
+    FILAS = 50_000
+    AGRICULTORES = 50
+    CULTIVOS = 15
+
+    @classmethod
+    def setUpTestData(cls):
+        Usuario.objects.bulk_create([Usuario(username=f'agricultor{i}') for i in range(cls.AGRICULTORES)])
+        cls.primer_agricultor = Usuario.objects.order_by('pk').first().pk
+
+        if connection.vendor == 'postgresql':
+            fecha = "TIMESTAMP '2024-01-01' + (n % 730) * INTERVAL '1 day'"
+        else:
+            fecha = "datetime('2024-01-01', '+' || (n % 730) || ' days')"
+
+        tabla = SolicitudRecomendacion._meta.db_table
+        with connection.cursor() as cursor:
+            # Generación en el motor con una serie recursiva, sin instanciar modelos
+            cursor.execute(f"""
+                WITH RECURSIVE serie(n) AS (
+                    SELECT 0 UNION ALL SELECT n + 1 FROM serie WHERE n + 1 < %s
+                )
+                INSERT INTO {tabla} (agricultor_id, fecha, cultivo_deseado, cantidad, precio_estimado,
+                                     ingreso_proyectado, viabilidad, municipio, estado)
+                SELECT %s + (n % %s), {fecha}, 'CULTIVO ' || (n % %s), n % 1000, 1500, 0,
+                       CASE WHEN n % 3 = 0 THEN 'alta' ELSE 'pendiente' END,
+                       'Municipio ' || (n % 7),
+                       CASE WHEN n % 20 = 0 THEN 'procesada' ELSE 'pendiente' END
+                FROM serie
+            """, [cls.FILAS, cls.primer_agricultor, cls.AGRICULTORES, cls.CULTIVOS])
+            cursor.execute("ANALYZE")
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan, f"El plan no usa {indice}:\n{plan}")
+
+    def test_tabla_sembrada(self):
+        self.assertEqual(SolicitudRecomendacion.objects.count(), self.FILAS)
+
+    def test_solicitudes_recientes_del_agricultor(self):
+        consulta = (SolicitudRecomendacion.objects
+                    .filter(agricultor_id=self.primer_agricultor)
+                    .order_by('-fecha')[:5])
+        self.assertUsaIndice(consulta, 'solicitud_agricultor_fecha_idx')
+
+    def test_filtro_por_estado(self):
+        consulta = SolicitudRecomendacion.objects.filter(estado='procesada').order_by('-fecha')
+        self.assertUsaIndice(consulta, 'solicitud_estado_fecha_idx')
+
+    def test_rango_de_fechas(self):
+        desde = timezone.make_aware(datetime(2024, 3, 1))
+        hasta = timezone.make_aware(datetime(2024, 3, 3))
+        consulta = SolicitudRecomendacion.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+        self.assertUsaIndice(consulta, 'solicitud_fecha_idx')
+
+    def test_municipio_y_fecha(self):
+        desde = timezone.make_aware(datetime(2025, 6, 1))
+        consulta = SolicitudRecomendacion.objects.filter(municipio='Municipio 2', fecha__gte=desde)
+        self.assertUsaIndice(consulta, 'solicitud_municipio_fecha_idx')
+
+
+class ReportesGraficosTests(TestCase):
+    """
+    Series mensuales en una sola consulta sobre el resumen diario, cacheadas
+    por año e invalidadas con cada escritura de solicitudes
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agricultor = Usuario.objects.create(username='agricultor')
+        for mes, cantidad in ((1, 100), (1, 50), (3, 200), (12, 10)):
+            solicitud = SolicitudRecomendacion.objects.create(agricultor=cls.agricultor, cultivo_deseado='PAPA',
+                                                              cantidad=cantidad, viabilidad='alta')
+            # fecha es auto_now_add: se ajusta después de crear
+            SolicitudRecomendacion.objects.filter(pk=solicitud.pk).update(
+                fecha=timezone.make_aware(datetime(2025, mes, 15)))
+        # update() no emite señales: recalcular como lo hace el job periódico
+        reportes.resumir_solicitudes()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_produccion_mensual_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            produccion = reportes.produccion_mensual(2025)
+        self.assertEqual(produccion, [150.0, 0, 200.0, 0, 0, 0, 0, 0, 0, 0, 0, 10.0])
+        self.assertEqual(reportes.produccion_mensual(2024), [0.0] * 12)
+
+    def test_datos_cacheados_por_anio(self):
+        reportes.version()  # el contador de versión se lee de la base y queda memorizado
+        with self.assertNumQueries(3):
+            datos = reportes.datos_reportes_graficos(2025)
+        with self.assertNumQueries(0):
+            self.assertEqual(reportes.datos_reportes_graficos(2025), datos)
+        self.assertEqual(datos['viabilidad_data'], [{'viabilidad': 'alta', 'total': 4}])
+
+    def test_escritura_invalida_el_cache(self):
+        hoy = timezone.localdate()
+        antes = reportes.datos_reportes_graficos(hoy.year)['produccion_mensual'][hoy.month - 1]
+        SolicitudRecomendacion.objects.create(agricultor=self.agricultor, cantidad=5)
+
+        despues = reportes.datos_reportes_graficos(hoy.year)['produccion_mensual'][hoy.month - 1]
+        self.assertEqual(despues, antes + 5)
+
+
+class ResumenSolicitudesDiarioTests(TestCase):
+    """
+    El resumen diario se mantiene con las señales de guardado y borrado y
+    reemplaza los conteos sobre la tabla cruda
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agricultor = Usuario.objects.create(username='agricultor', tipo='agricultor')
+        cls.admin = Usuario.objects.create(username='admin', tipo='admin')
+
+    def crear(self, **campos):
+        return SolicitudRecomendacion.objects.create(agricultor=self.agricultor, **campos)
+
+    def test_guardado_actualiza_el_resumen(self):
+        self.crear(cultivo_deseado='PAPA', municipio='Madrid', cantidad=10)
+        self.crear(cultivo_deseado='PAPA', municipio='Madrid', cantidad=5)
+        solicitud = self.crear(cultivo_deseado='ZANAHORIA', cantidad=1)
+
+        fila = ResumenSolicitudesDiario.objects.get(cultivo_deseado='PAPA')
+        self.assertEqual((fila.solicitudes, fila.cantidad, fila.dia), (2, 15, timezone.localdate()))
+        self.assertEqual(ResumenSolicitudesDiario.objects.get(cultivo_deseado='ZANAHORIA').municipio, '')
+
+        solicitud.estado = 'procesada'
+        solicitud.save()
+        self.assertEqual(reportes.totales_solicitudes(), {'total': 3, 'pendientes': 2})
+
+        solicitud.delete()
+        self.assertFalse(ResumenSolicitudesDiario.objects.filter(cultivo_deseado='ZANAHORIA').exists())
+
+    def resumen(self):
+        return sorted(ResumenSolicitudesDiario.objects.values_list(
+            'cultivo_deseado', 'municipio', 'estado', 'viabilidad', 'solicitudes', 'cantidad'))
+
+    def test_incremental_coincide_con_el_recalculo(self):
+        with mock.patch.object(reportes, 'resumir_solicitudes') as resumir:
+            papas = [self.crear(cultivo_deseado='PAPA', municipio='Madrid', cantidad=10) for _ in range(3)]
+            arveja = self.crear(cultivo_deseado='ARVEJA', cantidad=4)
+            papas[0].estado = 'procesada'
+            papas[0].save()
+            papas[1].cantidad = 25
+            papas[1].save()
+            arveja.cultivo_deseado = 'PAPA'
+            arveja.save()
+            papas[2].delete()
+        resumir.assert_not_called()
+
+        incremental = self.resumen()
+        reportes.resumir_solicitudes()
+        self.assertEqual(incremental, self.resumen())
+        self.assertNotIn('ARVEJA', [fila[0] for fila in incremental])
+
+    def test_borrado_en_cascada(self):
+        otro = Usuario.objects.create(username='otro', tipo='agricultor')
+        for _ in range(5):
+            SolicitudRecomendacion.objects.create(agricultor=otro, cultivo_deseado='PAPA', cantidad=2)
+        self.crear(cultivo_deseado='PAPA', cantidad=3)
+
+        otro.delete()
+
+        self.assertEqual(self.resumen(), [('PAPA', '', 'pendiente', 'pendiente', 1, 3)])
+
+    def test_filas_constantes_al_crecer_la_tabla(self):
+        for _ in range(20):
+            self.crear(cultivo_deseado='PAPA', municipio='Funza', cantidad=2)
+        self.assertEqual(ResumenSolicitudesDiario.objects.count(), 1)
+        self.assertEqual(reportes.totales_reporte(cultivo='pap'), (20, 40))
+        self.assertEqual(reportes.cultivos_populares(), [{'cultivo_deseado': 'PAPA', 'total': 20}])
+
+    def test_resumen_completo_coincide_con_tabla_cruda(self):
+        for i in range(12):
+            self.crear(cultivo_deseado=f'CULTIVO {i % 3}', municipio='Madrid', cantidad=i)
+        ResumenSolicitudesDiario.objects.all().delete()
+
+        reportes.resumir_solicitudes()
+
+        self.assertEqual(reportes.totales_reporte(), (12, 66))
+
+    def test_admin_dashboard_lee_el_resumen(self):
+        self.crear(cultivo_deseado='PAPA', cantidad=3)
+        self.client.force_login(self.admin)
+        with mock.patch('usuarios.views.productos_mas_recomendados', return_value=[]):
+            respuesta = self.client.get(reverse('admin_dashboard'))
+
+        self.assertEqual(respuesta.context['total_solicitudes'], 1)
+        self.assertEqual(respuesta.context['solicitudes_pendientes'], 1)
+        self.assertEqual(respuesta.context['cultivos_populares'], [{'cultivo_deseado': 'PAPA', 'total': 1}])
+
+    def test_reporte_cultivos_totales_del_resumen(self):
+        self.crear(cultivo_deseado='PAPA', cantidad=4)
+        self.crear(cultivo_deseado='ARVEJA', cantidad=6)
+        hoy = timezone.localdate().isoformat()
+        self.client.force_login(self.admin)
+
+        respuesta = self.client.get(reverse('reporte_cultivos'), {'fecha_inicio': hoy, 'fecha_fin': hoy})
+        self.assertEqual((respuesta.context['total_cultivos'], respuesta.context['total_produccion']), (2, 10))
+        self.assertEqual(len(respuesta.context['cultivos']), 2)
+
+        respuesta = self.client.get(reverse('reporte_cultivos'), {'agricultor': 'agri', 'cultivo': 'papa'})
+        self.assertEqual((respuesta.context['total_cultivos'], respuesta.context['total_produccion']), (1, 4))
+
+
+class ProduccionProyectadaTests(TestCase):
+    """
+    Filtros, ingresos y totales calculados en la base de datos con
+    paginación por llave
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create(username='admin', tipo='admin')
+        agricultor = Usuario.objects.create(username='agricultor')
+        SolicitudRecomendacion.objects.bulk_create(
+            [SolicitudRecomendacion(agricultor=agricultor, cultivo_deseado='PAPA' if i % 2 else 'ARVEJA',
+                                    cantidad=10 + i, precio_estimado=2, estado='procesada') for i in range(12)]
+            + [SolicitudRecomendacion(agricultor=agricultor, cultivo_deseado='PAPA', cantidad=0,
+                                      precio_estimado=2, estado='procesada'),
+               SolicitudRecomendacion(agricultor=agricultor, cultivo_deseado='PAPA', cantidad=50,
+                                      precio_estimado=2, estado='pendiente')]
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def obtener(self, **parametros):
+        return self.client.get(reverse('produccion_proyectada'), parametros)
+
+    def test_totales_en_la_base_de_datos(self):
+        contexto = self.obtener().context
+        # Cantidades 10..21 a precio 2; se excluyen cantidad 0 y no procesadas
+        self.assertEqual(contexto['total_cultivos'], 12)
+        self.assertEqual(float(contexto['total_proyectado']), 2 * sum(range(10, 22)))
+        self.assertAlmostEqual(float(contexto['rendimiento_promedio']), 15.5 * 0.9)
+
+        contexto = self.obtener(producto='PAPA').context
+        self.assertEqual(contexto['total_cultivos'], 6)
+        self.assertEqual(json.loads(contexto['datos_grafico']['labels']), ['PAPA'])
+
+    def test_paginacion_por_llave(self):
+        pagina = self.obtener().context['page_obj']
+        self.assertEqual((pagina.number, pagina.num_pages, len(pagina)), (1, 3, 5))
+        self.assertFalse(pagina.has_previous())
+
+        vistos = [fila.pk for fila in pagina]
+        while pagina.has_next():
+            pagina = self.obtener(despues=pagina.cursor_siguiente, pagina=pagina.next_page_number()).context['page_obj']
+            vistos += [fila.pk for fila in pagina]
+        self.assertEqual(pagina.number, 3)
+        self.assertEqual(len(vistos), 12)
+        self.assertEqual(vistos, sorted(set(vistos)))
+
+        anterior = self.obtener(antes=pagina.cursor_anterior, pagina=2).context['page_obj']
+        self.assertEqual([fila.pk for fila in anterior], vistos[5:10])
+        self.assertTrue(anterior.has_previous() and anterior.has_next())
+
+        # La última página coincide con la que se alcanza avanzando (12 filas: 5, 5 y 2)
+        ultima = self.obtener(ultima=1).context['page_obj']
+        self.assertEqual([fila.pk for fila in ultima], vistos[10:])
+        self.assertEqual(ultima.number, 3)
+        self.assertFalse(ultima.has_next())
+        anterior = self.obtener(antes=ultima.cursor_anterior, pagina=2).context['page_obj']
+        self.assertEqual([fila.pk for fila in anterior], vistos[5:10])
+
+    def test_costo_de_pagina_constante(self):
+        with self.assertNumQueries(3):
+            PaginaKeyset(SolicitudRecomendacion.objects.all(), 5, despues=0, total=14)
+            PaginaKeyset(SolicitudRecomendacion.objects.all(), 5, antes=10 ** 6, total=14)
+            PaginaKeyset(SolicitudRecomendacion.objects.all(), 5, ultima=True, total=14)
+
+
+class ResumenAgricultorTests(TestCase):
+    """
+    Dashboard del agricultor con una consulta agregada más la de solicitudes
+    recientes, cacheado por usuario
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agricultor = Usuario.objects.create(username='agricultor')
+        cls.otro = Usuario.objects.create(username='otro')
+        SolicitudRecomendacion.objects.bulk_create(
+            [SolicitudRecomendacion(agricultor=cls.agricultor, cultivo_deseado='PAPA' if i % 3 else 'ARVEJA',
+                                    cantidad=10, ingreso_proyectado=100, viabilidad='alta' if i % 2 else 'media')
+             for i in range(30)]
+            + [SolicitudRecomendacion(agricultor=cls.otro, cultivo_deseado='PAPA', cantidad=99)]
+        )
+        cls.ultima = SolicitudRecomendacion.objects.create(agricultor=cls.agricultor, cultivo_deseado='CEBOLLA',
+                                                           cantidad=5, ingreso_proyectado=50)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.agricultor)
+
+    def test_resumen_en_dos_consultas_y_cacheado(self):
+        reportes.version_agricultor(self.agricultor.pk)  # contador leído de la base y memorizado
+        with self.assertNumQueries(2):
+            resumen = reportes.resumen_agricultor(self.agricultor.pk)
+        with self.assertNumQueries(0):
+            reportes.resumen_agricultor(self.agricultor.pk)
+
+        self.assertEqual(resumen['total_cultivos'], 31)
+        self.assertEqual(resumen['total_produccion'], 305)
+        self.assertEqual(resumen['ingresos_totales'], 3050)
+        self.assertEqual(resumen['produccion_por_cultivo'][0], ('PAPA', 200))
+        self.assertEqual(dict(resumen['viabilidad']), {'alta': 15, 'media': 15, 'pendiente': 1})
+        self.assertEqual(resumen['recientes'][0], self.ultima)
+
+    def test_nueva_solicitud_invalida_solo_a_su_agricultor(self):
+        reportes.resumen_agricultor(self.agricultor.pk)
+        reportes.resumen_agricultor(self.otro.pk)
+
+        SolicitudRecomendacion.objects.create(agricultor=self.agricultor, cantidad=1)
+
+        self.assertEqual(reportes.resumen_agricultor(self.agricultor.pk)['total_cultivos'], 32)
+        with self.assertNumQueries(0):
+            reportes.resumen_agricultor(self.otro.pk)
+
+    def test_dashboard_data_api(self):
+        datos = self.client.get(reverse('dashboard_data_api')).json()
+
+        self.assertEqual(datos['estadisticas'], {'total_cultivos': 31, 'total_produccion': 305.0,
+                                                 'ingresos_totales': 3050.0})
+        self.assertEqual(datos['produccionPorCultivo']['labels'], ['PAPA', 'ARVEJA', 'CEBOLLA'])
+
+    def test_home_muestra_la_solicitud_mas_reciente(self):
+        contexto = self.client.get(reverse('home')).context
 
-# Create your tests here.
+        self.assertEqual(contexto['cultivo'], 'CEBOLLA')
+        self.assertEqual(contexto['cantidad'], 305)
+        self.assertEqual(len(contexto['solicitudes_recientes']), 5)
@@ -3,22 +3,26 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import JsonResponse
 from django.contrib import messages
-from django.db.models import Count, Sum, Q
+from django.db.models import Avg, Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
 from .forms import AgricultorRegistroForm, SolicitudRecomendacionForm
 from .models import SolicitudRecomendacion, Usuario
+from .paginacion import PaginaKeyset
+from .reportes import (cultivos_populares, datos_reportes_graficos, resumen_agricultor, totales_reporte,
+                       totales_solicitudes)
+from productores.eventos import productos_mas_recomendados
 import requests
 from django.views.decorators.csrf import csrf_exempt
 import json
 from datetime import datetime, timedelta
+from decimal import Decimal
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.contrib.auth.hashers import make_password
 import uuid
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.urls import reverse
-from django.core.paginator import Paginator
-import json
 from django.utils.safestring import mark_safe
 
 
@@ -31,22 +35,22 @@ def es_admin(user):
 @user_passes_test(es_admin)
 def admin_dashboard(request):
     """Vista principal del panel administrativo"""
-    # Estadísticas generales
-    total_usuarios = Usuario.objects.count()
-    total_agricultores = Usuario.objects.filter(tipo='agricultor').count()
-    total_solicitudes = SolicitudRecomendacion.objects.count()
-    solicitudes_pendientes = SolicitudRecomendacion.objects.filter(estado='pendiente').count()
+    # Estadísticas generales (solicitudes desde el resumen diario)
+    usuarios = Usuario.objects.aggregate(total=Count('id'), agricultores=Count('id', filter=Q(tipo='agricultor')))
+    total_usuarios = usuarios['total']
+    total_agricultores = usuarios['agricultores']
+    totales = totales_solicitudes()
+    total_solicitudes = totales['total']
+    solicitudes_pendientes = totales['pendientes']
     
     # Últimas solicitudes
-    ultimas_solicitudes = SolicitudRecomendacion.objects.all().order_by('-fecha')[:5]
+    ultimas_solicitudes = SolicitudRecomendacion.objects.select_related('agricultor').order_by('-fecha')[:5]
     
     # Solo 3 cultivos más populares
-    cultivos_populares = (
-        SolicitudRecomendacion.objects
-        .values('cultivo_deseado')
-        .annotate(total=Count('id'))
-        .order_by('-total')[:3]   # 👈 límite de 3
-    )
+    populares = cultivos_populares(limite=3)
+
+    # Productos más mostrados como recomendación (log de eventos compactado)
+    productos_recomendados = productos_mas_recomendados(dias=30, limite=5)
     
     context = {
         'total_usuarios': total_usuarios,
@@ -54,7 +58,8 @@ def admin_dashboard(request):
         'total_solicitudes': total_solicitudes,
         'solicitudes_pendientes': solicitudes_pendientes,
         'ultimas_solicitudes': ultimas_solicitudes,
-        'cultivos_populares': list(cultivos_populares),
+        'cultivos_populares': populares,
+        'productos_recomendados': productos_recomendados,
     }
     return render(request, 'admin_dashboard.html', context)
 
@@ -106,28 +111,33 @@ def gestionar_usuarios(request):
 @user_passes_test(es_admin)
 def reporte_cultivos(request):
     """Vista para generar reportes de cultivos"""
-    cultivos = SolicitudRecomendacion.objects.all()
+    cultivos = SolicitudRecomendacion.objects.select_related('agricultor')
     
     # Filtros
-    fecha_inicio = request.GET.get('fecha_inicio')
-    fecha_fin = request.GET.get('fecha_fin')
+    fecha_inicio = parse_date(request.GET.get('fecha_inicio') or '')
+    fecha_fin = parse_date(request.GET.get('fecha_fin') or '')
     agricultor = request.GET.get('agricultor')
     cultivo = request.GET.get('cultivo')
     
     if fecha_inicio:
-        cultivos = cultivos.filter(fecha__gte=fecha_inicio)
+        cultivos = cultivos.filter(fecha__gte=timezone.make_aware(datetime.combine(fecha_inicio, datetime.min.time())))
     if fecha_fin:
-        cultivos = cultivos.filter(fecha__lte=fecha_fin)
+        # La fecha final incluye el día completo, igual que el resumen diario
+        fin = fecha_fin + timedelta(days=1)
+        cultivos = cultivos.filter(fecha__lt=timezone.make_aware(datetime.combine(fin, datetime.min.time())))
     if agricultor:
         cultivos = cultivos.filter(agricultor__username__icontains=agricultor)
     if cultivo:
         cultivos = cultivos.filter(cultivo_deseado__icontains=cultivo)
     
-    # Estadísticas
-    total_cultivos = cultivos.count()
-    total_produccion = cultivos.aggregate(
-        total=Sum('cantidad')
-    )['total'] or 0
+    # Estadísticas: el resumen diario no distingue agricultores
+    if agricultor:
+        total_cultivos = cultivos.count()
+        total_produccion = cultivos.aggregate(
+            total=Sum('cantidad')
+        )['total'] or 0
+    else:
+        total_cultivos, total_produccion = totales_reporte(fecha_inicio, fecha_fin, cultivo)
     
     context = {
         'cultivos': cultivos,
@@ -140,34 +150,15 @@ def reporte_cultivos(request):
 @login_required
 def reportes_graficos(request):
     """Vista para mostrar reportes gráficos"""
-    # Datos para gráficos
-    cultivos_data = SolicitudRecomendacion.objects.values('cultivo_deseado').annotate(
-        total=Count('id'),
-        cantidad_total=Sum('cantidad')
-    ).order_by('-total')[:10]
-    
-    # Datos mensuales
-    meses = []
-    produccion_mensual = []
-    for i in range(12):
-        mes = datetime.now().replace(month=i+1, day=1)
-        meses.append(mes.strftime('%B'))
-        produccion = SolicitudRecomendacion.objects.filter(
-            fecha__month=i+1,
-            fecha__year=datetime.now().year
-        ).aggregate(total=Sum('cantidad'))['total'] or 0
-        produccion_mensual.append(float(produccion))
-    
-    # Viabilidad de cultivos
-    viabilidad_data = SolicitudRecomendacion.objects.values('viabilidad').annotate(
-        total=Count('id')
-    )
-    
+    # Datos para gráficos (cacheados por año; ver usuarios.reportes)
+    datos = datos_reportes_graficos()
+    meses = [datetime(2000, i + 1, 1).strftime('%B') for i in range(12)]
+
     context = {
-        'cultivos_data': list(cultivos_data),
+        'cultivos_data': datos['cultivos_data'],
         'meses': meses,
-        'produccion_mensual': produccion_mensual,
-        'viabilidad_data': list(viabilidad_data),
+        'produccion_mensual': datos['produccion_mensual'],
+        'viabilidad_data': datos['viabilidad_data'],
     }
     return render(request, 'reportes_graficos.html', context)
 
@@ -179,37 +170,46 @@ def produccion_proyectada(request):
     producto_seleccionado = request.GET.get('producto')
     hectareas = request.GET.get('hectareas', 1)
 
-    cultivos_activos = SolicitudRecomendacion.objects.filter(
-        estado='procesada'
-    ).select_related('agricultor')
+    # Filtro y cálculos en la base de datos
+    cultivos_activos = (SolicitudRecomendacion.objects
+                        .filter(estado='procesada')
+                        .exclude(cantidad=0)
+                        .exclude(precio_estimado=0))
+    if producto_seleccionado:
+        cultivos_activos = cultivos_activos.filter(cultivo_deseado=producto_seleccionado)
+    cultivos_activos = cultivos_activos.annotate(
+        ingreso_calculado=ExpressionWrapper(F('cantidad') * F('precio_estimado'),
+                                            output_field=DecimalField(max_digits=20, decimal_places=4)),
+        rendimiento_estimado=ExpressionWrapper(F('cantidad') * Value(Decimal('0.9')),
+                                               output_field=DecimalField(max_digits=12, decimal_places=3)),
+    )
 
-    proyecciones = []
-    for cultivo in cultivos_activos:
-        if cultivo.cantidad and cultivo.precio_estimado:
-            ingreso_proyectado = float(cultivo.cantidad) * float(cultivo.precio_estimado)
-            proyecciones.append({
-                'producto': cultivo,
-                'produccion_total': cultivo.cantidad,
-                'precio_unidad': cultivo.precio_estimado,
-                'ingreso_proyectado': ingreso_proyectado,
-                'rendimiento_estimado': cultivo.cantidad * 0.9
-            })
+    totales = cultivos_activos.aggregate(
+        total_proyectado=Sum('ingreso_calculado'),
+        total_cultivos=Count('id'),
+        rendimiento_promedio=Avg('rendimiento_estimado'),
+    )
 
-    # 🔎 Filtrar si hay producto seleccionado
-    if producto_seleccionado:
-        proyecciones = [p for p in proyecciones if p['producto'].cultivo_deseado == producto_seleccionado]
+    # 📑 Paginación por llave: el costo de una página no depende del total de filas
+    def _entero(nombre):
+        valor = request.GET.get(nombre)
+        return int(valor) if valor and valor.isdigit() else None
 
-    # 📑 Paginación
-    from django.core.paginator import Paginator
-    paginator = Paginator(proyecciones, 5)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = PaginaKeyset(
+        cultivos_activos.select_related('agricultor'), 5,
+        despues=_entero('despues'), antes=_entero('antes'), ultima=bool(request.GET.get('ultima')),
+        numero=_entero('pagina') or 1, total=totales['total_cultivos'],
+    )
 
-    # 📊 Datos para gráfico
-    labels = [p['producto'].cultivo_deseado for p in proyecciones]
-    ingresos = [p['ingreso_proyectado'] for p in proyecciones]
-    cantidades = [p['produccion_total'] for p in proyecciones]
-    colores = ["rgba(75, 192, 192, 0.8)" for _ in proyecciones]  # color fijo, puedes randomizar si quieres
+    # 📊 Datos para gráfico: un punto por cultivo (acotado por la cantidad de cultivos)
+    por_cultivo = list(cultivos_activos
+                       .values('cultivo_deseado')
+                       .annotate(cantidad_total=Sum('cantidad'), ingreso_total=Sum('ingreso_calculado'))
+                       .order_by('cultivo_deseado'))
+    labels = [p['cultivo_deseado'] for p in por_cultivo]
+    ingresos = [float(p['ingreso_total']) for p in por_cultivo]
+    cantidades = [float(p['cantidad_total']) for p in por_cultivo]
+    colores = ["rgba(75, 192, 192, 0.8)" for _ in por_cultivo]  # color fijo, puedes randomizar si quieres
 
     datos_grafico = {
         'labels': mark_safe(json.dumps(labels)),
@@ -219,14 +219,13 @@ def produccion_proyectada(request):
     }
 
     context = {
-        'productos_disponibles': cultivos_activos,
         'producto_seleccionado': producto_seleccionado,
         'cantidad_hectareas': hectareas,
         'proyecciones': page_obj,
         'page_obj': page_obj,
-        'total_proyectado': sum(p['ingreso_proyectado'] for p in proyecciones),
-        'total_cultivos': len(proyecciones),
-        'rendimiento_promedio': sum(p['rendimiento_estimado'] for p in proyecciones) / len(proyecciones) if proyecciones else 0,
+        'total_proyectado': totales['total_proyectado'] or 0,
+        'total_cultivos': totales['total_cultivos'],
+        'rendimiento_promedio': totales['rendimiento_promedio'] or 0,
         'datos_grafico': datos_grafico,
     }
     return render(request, 'produccion_proyectada.html', context)
@@ -417,29 +416,21 @@ def dashboard_data_api(request):
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'No autenticado'}, status=401)
     
-    # Obtener las solicitudes del agricultor
-    solicitudes = SolicitudRecomendacion.objects.filter(agricultor=request.user)
+    # Resumen del agricultor (una consulta agregada, cacheado por usuario)
+    resumen = resumen_agricultor(request.user.pk)
     
     # Datos para producción por cultivo y clima
-    produccion_por_cultivo = solicitudes.values('cultivo_deseado').annotate(
-        total_cantidad=Sum('cantidad')
-    ).order_by('-total_cantidad')[:10]
-    
-    produccion_labels = [item['cultivo_deseado'] or 'Sin especificar' for item in produccion_por_cultivo]
-    produccion_data = [float(item['total_cantidad'] or 0) for item in produccion_por_cultivo]
+    produccion_labels = [cultivo or 'Sin especificar' for cultivo, _ in resumen['produccion_por_cultivo']]
+    produccion_data = [float(cantidad) for _, cantidad in resumen['produccion_por_cultivo']]
     
     # Datos para viabilidad
-    viabilidad_data = solicitudes.values('viabilidad').annotate(
-        total=Count('id')
-    )
-    
-    viabilidad_labels = [item['viabilidad'] or 'pendiente' for item in viabilidad_data]
-    viabilidad_values = [item['total'] for item in viabilidad_data]
+    viabilidad_labels = [viabilidad or 'pendiente' for viabilidad, _ in resumen['viabilidad']]
+    viabilidad_values = [total for _, total in resumen['viabilidad']]
     
     # Estadísticas generales
-    total_cultivos = solicitudes.count()
+    total_cultivos = resumen['total_cultivos']
     total_produccion = sum(produccion_data)
-    ingresos_totales = sum(float(s.ingreso_proyectado or 0) for s in solicitudes)
+    ingresos_totales = float(resumen['ingresos_totales'])
     
     response_data = {
         'produccionPorCultivo': {
@@ -462,19 +453,20 @@ def dashboard_data_api(request):
 def home(request):
     """Vista principal - Muestra dashboard si está autenticado, sino página de presentación"""
     if request.user.is_authenticated:
-        # Obtener las solicitudes de recomendaciones del agricultor
-        solicitudes = SolicitudRecomendacion.objects.filter(agricultor=request.user)
+        # Resumen del agricultor: una consulta agregada y las solicitudes recientes
+        resumen = resumen_agricultor(request.user.pk)
+        solicitudes_recientes = resumen['recientes']
 
-        # Calcular datos para el dashboard
-        if solicitudes.exists():
-            cultivo = solicitudes.first().cultivo_deseado
-            cantidad = sum(solicitud.cantidad for solicitud in solicitudes)
-            fecha_siembra = solicitudes.first().fecha_cultivo
-            fecha_cosecha = solicitudes.first().fecha_cosecha
-            dias = (fecha_cosecha - fecha_siembra).days if fecha_cosecha else 0
-            viabilidad = solicitudes.first().viabilidad
-            clima = solicitudes.first().clima_recomendacion
-            solicitudes_recientes = solicitudes.order_by('-fecha')[:5]
+        # Calcular datos para el dashboard a partir de la solicitud más reciente
+        if solicitudes_recientes:
+            ultima = solicitudes_recientes[0]
+            cultivo = ultima.cultivo_deseado
+            cantidad = resumen['total_produccion']
+            fecha_siembra = ultima.fecha_cultivo
+            fecha_cosecha = ultima.fecha_cosecha
+            dias = (fecha_cosecha - fecha_siembra).days if fecha_cosecha and fecha_siembra else 0
+            viabilidad = ultima.viabilidad
+            clima = ultima.clima_recomendacion
         else:
             cultivo = cantidad = fecha_siembra = fecha_cosecha = dias = viabilidad = clima = None
             solicitudes_recientes = []